@@ -0,0 +1,107 @@
+"""Benchmark MIME construction: email.message.EmailMessage vs the fast path.
+
+Both paths build a message and base64url-encode it for the API's "raw"
+field. For each message shape the benchmark reports:
+
+* CPU time per message (time.process_time over many builds)
+* peak memory allocated while building one message (tracemalloc)
+* size of the encoded "raw" field, which depends on the transfer encodings
+
+Usage:
+    uv run python benchmarks/mime_benchmark.py [--messages 2000]
+"""
+
+import argparse
+import base64
+import sys
+import time
+import tracemalloc
+from email.message import EmailMessage
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.mime import build_raw_message
+from src.resources.html_email_templates import HTML_EMAIL_TEMPLATES
+
+PLAIN_BODY = "Hi Sam,\n\nThe quarterly report is attached.\n\nThanks,\nAlex\n"
+
+CASES = {
+    "plain text": ("Quarterly report", PLAIN_BODY, None),
+    "text + html": (
+        "Monthly newsletter",
+        PLAIN_BODY,
+        HTML_EMAIL_TEMPLATES["newsletter"],
+    ),
+    "non-ascii": ("Résumé für Zoë", "Grüße aus Köln\n" * 20, "<p>Grüße</p>" * 50),
+}
+
+
+def before(subject, body, html_body):
+    """The previous path: EmailMessage, as_bytes, then a separate base64 pass."""
+    message = EmailMessage()
+    message["To"] = "sam@example.com"
+    message["Subject"] = subject
+    message["From"] = "alex@example.com"
+    message.set_content(body)
+    if html_body:
+        message.add_alternative(html_body, subtype="html")
+    return base64.urlsafe_b64encode(message.as_bytes()).decode("utf-8")
+
+
+def after(subject, body, html_body):
+    """The fast path."""
+    return build_raw_message(
+        "alex@example.com", "sam@example.com", subject, body, html_body=html_body
+    )
+
+
+def cpu_per_message(build, case, messages: int) -> float:
+    """Mean CPU seconds per message."""
+    build(*case)
+    start = time.process_time()
+    for _ in range(messages):
+        build(*case)
+    return (time.process_time() - start) / messages
+
+
+def peak_allocation(build, case) -> int:
+    """Peak bytes allocated while building one message."""
+    build(*case)
+    tracemalloc.start()
+    build(*case)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000, help="builds per path")
+    args = parser.parse_args()
+
+    for name, case in CASES.items():
+        cpu_before = cpu_per_message(before, case, args.messages)
+        cpu_after = cpu_per_message(after, case, args.messages)
+        peak_before = peak_allocation(before, case)
+        peak_after = peak_allocation(after, case)
+
+        print(name)
+        print(
+            f"  cpu      before {cpu_before * 1e6:8.1f} us   "
+            f"after {cpu_after * 1e6:8.1f} us   {cpu_before / cpu_after:5.1f}x"
+        )
+        print(
+            f"  peak mem before {peak_before / 1024:8.1f} KiB  "
+            f"after {peak_after / 1024:8.1f} KiB  {peak_before / peak_after:5.1f}x"
+        )
+        size_before = len(before(*case))
+        size_after = len(after(*case))
+        print(
+            f"  raw size before {size_before:8d} B    "
+            f"after {size_after:8d} B    {size_before / size_after:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Measure Gmail response sizes per tool, with and without field masks.
+
+Each tool's API calls are made twice against the logged-in account: as the
+client makes them now, and with the "fields" parameter removed, as they were
+made before partial responses. For both, the benchmark reports the size of
+the decoded JSON and the bytes actually transferred, which are smaller when
+Gmail gzips the response.
+
+Only read-only calls are made, except with --drafts: create_draft is then
+measured by creating two drafts (one per variant) and deleting them again.
+Tools that send mail are not measured; messages.send and drafts.send return
+the same Message resource as a created draft's message.
+
+Usage:
+    uv run python benchmarks/response_size_benchmark.py [--query in:inbox] [--drafts]
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.async_gmail_client import AsyncGmailClient, close_http_client
+from src.auth_manager import AuthManager
+from src.gmail_operations import (
+    DRAFT_FIELDS,
+    DRAFT_METADATA_FIELDS,
+    DRAFT_METADATA_HEADERS,
+    DRAFT_REFS_FIELDS,
+    MESSAGE_LIST_FIELDS,
+    MESSAGE_SUMMARY_FIELDS,
+    MESSAGE_SUMMARY_HEADERS,
+    PROFILE_FIELDS,
+)
+from src.mime import build_raw_message
+
+
+def without_fields(uri: str) -> str:
+    """The request URI with its partial-response "fields" parameter removed."""
+    parts = urlsplit(uri)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k != "fields"]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class Recorder:
+    """Sends requests for one variant and adds up the response sizes."""
+
+    def __init__(self, client: AsyncGmailClient, masked: bool):
+        """Initialize totals for requests with (masked) or without field masks."""
+        self.client = client
+        self.masked = masked
+        self.decoded = 0
+        self.transferred = 0
+        self.requests = 0
+
+    async def fetch(self, request):
+        """Send a googleapiclient request and return its decoded JSON."""
+        uri = request.uri if self.masked else without_fields(request.uri)
+        response = await self.client._request(
+            request.method, uri, request.body, request.headers
+        )
+        response.raise_for_status()
+        self.decoded += len(response.content)
+        self.transferred += response.num_bytes_downloaded
+        self.requests += 1
+        return response.json() if response.content else {}
+
+
+async def get_user_info(api, fetch, args):
+    """Calls made by get_user_info."""
+    await fetch(api.users.getProfile(userId="me", fields=PROFILE_FIELDS))
+
+
+async def list_drafts(api, fetch, args):
+    """Calls made by list_drafts for one page of drafts."""
+    page = await fetch(
+        api.drafts.list(userId="me", maxResults=args.limit, fields=DRAFT_REFS_FIELDS)
+    )
+    for draft in page.get("drafts", []):
+        await fetch(
+            api.messages.get(
+                userId="me",
+                id=draft["message"]["id"],
+                format="metadata",
+                metadataHeaders=DRAFT_METADATA_HEADERS,
+                fields=DRAFT_METADATA_FIELDS,
+            )
+        )
+
+
+async def search_messages(api, fetch, args):
+    """Calls made by search_messages for one page of results."""
+    page = await fetch(
+        api.messages.list(
+            userId="me", q=args.query, maxResults=args.limit, fields=MESSAGE_LIST_FIELDS
+        )
+    )
+    for message in page.get("messages", []):
+        await fetch(
+            api.messages.get(
+                userId="me",
+                id=message["id"],
+                format="metadata",
+                metadataHeaders=MESSAGE_SUMMARY_HEADERS,
+                fields=MESSAGE_SUMMARY_FIELDS,
+            )
+        )
+
+
+async def create_draft(api, fetch, args, client):
+    """Calls made by create_draft; the draft is deleted afterwards."""
+    raw = build_raw_message(
+        client.user_email,
+        client.user_email,
+        "Response size benchmark",
+        "This draft is deleted by the benchmark.\n" * 20,
+    )
+    draft = await fetch(
+        api.drafts.create(
+            userId="me", body={"message": {"raw": raw}}, fields=DRAFT_FIELDS
+        )
+    )
+    await client.delete_draft(draft["id"])
+
+
+def report(name: str, before: Recorder, after: Recorder) -> None:
+    """Print one tool's sizes and the reduction."""
+    print(f"{name} ({after.requests} requests)")
+    for label, attribute in (("decoded", "decoded"), ("on wire", "transferred")):
+        old = getattr(before, attribute)
+        new = getattr(after, attribute)
+        print(
+            f"  {label:8} before {old:9d} B   after {new:9d} B   "
+            f"{old / new if new else float('inf'):5.1f}x"
+        )
+
+
+async def run(args) -> None:
+    """Measure every tool for the logged-in account."""
+    auth_manager = AuthManager()
+    user = auth_manager.get_current_user()
+    credentials = auth_manager.get_credentials(user) if user else None
+    if not credentials:
+        sys.exit("No authenticated user. Please login first with: gmail-mcp --login")
+    client = AsyncGmailClient(credentials, user)
+
+    tools = {
+        "get_user_info": get_user_info,
+        "list_drafts": list_drafts,
+        "search_messages": search_messages,
+    }
+    if args.drafts:
+        tools["create_draft"] = lambda api, fetch, args: create_draft(
+            api, fetch, args, client
+        )
+
+    try:
+        for name, calls in tools.items():
+            before = Recorder(client, masked=False)
+            after = Recorder(client, masked=True)
+            await calls(client.api, before.fetch, args)
+            await calls(client.api, after.fetch, args)
+            report(name, before, after)
+    finally:
+        await close_http_client()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--query", default="in:inbox", help="search_messages query")
+    parser.add_argument("--limit", type=int, default=20, help="results per listing")
+    parser.add_argument(
+        "--drafts", action="store_true", help="also measure create_draft"
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
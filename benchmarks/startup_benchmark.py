@@ -0,0 +1,112 @@
+"""Benchmark Gmail service construction: library discovery vs bundled document.
+
+Measures two things for each path, without touching the network (responses
+come from googleapiclient's HttpMockSequence):
+
+* time-to-first-tool-call: a fresh interpreter builds the service and
+  executes one users.getProfile call, as the server does on its first tool
+* per-client construction: building another client in a warm process (the
+  bundled path reuses the process-wide resource tree and only supplies a
+  transport)
+
+Usage:
+    uv run python benchmarks/startup_benchmark.py [--runs 10] [--builds 50]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+PROFILE_RESPONSE = (
+    '{"emailAddress": "bench@example.com", "messagesTotal": 1, "threadsTotal": 1}'
+)
+
+# Both paths run inside the server process, which has already imported the
+# package, so common imports happen before the clock starts.
+SETUP = f"""
+import time
+import src
+from googleapiclient.http import HttpMockSequence
+_start = time.perf_counter()
+
+def _http():
+    return HttpMockSequence([({{"status": "200"}}, {PROFILE_RESPONSE!r})])
+"""
+
+BEFORE = """
+from googleapiclient.discovery import build
+
+def make_client():
+    return build("gmail", "v1", http=_http())
+
+def first_call(client):
+    return client.users().getProfile(userId="me").execute()
+"""
+
+AFTER = """
+from src.discovery import shared_gmail_resources
+
+def make_client():
+    return shared_gmail_resources()
+
+def first_call(client):
+    return client.users.getProfile(userId="me").execute(http=_http())
+"""
+
+COLD = """
+first_call(make_client())
+print(time.perf_counter() - _start)
+"""
+
+WARM = """
+import sys
+builds = int(sys.argv[1])
+make_client()
+_t = time.perf_counter()
+for _ in range(builds):
+    first_call(make_client())
+print((time.perf_counter() - _t) / builds)
+"""
+
+
+def _run(code: str, *args: str) -> float:
+    """Run code in a fresh interpreter and return the number it prints."""
+    output = subprocess.run(
+        [sys.executable, "-c", code, *args],
+        cwd=REPO_ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def _report(label: str, samples: list) -> float:
+    median = statistics.median(samples) * 1000
+    print(f"  {label:<8} median {median:8.2f} ms   min {min(samples) * 1000:8.2f} ms")
+    return median
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="cold-start samples")
+    parser.add_argument("--builds", type=int, default=50, help="warm builds per run")
+    args = parser.parse_args()
+
+    print(f"Time to first tool call ({args.runs} fresh interpreters)")
+    before = _report("before", [_run(SETUP + BEFORE + COLD) for _ in range(args.runs)])
+    after = _report("after", [_run(SETUP + AFTER + COLD) for _ in range(args.runs)])
+    print(f"  speedup  {before / after:.2f}x")
+
+    print(f"Per-client construction + call (mean of {args.builds}, warm process)")
+    before = _report("before", [_run(SETUP + BEFORE + WARM, str(args.builds))])
+    after = _report("after", [_run(SETUP + AFTER + WARM, str(args.builds))])
+    print(f"  speedup  {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,9 @@ import asyncio
 import sys
 import click
 
+from src.config import TOKEN_STORE
 from src.server import mcp, auth_manager
+from src.token_store import migrate_tokens, open_token_store
 
 
 # CLI interface
@@ -18,7 +20,21 @@ from src.server import mcp, auth_manager
 @click.option("--remove-user", type=str, help="Remove a specific user")
 @click.option("--credentials", type=str, help="Path to OAuth2 credentials file")
 @click.option("--current-user", is_flag=True, help="Show current authenticated user")
-def cli(login, logout, switch_user, list_users, remove_user, credentials, current_user):
+@click.option(
+    "--migrate-tokens-to",
+    type=click.Choice(["file", "sqlite"]),
+    help="Copy all stored tokens into another token store backend",
+)
+def cli(
+    login,
+    logout,
+    switch_user,
+    list_users,
+    remove_user,
+    credentials,
+    current_user,
+    migrate_tokens_to,
+):
     """Gmail MCP Server CLI."""
 
     if credentials:
@@ -55,7 +71,12 @@ def cli(login, logout, switch_user, list_users, remove_user, credentials, curren
         return
 
     if switch_user:
-        if auth_manager.get_credentials(switch_user):
+        try:
+            credentials = auth_manager.get_credentials(switch_user)
+        except Exception as e:
+            click.echo(f"Could not refresh credentials: {e}", err=True)
+            sys.exit(1)
+        if credentials:
             auth_manager.set_current_user(switch_user)
             click.echo(f"Switched to user: {switch_user}")
         else:
@@ -90,6 +111,25 @@ def cli(login, logout, switch_user, list_users, remove_user, credentials, curren
             click.echo("No user currently authenticated")
         return
 
+    if migrate_tokens_to:
+        if migrate_tokens_to == TOKEN_STORE:
+            click.echo(f"Tokens are already kept in the {TOKEN_STORE} store")
+            sys.exit(1)
+        target = open_token_store(migrate_tokens_to, auth_manager.config_dir)
+        try:
+            copied = migrate_tokens(auth_manager.token_store, target)
+        except Exception as e:
+            click.echo(f"Migration failed: {e}", err=True)
+            sys.exit(1)
+        finally:
+            target.close()
+        click.echo(f"Copied tokens of {copied} users to the {migrate_tokens_to} store")
+        click.echo(
+            f"Set GMAIL_MCP_TOKEN_STORE={migrate_tokens_to} to use it; "
+            f"the {TOKEN_STORE} store was left unchanged"
+        )
+        return
+
     # Default: Start MCP server
     current = auth_manager.get_current_user()
     if not current:
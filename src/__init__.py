@@ -2,16 +2,52 @@
 
 __version__ = "0.1.0"
 
+from .async_gmail_client import AsyncGmailClient
 from .auth_manager import AuthManager
 from .gmail_client import GmailClient
-from .models import EmailRequest, DraftRequest, EmailResponse, DraftInfo, UserInfo
+from .models import (
+    EmailRequest,
+    DraftRequest,
+    EmailResponse,
+    DraftInfo,
+    DraftPage,
+    AccountPage,
+    UserInfo,
+    BulkEmailMessage,
+    BulkSendResult,
+    BulkSendResponse,
+    MessageSummary,
+    SearchResult,
+    LocalSearchHit,
+    LocalSearchResult,
+    MessagePart,
+    ThreadMessage,
+    ThreadView,
+    PartContent,
+    BulkModifyResult,
+)
 
 __all__ = [
     "AuthManager",
     "GmailClient",
+    "AsyncGmailClient",
     "EmailRequest",
     "DraftRequest",
     "EmailResponse",
     "DraftInfo",
+    "DraftPage",
+    "AccountPage",
     "UserInfo",
+    "BulkEmailMessage",
+    "BulkSendResult",
+    "BulkSendResponse",
+    "MessageSummary",
+    "SearchResult",
+    "LocalSearchHit",
+    "LocalSearchResult",
+    "MessagePart",
+    "ThreadMessage",
+    "ThreadView",
+    "PartContent",
+    "BulkModifyResult",
 ]
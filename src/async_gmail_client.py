@@ -0,0 +1,524 @@
+"""Async Gmail API client over a pooled, keep-alive httpx transport."""
+
+import asyncio
+import json
+import time
+from typing import Optional, List, Dict, Any, AsyncIterator, Callable, Sequence, Tuple
+import httplib2
+import httpx
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+
+from . import gmail_operations as operations
+from .attachments import resolve_attachments
+from .config import (
+    HTTP2,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_TIMEOUT,
+    PROFILE_CACHE_TTL,
+)
+from .discovery import shared_gmail_resources
+from .gmail_operations import (
+    DRAFTS_PAGE_LIMIT,
+    MESSAGES_PAGE_LIMIT,
+    Batch,
+    Call,
+    Operation,
+    Step,
+    T,
+    drive_async,
+)
+from .rate_limiter import rate_limiter, request_units
+from .retry import call_with_retry_async, circuit_breakers
+
+# Refreshes and stores a user's token: (email, stale_token=...) -> Credentials,
+# or None if the grant was revoked (AuthManager.refresh_credentials)
+CredentialsRefresher = Callable[..., Optional[Credentials]]
+
+try:
+    import h2  # noqa: F401
+
+    _H2_AVAILABLE = True
+except ImportError:
+    _H2_AVAILABLE = False
+
+# One connection pool for every user of the async backend
+_shared_http: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the process-wide async HTTP client, creating it on first use."""
+    global _shared_http
+    if _shared_http is None or _shared_http.is_closed:
+        _shared_http = httpx.AsyncClient(
+            http2=HTTP2 and _H2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            # Requests beyond the connection limit wait for a free connection
+            timeout=httpx.Timeout(HTTP_TIMEOUT, pool=None),
+        )
+    return _shared_http
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client and its pooled connections."""
+    global _shared_http
+    if _shared_http is not None:
+        await _shared_http.aclose()
+        _shared_http = None
+
+
+def _http_error(response: httpx.Response, uri: str) -> HttpError:
+    """Wrap a failed httpx response in googleapiclient's HttpError."""
+    info = dict(response.headers)
+    info["status"] = str(response.status_code)
+    resp = httplib2.Response(info)
+    resp.reason = response.reason_phrase
+    return HttpError(resp, response.content, uri=uri)
+
+
+def _upload_offset(response: httpx.Response) -> int:
+    """Bytes Gmail has received, from a 308 response's Range header."""
+    received = response.headers.get("range")
+    if not received:
+        return 0
+    return int(received.rsplit("-", 1)[1]) + 1
+
+
+class AsyncGmailClient:
+    """Async Gmail API client running the same operations as GmailClient.
+
+    Requests are built by gmail_operations (no I/O) and sent through a shared
+    httpx client, so concurrent calls for all users share a handful of
+    keep-alive (optionally HTTP/2) connections; batched reads run
+    concurrently instead of through the batch endpoint. Access tokens are
+    injected per request and refreshed on expiry or a 401.
+    """
+
+    def __init__(
+        self,
+        credentials: Credentials,
+        user_email: Optional[str] = None,
+        profile_ttl: int = PROFILE_CACHE_TTL,
+        http: Optional[httpx.AsyncClient] = None,
+        refresh_credentials: Optional[CredentialsRefresher] = None,
+    ):
+        """Initialize async Gmail client with OAuth2 credentials.
+
+        With refresh_credentials, expired or rejected tokens are renewed
+        through it, so the new token is stored and refreshes are shared with
+        the rest of the process; otherwise the credentials refresh themselves.
+        """
+        self.credentials = credentials
+        self.user_email = user_email
+        self.api = shared_gmail_resources()
+        self._http = http
+        self._refresh = refresh_credentials
+        self._refresh_lock = asyncio.Lock()
+
+        self.profile_ttl = profile_ttl
+        self._profile: Optional[Dict[str, Any]] = None
+        self._profile_expires_at = 0.0
+        self._profile_lock = asyncio.Lock()
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """HTTP client used for requests (the shared pool unless one was given)."""
+        return self._http or get_http_client()
+
+    async def _refresh_credentials(self, stale_token: Optional[str]) -> None:
+        """Refresh the access token once, even if many requests saw it expire."""
+        async with self._refresh_lock:
+            if self.credentials.token != stale_token and self.credentials.valid:
+                return
+            if self._refresh is None or not self.user_email:
+                await asyncio.to_thread(self.credentials.refresh, Request())
+                return
+            credentials = await asyncio.to_thread(
+                self._refresh, self.user_email, stale_token=stale_token
+            )
+            if credentials is None:
+                raise RefreshError(
+                    f"Access for {self.user_email} was revoked; log in again"
+                )
+            self.credentials = credentials
+
+    async def _run(self, operation: Operation[T]) -> T:
+        """Run a Gmail operation, sending its requests over the shared pool."""
+        return await drive_async(operation, self._perform)
+
+    async def _perform(self, step: Step) -> Any:
+        """Carry out one step of an operation, keeping blocking work off the loop."""
+        if isinstance(step, Call):
+            return await self._execute(step.request, step.idempotent)
+        if isinstance(step, Batch):
+            return await self._execute_batch(step.requests)
+        return await asyncio.to_thread(step.func, *step.args)
+
+    async def _execute_batch(
+        self, requests: Sequence[Tuple[str, HttpRequest]]
+    ) -> Dict[str, Tuple[Any, Optional[Exception]]]:
+        """Send read requests concurrently, each with its own retries.
+
+        Returns (response, error) keyed by the request ID given for each request.
+        """
+        responses = await asyncio.gather(
+            *(self._execute(request) for _, request in requests),
+            return_exceptions=True,
+        )
+        results: Dict[str, Tuple[Any, Optional[Exception]]] = {}
+        for (request_id, _), response in zip(requests, responses):
+            if isinstance(response, Exception):
+                results[request_id] = (None, response)
+            elif isinstance(response, BaseException):
+                raise response
+            else:
+                results[request_id] = (response, None)
+        return results
+
+    async def _execute(self, request: HttpRequest, idempotent: bool = True) -> Any:
+        """Send a request with quota pacing, retries and the circuit breaker."""
+        units = request_units(request)
+        send = self._upload if request.resumable is not None else self._send
+
+        async def attempt() -> Any:
+            await rate_limiter.acquire_async(self.user_email, units)
+            return await send(request)
+
+        return await call_with_retry_async(
+            attempt, circuit_breakers.get(self.user_email), idempotent
+        )
+
+    async def _request(
+        self,
+        method: str,
+        uri: str,
+        content: Optional[Any] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """Make an authorized HTTP call, refreshing the token on expiry or a 401."""
+        for attempt in range(2):
+            if not self.credentials.valid:
+                await self._refresh_credentials(self.credentials.token)
+
+            token = self.credentials.token
+            request_headers = dict(headers or {})
+            self.credentials.apply(request_headers)
+            response = await self.http.request(
+                method, uri, content=content, headers=request_headers
+            )
+
+            if (
+                response.status_code == 401
+                and attempt == 0
+                and self.credentials.refresh_token
+            ):
+                await self._refresh_credentials(token)
+                continue
+            break
+        return response
+
+    async def _send(self, request: HttpRequest) -> Any:
+        """Send a request built by googleapiclient and decode the JSON response."""
+        response = await self._request(
+            request.method, request.uri, request.body, request.headers
+        )
+        if response.status_code >= 300:
+            raise _http_error(response, request.uri)
+        return json.loads(response.content) if response.content else {}
+
+    async def _upload(self, request: HttpRequest) -> Any:
+        """Send a resumable media request chunk by chunk.
+
+        The upload session is kept on the request, so a retry after a failed
+        chunk asks Gmail how much arrived and resumes from there.
+        """
+        media = request.resumable
+        size = media.size()
+
+        if request.resumable_uri is None:
+            headers = dict(request.headers)
+            headers["X-Upload-Content-Type"] = media.mimetype()
+            headers["X-Upload-Content-Length"] = str(size)
+            response = await self._request(
+                request.method, request.uri, request.body, headers
+            )
+            if response.status_code >= 300:
+                raise _http_error(response, request.uri)
+            request.resumable_uri = response.headers["location"]
+            request.resumable_progress = 0
+        else:
+            response = await self._request(
+                "PUT",
+                request.resumable_uri,
+                headers={"Content-Range": f"bytes */{size}"},
+            )
+            if response.status_code < 300:
+                return json.loads(response.content) if response.content else {}
+            if response.status_code != 308:
+                raise _http_error(response, request.uri)
+            request.resumable_progress = _upload_offset(response)
+
+        while True:
+            start = request.resumable_progress
+            chunk = await asyncio.to_thread(media.getbytes, start, media.chunksize())
+            response = await self._request(
+                "PUT",
+                request.resumable_uri,
+                chunk,
+                {"Content-Range": f"bytes {start}-{start + len(chunk) - 1}/{size}"},
+            )
+            if response.status_code != 308:
+                break
+            request.resumable_progress = _upload_offset(response)
+
+        if response.status_code >= 300:
+            raise _http_error(response, request.uri)
+        return json.loads(response.content) if response.content else {}
+
+    async def get_user_info(self, refresh: bool = False) -> Dict[str, Any]:
+        """Get current user's Gmail profile information.
+
+        Served from cache for up to profile_ttl seconds unless refresh is set.
+        """
+        async with self._profile_lock:
+            if (
+                not refresh
+                and self._profile is not None
+                and time.monotonic() < self._profile_expires_at
+            ):
+                return dict(self._profile)
+
+            self._profile = await self._run(operations.get_profile(self.api))
+            self._profile_expires_at = time.monotonic() + self.profile_ttl
+            if self._profile["email"]:
+                self.user_email = self._profile["email"]
+            return dict(self._profile)
+
+    async def refresh_profile(self) -> Dict[str, Any]:
+        """Refetch the cached profile from Gmail."""
+        return await self.get_user_info(refresh=True)
+
+    def invalidate_profile(self) -> None:
+        """Drop the cached profile so the next lookup hits Gmail."""
+        self._profile = None
+        self._profile_expires_at = 0.0
+
+    async def get_sender_address(self) -> str:
+        """Get the address used in the From header of outgoing messages."""
+        if self.user_email:
+            return self.user_email
+        return (await self.get_user_info())["email"]
+
+    async def send_email(
+        self,
+        to: str,
+        subject: str,
+        body: str,
+        cc: Optional[str] = None,
+        bcc: Optional[str] = None,
+        html_body: Optional[str] = None,
+        attachments: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Send an email message, optionally with files attached."""
+        attachments = resolve_attachments(attachments)
+        return await self._run(
+            operations.send_email(
+                self.api,
+                self.user_email,
+                await self.get_sender_address(),
+                to,
+                subject,
+                body,
+                cc,
+                bcc,
+                html_body,
+                attachments,
+            )
+        )
+
+    async def send_raw(self, raw_message: str) -> Dict[str, Any]:
+        """Send a message that is already MIME-built and base64url-encoded."""
+        return await self._run(operations.send_raw(self.api, raw_message))
+
+    async def create_draft(
+        self,
+        to: str,
+        subject: str,
+        body: str,
+        cc: Optional[str] = None,
+        bcc: Optional[str] = None,
+        html_body: Optional[str] = None,
+        attachments: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Create an email draft, optionally with files attached."""
+        attachments = resolve_attachments(attachments)
+        return await self._run(
+            operations.create_draft(
+                self.api,
+                self.user_email,
+                await self.get_sender_address(),
+                to,
+                subject,
+                body,
+                cc,
+                bcc,
+                html_body,
+                attachments,
+            )
+        )
+
+    async def send_draft(self, draft_id: str) -> Dict[str, Any]:
+        """Send an existing draft."""
+        return await self._run(operations.send_draft(self.api, draft_id))
+
+    async def list_drafts_page(
+        self, max_results: int = 10, page_token: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """List one page of drafts and the token for the next page, if any."""
+        return await self._run(
+            operations.list_drafts_page(self.api, max_results, page_token)
+        )
+
+    async def iter_drafts(
+        self, page_size: int = DRAFTS_PAGE_LIMIT, limit: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield drafts across all pages, fetching each page only when needed.
+
+        Only one page is held at a time. limit stops after that many drafts
+        without fetching headers for drafts beyond it.
+        """
+        page_token = None
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            page = await self.list_drafts_page(size, page_token)
+            for draft in page["drafts"]:
+                yield draft
+            if remaining is not None:
+                remaining -= len(page["drafts"])
+            page_token = page["next_page_token"]
+            if not page_token:
+                return
+
+    async def list_drafts(self, max_results: int = 10) -> List[Dict[str, Any]]:
+        """List up to max_results drafts, across as many pages as needed."""
+        return [draft async for draft in self.iter_drafts(limit=max_results)]
+
+    async def get_draft_details(
+        self, drafts: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Fetch Subject/To headers for drafts from drafts.list."""
+        return await self._run(operations.get_draft_details(self.api, drafts))
+
+    async def search_messages(
+        self,
+        query: str,
+        max_results: int = 20,
+        page_token: Optional[str] = None,
+        include_spam_trash: bool = False,
+    ) -> Dict[str, Any]:
+        """Find messages matching a Gmail search query, with their headers."""
+        return await self._run(
+            operations.search_messages(
+                self.api, query, max_results, page_token, include_spam_trash
+            )
+        )
+
+    async def get_message_summaries(
+        self, message_ids: List[str]
+    ) -> List[Dict[str, Any]]:
+        """Fetch compact header summaries for messages, in the given order."""
+        return await self._run(operations.get_message_summaries(self.api, message_ids))
+
+    async def list_message_ids(
+        self, max_results: int, query: Optional[str] = None
+    ) -> List[str]:
+        """List the IDs of up to max_results messages, newest first."""
+        return await self._run(
+            operations.list_message_ids(self.api, max_results, query)
+        )
+
+    async def list_message_ids_page(
+        self,
+        query: Optional[str] = None,
+        page_token: Optional[str] = None,
+        max_results: int = MESSAGES_PAGE_LIMIT,
+        include_spam_trash: bool = False,
+    ) -> Dict[str, Any]:
+        """List one page of IDs of messages matching a query, newest first."""
+        return await self._run(
+            operations.list_message_ids_page(
+                self.api, query, page_token, max_results, include_spam_trash
+            )
+        )
+
+    async def batch_modify_messages(
+        self,
+        message_ids: List[str],
+        add_label_ids: Optional[List[str]] = None,
+        remove_label_ids: Optional[List[str]] = None,
+    ) -> int:
+        """Add and remove labels on up to BATCH_MODIFY_LIMIT messages at once."""
+        return await self._run(
+            operations.batch_modify_messages(
+                self.api, message_ids, add_label_ids, remove_label_ids
+            )
+        )
+
+    async def list_labels(self) -> List[Dict[str, str]]:
+        """List the mailbox's system and user labels with their IDs and names."""
+        return await self._run(operations.list_labels(self.api))
+
+    async def get_message_contents(
+        self, message_ids: List[str]
+    ) -> List[Dict[str, Any]]:
+        """Fetch messages' headers and readable text, in the given order."""
+        return await self._run(operations.get_message_contents(self.api, message_ids))
+
+    async def get_thread(self, thread_id: str) -> Dict[str, Any]:
+        """Fetch a thread with every message's headers and part structure."""
+        return await self._run(operations.get_thread(self.api, thread_id))
+
+    async def get_message(self, message_id: str) -> Dict[str, Any]:
+        """Fetch one message in full format, without decoding any part."""
+        return await self._run(operations.get_message(self.api, message_id))
+
+    async def get_attachment(self, message_id: str, attachment_id: str) -> bytes:
+        """Download and decode the body of a part stored as an attachment."""
+        return await self._run(
+            operations.get_attachment(self.api, message_id, attachment_id)
+        )
+
+    async def list_draft_refs(self) -> List[Dict[str, Any]]:
+        """List every draft's ID and message ID, without headers."""
+        return await self._run(operations.list_draft_refs(self.api))
+
+    async def get_history_id(self) -> str:
+        """Get the mailbox's current history ID."""
+        return await self._run(operations.get_history_id(self.api))
+
+    async def list_history(
+        self, start_history_id: str, label_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Check whether the mailbox changed since start_history_id."""
+        return await self._run(
+            operations.list_history(self.api, start_history_id, label_id)
+        )
+
+    async def list_history_changes(self, start_history_id: str) -> Dict[str, Any]:
+        """Collect the messages added, deleted or relabeled since start_history_id."""
+        return await self._run(
+            operations.list_history_changes(self.api, start_history_id)
+        )
+
+    async def delete_draft(self, draft_id: str) -> bool:
+        """Delete a draft."""
+        return await self._run(operations.delete_draft(self.api, draft_id))
@@ -0,0 +1,135 @@
+"""Streaming MIME assembly and media upload for messages with attachments."""
+
+import base64
+import email.policy
+import mimetypes
+import os
+import tempfile
+from email.message import EmailMessage
+from typing import BinaryIO, List, Optional, Sequence
+from googleapiclient.http import MediaIoBaseUpload
+
+from .config import RESUMABLE_UPLOAD_THRESHOLD, UPLOAD_CHUNK_SIZE
+
+# Bytes read from an attachment at a time; a multiple of 57 so every chunk
+# encodes to whole 76-character base64 lines
+ATTACHMENT_READ_SIZE = 57 * 1024
+
+# Media type of a complete MIME message uploaded to messages.send/drafts.create
+MESSAGE_MEDIA_TYPE = "message/rfc822"
+
+
+def _is_within(path: str, directory: str) -> bool:
+    """Whether a real path is directory or inside it, following symlinks."""
+    directory = os.path.realpath(os.path.expanduser(directory))
+    return os.path.commonpath([path, directory]) == directory
+
+
+def resolve_attachments(
+    paths: Optional[Sequence[str]],
+    allowed_dir: Optional[str] = None,
+    private_dirs: Sequence[str] = (),
+) -> List[str]:
+    """Expand attachment paths and check each names a readable file.
+
+    Paths are also refused when, with symlinks followed, they lie outside
+    allowed_dir (if given) or inside any of private_dirs.
+    """
+    resolved = []
+    for path in paths or []:
+        path = os.path.abspath(os.path.expanduser(path))
+        real_path = os.path.realpath(path)
+        if allowed_dir and not _is_within(real_path, allowed_dir):
+            raise ValueError(f"Attachments must be inside {allowed_dir}: {path}")
+        if any(_is_within(real_path, directory) for directory in private_dirs):
+            raise ValueError(f"Attachment is in a private directory: {path}")
+        if not os.path.isfile(path):
+            raise ValueError(f"Attachment not found: {path}")
+        if not os.access(path, os.R_OK):
+            raise ValueError(f"Attachment is not readable: {path}")
+        resolved.append(path)
+    return resolved
+
+
+def _attachment_headers(path: str) -> bytes:
+    """Serialize the MIME headers of an attachment part."""
+    content_type, encoding = mimetypes.guess_type(path)
+    if content_type is None or encoding is not None:
+        content_type = "application/octet-stream"
+
+    part = EmailMessage()
+    part["Content-Type"] = content_type
+    part.add_header(
+        "Content-Disposition", "attachment", filename=os.path.basename(path)
+    )
+    part["Content-Transfer-Encoding"] = "base64"
+
+    policy = email.policy.default
+    return b"".join(policy.fold_binary(name, value) for name, value in part.items())
+
+
+def _write_attachment(out: BinaryIO, path: str) -> None:
+    """Base64-encode a file into out chunk by chunk, without a trailing newline."""
+    with open(path, "rb") as f:
+        chunk = f.read(ATTACHMENT_READ_SIZE)
+        while chunk:
+            following = f.read(ATTACHMENT_READ_SIZE)
+            encoded = base64.encodebytes(chunk)
+            out.write(encoded if following else encoded[:-1])
+            chunk = following
+
+
+def spool_mime_message(message: EmailMessage, attachments: Sequence[str]) -> BinaryIO:
+    """Write message with the given files attached to a spooled temporary file.
+
+    Only the message's own parts go through the email package; attachments
+    are streamed from disk and base64-encoded in fixed-size chunks. The file
+    stays in memory up to RESUMABLE_UPLOAD_THRESHOLD bytes and spills to disk
+    beyond it. It is returned positioned at the start; the caller closes it.
+    """
+    message.make_mixed()
+    head = message.as_bytes()
+    boundary = message.get_boundary()
+    linesep = email.policy.default.linesep.encode()
+
+    # Drop the closing delimiter so attachment parts can follow the body
+    closing = linesep + b"--" + boundary.encode() + b"--" + linesep
+    if not head.endswith(closing):
+        raise ValueError("Unexpected MIME layout while adding attachments")
+
+    out = tempfile.SpooledTemporaryFile(max_size=RESUMABLE_UPLOAD_THRESHOLD)
+    try:
+        out.write(head[: -len(closing)])
+        for path in attachments:
+            out.write(linesep + b"--" + boundary.encode() + linesep)
+            out.write(_attachment_headers(path))
+            out.write(linesep)
+            _write_attachment(out, path)
+        out.write(closing)
+        out.seek(0)
+    except BaseException:
+        out.close()
+        raise
+    return out
+
+
+def spooled_size(message: BinaryIO) -> int:
+    """Size in bytes of a spooled message, leaving it positioned at the start."""
+    size = message.seek(0, os.SEEK_END)
+    message.seek(0)
+    return size
+
+
+def needs_resumable_upload(message: BinaryIO) -> bool:
+    """Whether a spooled message is too large to send inline as raw JSON."""
+    return spooled_size(message) > RESUMABLE_UPLOAD_THRESHOLD
+
+
+def media_upload(message: BinaryIO) -> MediaIoBaseUpload:
+    """Wrap a spooled message for a resumable message/rfc822 upload."""
+    return MediaIoBaseUpload(
+        message,
+        mimetype=MESSAGE_MEDIA_TYPE,
+        chunksize=UPLOAD_CHUNK_SIZE,
+        resumable=True,
+    )
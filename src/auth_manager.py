@@ -2,47 +2,136 @@
 
 import json
 import os
+import threading
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional, List, Dict, Any
-from cryptography.fernet import Fernet
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from cryptography.fernet import Fernet, InvalidToken
+from google.auth.exceptions import RefreshError
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 
+from .config import TOKEN_STORE
+from .interprocess import InterProcessLock, atomic_write
+from .metrics import metrics
+from .token_store import (
+    FileSignature,
+    TokenStore,
+    TokenVersion,
+    file_signature,
+    open_token_store,
+    stat_signature,
+)
+
 SCOPES = [
     "https://www.googleapis.com/auth/gmail.send",
     "https://www.googleapis.com/auth/gmail.modify",
 ]
 
 
+def _utcnow() -> datetime:
+    """Current UTC time as a naive datetime, as google-auth stores expiry."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _same_grant(old: Credentials, new: Credentials) -> bool:
+    """Whether two credentials differ at most in their access token."""
+    return (
+        old.refresh_token == new.refresh_token
+        and old.client_id == new.client_id
+        and old.client_secret == new.client_secret
+        and old.token_uri == new.token_uri
+        and old.scopes == new.scopes
+    )
+
+
 class AuthManager:
     """Manages OAuth2 authentication for multiple Gmail users."""
 
-    def __init__(self, config_dir: Optional[Path] = None):
-        """Initialize auth manager with configuration directory."""
+    def __init__(
+        self,
+        config_dir: Optional[Path] = None,
+        token_store: Optional[TokenStore] = None,
+    ):
+        """Initialize auth manager with configuration directory.
+
+        Tokens are kept in token_store, by default the GMAIL_MCP_TOKEN_STORE
+        backend under config_dir.
+        """
         self.config_dir = config_dir or Path.home() / ".gmail-mcp"
         self.config_dir.mkdir(exist_ok=True)
 
-        self.tokens_dir = self.config_dir / "tokens"
-        self.tokens_dir.mkdir(exist_ok=True)
+        self.token_store = token_store or open_token_store(TOKEN_STORE, self.config_dir)
 
         self.credentials_file = self.config_dir / "credentials.json"
         self.current_user_file = self.config_dir / "current_user.json"
         self.key_file = self.config_dir / ".key"
+        # Lock files that serialize changes across server processes
+        self.locks_dir = self.config_dir / "locks"
+
+        # Callbacks told when a user's stored credentials stop being valid
+        self._invalidation_listeners: List[Callable[[str], None]] = []
+
+        # Decrypted state reused across calls while its source is unchanged;
+        # each entry is keyed by the signature or version of its source
+        self._cache_lock = threading.Lock()
+        self._cipher: Optional[Tuple[FileSignature, Fernet]] = None
+        self._current_user: Optional[Tuple[FileSignature, Optional[str]]] = None
+        self._credentials: Dict[str, Tuple[TokenVersion, Credentials]] = {}
+        self._refresh_locks: Dict[str, threading.Lock] = {}
 
         self._ensure_encryption_key()
 
+    def add_invalidation_listener(self, listener: Callable[[str], None]) -> None:
+        """Register a callback run when a user's credentials change or go away."""
+        self._invalidation_listeners.append(listener)
+
+    def _notify_invalidation(self, email: str) -> None:
+        """Tell registered listeners that a user's credentials changed."""
+        for listener in self._invalidation_listeners:
+            try:
+                listener(email)
+            except Exception:
+                # A misbehaving listener must not break authentication
+                pass
+
+    def _process_lock(self, name: str) -> InterProcessLock:
+        """A lock shared with other processes using this config directory."""
+        return InterProcessLock(self.locks_dir / f"{name}.lock")
+
     def _ensure_encryption_key(self) -> None:
         """Ensure encryption key exists for token storage."""
-        if not self.key_file.exists():
-            key = Fernet.generate_key()
-            self.key_file.write_bytes(key)
-            self.key_file.chmod(0o600)  # Owner read/write only
+        if self.key_file.exists():
+            return
+        # Two processes starting together must not both create a key
+        with self._process_lock("config"):
+            if not self.key_file.exists():
+                atomic_write(self.key_file, Fernet.generate_key())
 
     def _get_cipher(self) -> Fernet:
-        """Get encryption cipher for token storage."""
-        key = self.key_file.read_bytes()
-        return Fernet(key)
+        """Get the token cipher, rereading the key file only when it changes."""
+        signature = file_signature(self.key_file)
+        with self._cache_lock:
+            if self._cipher is not None and self._cipher[0] == signature:
+                return self._cipher[1]
+
+        cipher = Fernet(self.key_file.read_bytes())
+        with self._cache_lock:
+            self._cipher = (signature, cipher)
+        return cipher
+
+    def _cache_credentials(
+        self, email: str, version: TokenVersion, creds: Credentials
+    ) -> None:
+        """Remember decrypted credentials for a version of the user's record."""
+        with self._cache_lock:
+            self._credentials[email] = (version, creds)
+
+    def _forget_credentials(self, email: str) -> None:
+        """Drop a user's cached credentials."""
+        with self._cache_lock:
+            self._credentials.pop(email, None)
 
     def _encrypt_data(self, data: Dict[str, Any]) -> bytes:
         """Encrypt data for secure storage."""
@@ -65,10 +154,9 @@ class AuthManager:
         with open(credentials_path, "r") as src:
             credentials_data = json.load(src)
 
-        with open(self.credentials_file, "w") as dst:
-            json.dump(credentials_data, dst, indent=2)
-
-        self.credentials_file.chmod(0o600)
+        atomic_write(
+            self.credentials_file, json.dumps(credentials_data, indent=2).encode()
+        )
 
     def authenticate_user(self, email: Optional[str] = None) -> str:
         """Authenticate a user and return their email address."""
@@ -90,13 +178,25 @@ class AuthManager:
             creds = flow.run_console()
 
         # Get user info to determine email
-        from googleapiclient.discovery import build
+        from .discovery import build_gmail_service
 
-        service = build("gmail", "v1", credentials=creds)
-        profile = service.users().getProfile(userId="me").execute()
+        service = build_gmail_service(credentials=creds)
+        profile = (
+            service.users().getProfile(userId="me", fields="emailAddress").execute()
+        )
         user_email = profile["emailAddress"]
 
         # Store encrypted tokens
+        self._store_credentials(user_email, creds)
+        self._notify_invalidation(user_email)
+
+        # Set as current user
+        self.set_current_user(user_email)
+
+        return user_email
+
+    def _store_credentials(self, email: str, creds: Credentials) -> None:
+        """Encrypt a user's credentials into the token store and cache them."""
         token_data = {
             "token": creds.token,
             "refresh_token": creds.refresh_token,
@@ -104,100 +204,212 @@ class AuthManager:
             "client_id": creds.client_id,
             "client_secret": creds.client_secret,
             "scopes": creds.scopes,
-            "email": user_email,
+            "email": email,
+            "expiry": creds.expiry.isoformat() if creds.expiry else None,
         }
+        version = self.token_store.put(email, self._encrypt_data(token_data))
+        self._cache_credentials(email, version, creds)
+
+    def _load_credentials(self, email: str) -> Optional[Credentials]:
+        """Load a user's credentials as stored, without refreshing them.
+
+        Decrypted credentials are cached per user and reused until the stored
+        record changes, so the common case costs one stat call or one indexed
+        lookup. When another process has refreshed the token, the cached
+        Credentials object is updated in place, so clients holding it use
+        the new token; any other change (e.g. a new login) replaces it and
+        notifies invalidation listeners.
+        """
+        version = self.token_store.version(email)
+        if version is None:
+            self._forget_credentials(email)
+            return None
 
-        token_file = self.tokens_dir / f"{user_email}.json"
-        encrypted_data = self._encrypt_data(token_data)
-        token_file.write_bytes(encrypted_data)
-        token_file.chmod(0o600)
+        with self._cache_lock:
+            cached = self._credentials.get(email)
+        if cached is not None and cached[0] == version:
+            metrics.increment("credential_cache_hits", email)
+            return cached[1]
+        metrics.increment("credential_cache_misses", email)
 
-        # Set as current user
-        self.set_current_user(user_email)
+        record = self.token_store.get(email)
+        if record is None:
+            self._forget_credentials(email)
+            return None
+        version, encrypted = record
+        token_data = self._decrypt_data(encrypted)
+        expiry = token_data.get("expiry")
+        creds = Credentials(
+            token=token_data["token"],
+            refresh_token=token_data["refresh_token"],
+            token_uri=token_data["token_uri"],
+            client_id=token_data["client_id"],
+            client_secret=token_data["client_secret"],
+            scopes=token_data["scopes"],
+            # Tokens stored before expiry was recorded have none
+            expiry=datetime.fromisoformat(expiry) if expiry else None,
+        )
 
-        return user_email
+        replaced = False
+        if cached is not None:
+            previous = cached[1]
+            if _same_grant(previous, creds):
+                previous.token = creds.token
+                previous.expiry = creds.expiry
+                creds = previous
+            else:
+                replaced = True
+        self._cache_credentials(email, version, creds)
+        if replaced:
+            self._notify_invalidation(email)
+        return creds
+
+    def _refresh_lock(self, email: str) -> threading.Lock:
+        """The lock that lets one thread per user at a time refresh."""
+        with self._cache_lock:
+            lock = self._refresh_locks.get(email)
+            if lock is None:
+                lock = self._refresh_locks[email] = threading.Lock()
+            return lock
+
+    def refresh_credentials(
+        self,
+        email: str,
+        margin: Optional[float] = None,
+        stale_token: Optional[str] = None,
+    ) -> Optional[Credentials]:
+        """Refresh a user's access token if it needs it, once per user at a time.
+
+        With margin=None the token is refreshed only once it is no longer
+        valid; with a margin in seconds, also when it expires within that
+        margin or its expiry is unknown. stale_token, a token Gmail just
+        rejected, is refreshed even if it looks valid, unless the stored token
+        has already been replaced. Refreshes are serialized per user
+        across threads and, through a lock file, across server processes; a
+        caller that waited for another refresh reloads the stored token and
+        uses it instead of refreshing again. The new token is written back
+        to the token store and the cached Credentials object is updated in
+        place, so clients holding it pick it up. Returns None if the grant
+        was rejected (e.g. access revoked); transient failures are raised.
+        """
+        with self._refresh_lock(email), self._process_lock(f"refresh-{email}"):
+            creds = self._load_credentials(email)
+            if creds is None:
+                return None
+            if (
+                creds.valid
+                and creds.token != stale_token
+                and (
+                    margin is None
+                    or (
+                        creds.expiry is not None
+                        and creds.expiry - timedelta(seconds=margin) > _utcnow()
+                    )
+                )
+            ):
+                metrics.increment("token_refresh_shared", email)
+                return creds
+            if not creds.refresh_token:
+                self._forget_credentials(email)
+                self._notify_invalidation(email)
+                return None
+
+            try:
+                creds.refresh(Request())
+            except RefreshError as e:
+                if getattr(e, "retryable", False):
+                    raise
+                self._forget_credentials(email)
+                self._notify_invalidation(email)
+                return None
+            metrics.increment("token_refreshes", email)
+            self._store_credentials(email, creds)
+            return creds
 
     def get_credentials(self, email: Optional[str] = None) -> Optional[Credentials]:
-        """Get credentials for a user (current user if email not specified)."""
+        """Get credentials for a user (current user if email not specified).
+
+        The same cached Credentials object is returned on each call while the
+        stored record is unchanged. An expired token is refreshed here, unless a
+        refresh already under way (see refresh_credentials) renews it first.
+        Returns None if the user has no usable credentials; a refresh that
+        fails transiently (e.g. network down) raises and keeps them stored.
+        """
         if email is None:
             email = self.get_current_user()
 
         if not email:
             return None
 
-        token_file = self.tokens_dir / f"{email}.json"
-        if not token_file.exists():
-            return None
-
         try:
-            encrypted_data = token_file.read_bytes()
-            token_data = self._decrypt_data(encrypted_data)
-
-            creds = Credentials(
-                token=token_data["token"],
-                refresh_token=token_data["refresh_token"],
-                token_uri=token_data["token_uri"],
-                client_id=token_data["client_id"],
-                client_secret=token_data["client_secret"],
-                scopes=token_data["scopes"],
-            )
-
-            # Refresh token if needed
-            if not creds.valid:
-                if creds.expired and creds.refresh_token:
-                    creds.refresh(Request())
-                    # Update stored tokens
-                    token_data.update(
-                        {
-                            "token": creds.token,
-                            "refresh_token": creds.refresh_token,
-                        }
-                    )
-                    encrypted_data = self._encrypt_data(token_data)
-                    token_file.write_bytes(encrypted_data)
-                else:
-                    return None
-
-            return creds
-        except Exception:
+            creds = self._load_credentials(email)
+        except (InvalidToken, KeyError, ValueError):
+            # Undecryptable or malformed token record
+            self._forget_credentials(email)
+            self._notify_invalidation(email)
             return None
+        if creds is not None and not creds.valid:
+            creds = self.refresh_credentials(email)
+        return creds
 
     def get_current_user(self) -> Optional[str]:
-        """Get the currently active user email."""
-        if not self.current_user_file.exists():
+        """Get the currently active user email, rereading the file only on change."""
+        signature = file_signature(self.current_user_file)
+        if signature is None:
             return None
 
+        with self._cache_lock:
+            if self._current_user is not None and self._current_user[0] == signature:
+                return self._current_user[1]
+
         try:
             with open(self.current_user_file, "r") as f:
                 data = json.load(f)
-                return data.get("email")
+                email = data.get("email")
         except Exception:
             return None
 
+        with self._cache_lock:
+            self._current_user = (signature, email)
+        return email
+
     def set_current_user(self, email: str) -> None:
         """Set the currently active user."""
-        with open(self.current_user_file, "w") as f:
-            json.dump({"email": email}, f, indent=2)
-        self.current_user_file.chmod(0o600)
-
-    def list_users(self) -> List[str]:
-        """List all authenticated users."""
-        users = []
-        for token_file in self.tokens_dir.glob("*.json"):
-            email = token_file.stem
-            users.append(email)
-        return sorted(users)
+        signature = stat_signature(
+            atomic_write(
+                self.current_user_file, json.dumps({"email": email}, indent=2).encode()
+            )
+        )
+        with self._cache_lock:
+            self._current_user = (signature, email)
+
+    def list_users(
+        self, limit: Optional[int] = None, after: Optional[str] = None
+    ) -> List[str]:
+        """List authenticated users in sorted order.
+
+        Pass limit to get one page, and the last user of a page as after to
+        get the next one.
+        """
+        return self.token_store.list_users(limit=limit, after=after)
+
+    def has_user(self, email: str) -> bool:
+        """Whether a user has stored credentials, without loading them."""
+        return self.token_store.version(email) is not None
 
     def remove_user(self, email: str) -> bool:
         """Remove a user's authentication."""
-        token_file = self.tokens_dir / f"{email}.json"
-        if token_file.exists():
-            token_file.unlink()
-
-            # If this was the current user, clear current user
-            if self.get_current_user() == email:
-                if self.current_user_file.exists():
-                    self.current_user_file.unlink()
+        if self.token_store.delete(email):
+            self._forget_credentials(email)
+            self._notify_invalidation(email)
+
+            # If this was the current user, clear current user, unless
+            # another process switches users in between
+            with self._process_lock("config"):
+                if self.get_current_user() == email:
+                    self.current_user_file.unlink(missing_ok=True)
+                    with self._cache_lock:
+                        self._current_user = None
 
             return True
         return False
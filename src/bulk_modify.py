@@ -0,0 +1,132 @@
+"""Bulk label changes, archiving and trashing through messages.batchModify."""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .gmail_operations import BATCH_MODIFY_LIMIT, ClientCall
+from .metrics import metrics
+
+
+# Receives messages processed so far and the expected total, if known
+ProgressCallback = Callable[[int, Optional[int]], Awaitable[None]]
+
+
+async def resolve_labels(call: ClientCall, labels: Optional[List[str]]) -> List[str]:
+    """Map label names (case-insensitive) or IDs to label IDs."""
+    if not labels:
+        return []
+    known = await call("list_labels")
+    ids = {label["id"] for label in known}
+    by_name = {label["name"].lower(): label["id"] for label in known}
+
+    resolved, unknown = [], []
+    for label in labels:
+        if label in ids:
+            resolved.append(label)
+        elif label.lower() in by_name:
+            resolved.append(by_name[label.lower()])
+        else:
+            unknown.append(label)
+    if unknown:
+        raise ValueError(f"Unknown labels: {', '.join(unknown)}")
+    return resolved
+
+
+async def _id_chunks(
+    call: ClientCall,
+    query: Optional[str],
+    message_ids: Optional[List[str]],
+    include_spam_trash: bool,
+) -> AsyncIterator[Tuple[List[str], Optional[int]]]:
+    """Yield message IDs BATCH_MODIFY_LIMIT at a time, with the expected total.
+
+    A query is listed one page at a time, so only about one chunk of IDs is
+    held in memory.
+    """
+    if message_ids is not None:
+        for start in range(0, len(message_ids), BATCH_MODIFY_LIMIT):
+            yield message_ids[start : start + BATCH_MODIFY_LIMIT], len(message_ids)
+        return
+
+    pending: List[str] = []
+    estimate = None
+    page_token = None
+    while True:
+        page = await call(
+            "list_message_ids_page",
+            query,
+            page_token,
+            include_spam_trash=include_spam_trash,
+        )
+        if estimate is None:
+            estimate = page["result_size_estimate"]
+        pending.extend(page["ids"])
+        page_token = page["next_page_token"]
+        while len(pending) >= BATCH_MODIFY_LIMIT or (pending and not page_token):
+            yield pending[:BATCH_MODIFY_LIMIT], estimate
+            pending = pending[BATCH_MODIFY_LIMIT:]
+        if not page_token:
+            return
+
+
+async def modify_messages(
+    call: ClientCall,
+    add_label_ids: List[str],
+    remove_label_ids: List[str],
+    query: Optional[str] = None,
+    message_ids: Optional[List[str]] = None,
+    include_spam_trash: bool = False,
+    dry_run: bool = False,
+    progress: Optional[ProgressCallback] = None,
+) -> Dict[str, Any]:
+    """Apply label changes to every message matching a query, or to given IDs.
+
+    Matching IDs are listed page by page and modified in batchModify calls
+    of up to BATCH_MODIFY_LIMIT messages. Listing runs one chunk ahead, so
+    the next page is fetched while the current chunk is being modified.
+    With dry_run, messages are only counted.
+    """
+    if (query is None) == (message_ids is None):
+        raise ValueError("Give either a query or a list of message IDs")
+    if not dry_run and not add_label_ids and not remove_label_ids:
+        raise ValueError("No labels to add or remove")
+
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+    async def produce() -> None:
+        """List IDs into the queue, ending with None even if listing fails."""
+        try:
+            async for chunk in _id_chunks(call, query, message_ids, include_spam_trash):
+                await chunks.put(chunk)
+        except Exception:
+            await chunks.put(None)
+            raise
+        await chunks.put(None)
+
+    producer = asyncio.create_task(produce())
+    matched = modified = batches = 0
+    try:
+        while (item := await chunks.get()) is not None:
+            ids, expected = item
+            matched += len(ids)
+            if not dry_run:
+                modified += await call(
+                    "batch_modify_messages", ids, add_label_ids, remove_label_ids
+                )
+                batches += 1
+            if progress:
+                await progress(matched, expected)
+        # Surface a listing error after the chunks before it were applied
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+        metrics.increment("bulk_modified_messages", value=modified)
+        metrics.increment("bulk_modify_batches", value=batches)
+
+    return {
+        "matched": matched,
+        "modified": modified,
+        "batches": batches,
+        "dry_run": dry_run,
+    }
@@ -0,0 +1,103 @@
+"""Concurrent bulk delivery with per-message outcomes."""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .mime import build_mime_message, encode_raw_message, format_header
+from .models import BulkSendResult
+
+# A job is the recipient shown in results plus a coroutine factory that sends
+BulkJob = Tuple[str, Callable[[], Awaitable[Dict[str, Any]]]]
+
+
+class TemplateMessage:
+    """One message body shared by many recipients.
+
+    The MIME structure (headers other than To, Cc and Bcc, and all body
+    parts) is built once; each recipient's copy only prepends its own To
+    header. Cc and Bcc go on a single copy, so those addresses receive the
+    message once rather than once per recipient.
+    """
+
+    def __init__(
+        self,
+        sender: str,
+        subject: str,
+        body: str,
+        cc: Optional[str] = None,
+        bcc: Optional[str] = None,
+        html_body: Optional[str] = None,
+    ):
+        """Build the shared MIME message."""
+        self._shared = build_mime_message(
+            sender, None, subject, body, html_body=html_body
+        )
+        self._copies = (format_header("Cc", cc) if cc else b"") + (
+            format_header("Bcc", bcc) if bcc else b""
+        )
+
+    def raw_for(self, recipient: str, with_copies: bool = False) -> str:
+        """Return the base64url-encoded message addressed to recipient.
+
+        with_copies adds the Cc and Bcc headers to this copy.
+        """
+        headers = format_header("To", recipient)
+        if with_copies:
+            headers += self._copies
+        return encode_raw_message(headers + self._shared)
+
+    def jobs(
+        self,
+        recipients: Sequence[str],
+        send_raw: Callable[[str], Awaitable[Dict[str, Any]]],
+    ) -> List[BulkJob]:
+        """Send jobs for every recipient; the first copy carries Cc and Bcc."""
+        return [
+            (
+                recipient,
+                lambda recipient=recipient, first=index == 0: send_raw(
+                    self.raw_for(recipient, with_copies=first)
+                ),
+            )
+            for index, recipient in enumerate(recipients)
+        ]
+
+
+async def deliver_bulk(
+    jobs: Sequence[BulkJob],
+    concurrency: int,
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+) -> List[BulkSendResult]:
+    """Run send jobs with at most concurrency in flight.
+
+    A failed message never stops the others; results keep the input order.
+    on_progress(done, total) is awaited after each message completes.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results: List[Optional[BulkSendResult]] = [None] * len(jobs)
+    done = 0
+
+    async def run(index: int, to: str, send: Callable[[], Awaitable[Any]]) -> None:
+        nonlocal done
+        async with semaphore:
+            try:
+                sent = await send()
+                results[index] = BulkSendResult(
+                    index=index,
+                    to=to,
+                    status="sent",
+                    id=sent["id"],
+                    thread_id=sent["thread_id"],
+                )
+            except Exception as e:
+                results[index] = BulkSendResult(
+                    index=index, to=to, status="failed", error=str(e)
+                )
+        done += 1
+        if on_progress:
+            await on_progress(done, len(jobs))
+
+    await asyncio.gather(
+        *(run(index, to, send) for index, (to, send) in enumerate(jobs))
+    )
+    return results
@@ -0,0 +1,91 @@
+"""LRU pool of per-user Gmail clients reused across tool calls."""
+
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple, Any, Callable
+from google.oauth2.credentials import Credentials
+
+from .gmail_client import GmailClient
+
+
+def _credentials_fingerprint(credentials: Credentials) -> Tuple[Any, ...]:
+    """Identify the grant a client was built for.
+
+    The access token is deliberately left out: it changes on every refresh,
+    which the pooled client's own transport already handles.
+    """
+    return (
+        credentials.refresh_token,
+        credentials.client_id,
+        tuple(sorted(credentials.scopes or [])),
+    )
+
+
+class ClientPool:
+    """Keeps built Gmail clients keyed by user email, evicting least recently used."""
+
+    def __init__(
+        self,
+        max_size: int = 32,
+        client_factory: Callable[..., Any] = GmailClient,
+    ):
+        """Initialize an empty pool holding at most max_size clients.
+
+        client_factory is called as client_factory(credentials, user_email=...)
+        and selects the backend (GmailClient or AsyncGmailClient).
+        """
+        if max_size < 1:
+            raise ValueError("Client pool size must be at least 1")
+        self.max_size = max_size
+        self.client_factory = client_factory
+        self._clients: "OrderedDict[str, Tuple[Tuple[Any, ...], GmailClient]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, email: str, credentials: Credentials) -> GmailClient:
+        """Return the pooled client for a user, building one if needed."""
+        fingerprint = _credentials_fingerprint(credentials)
+
+        with self._lock:
+            entry = self._clients.get(email)
+            if entry is not None and entry[0] == fingerprint:
+                self._clients.move_to_end(email)
+                return entry[1]
+
+        # Build outside the lock so one slow build doesn't stall other users
+        client = self.client_factory(credentials, user_email=email)
+
+        with self._lock:
+            entry = self._clients.get(email)
+            if entry is not None and entry[0] == fingerprint:
+                # Another caller won the race; keep the existing client
+                self._clients.move_to_end(email)
+                return entry[1]
+
+            self._clients[email] = (fingerprint, client)
+            self._clients.move_to_end(email)
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+
+        return client
+
+    def peek(self, email: str) -> Optional[GmailClient]:
+        """Return the pooled client for a user without building or reordering."""
+        with self._lock:
+            entry = self._clients.get(email)
+            return entry[1] if entry is not None else None
+
+    def invalidate(self, email: str) -> None:
+        """Drop the pooled client for a user, if any."""
+        with self._lock:
+            self._clients.pop(email, None)
+
+    def clear(self) -> None:
+        """Drop all pooled clients."""
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients)
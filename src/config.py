@@ -0,0 +1,138 @@
+"""Runtime configuration for Gmail MCP server, read from environment variables."""
+
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment, falling back to default."""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Environment variable {name} must be an integer: {value}")
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment, falling back to default."""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"Environment variable {name} must be a number: {value}")
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting (1/0, true/false, yes/no, on/off)."""
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    value = value.strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"Environment variable {name} must be a boolean: {value}")
+
+
+def _env_choice(name: str, default: str, choices: tuple) -> str:
+    """Read a setting restricted to a fixed set of values."""
+    value = os.environ.get(name, "").strip().lower() or default
+    if value not in choices:
+        raise ValueError(
+            f"Environment variable {name} must be one of {', '.join(choices)}: {value}"
+        )
+    return value
+
+
+# Maximum number of per-user Gmail clients kept alive between tool calls
+CLIENT_POOL_SIZE = _env_int("GMAIL_MCP_CLIENT_POOL_SIZE", 32)
+
+# Seconds a user's Gmail profile (address and mailbox totals) is cached
+PROFILE_CACHE_TTL = _env_int("GMAIL_MCP_PROFILE_CACHE_TTL", 300)
+
+# Requests per Gmail batch call; Gmail accepts up to 100 but throttles above 50
+BATCH_SIZE = min(_env_int("GMAIL_MCP_BATCH_SIZE", 50), 100)
+
+# Worker threads for blocking Gmail calls, and how many one user may hold;
+# freed slots go to waiting users in turn
+MAX_WORKERS = _env_int("GMAIL_MCP_MAX_WORKERS", 16)
+MAX_WORKERS_PER_USER = _env_int("GMAIL_MCP_MAX_WORKERS_PER_USER", 4)
+
+# Calls of the async backend in flight at once and per user; they need no
+# worker thread, so the limits are far above the thread pool's
+ASYNC_MAX_CALLS = _env_int("GMAIL_MCP_ASYNC_MAX_CALLS", 256)
+ASYNC_MAX_CALLS_PER_USER = _env_int("GMAIL_MCP_ASYNC_MAX_CALLS_PER_USER", 32)
+
+# Gmail transport: "sync" (googleapiclient on the executor) or "async" (httpx)
+BACKEND = _env_choice("GMAIL_MCP_BACKEND", "sync", ("sync", "async"))
+
+# Connection pool shared by all users of the async backend
+HTTP_MAX_CONNECTIONS = _env_int("GMAIL_MCP_HTTP_MAX_CONNECTIONS", 10)
+HTTP_KEEPALIVE_EXPIRY = _env_int("GMAIL_MCP_HTTP_KEEPALIVE_EXPIRY", 60)
+HTTP_TIMEOUT = _env_int("GMAIL_MCP_HTTP_TIMEOUT", 60)
+# Negotiate HTTP/2 when the optional h2 package is installed
+HTTP2 = _env_bool("GMAIL_MCP_HTTP2", True)
+
+# Retries for transient Gmail errors (429, 5xx, rate-limit 403s, network errors)
+RETRY_MAX_ATTEMPTS = _env_int("GMAIL_MCP_RETRY_MAX_ATTEMPTS", 5)
+RETRY_BASE_DELAY = _env_float("GMAIL_MCP_RETRY_BASE_DELAY", 0.5)
+RETRY_MAX_DELAY = _env_float("GMAIL_MCP_RETRY_MAX_DELAY", 32.0)
+
+# Per-user circuit breaker: consecutive failures before failing fast, and
+# seconds to wait before letting a trial request through
+CIRCUIT_FAILURE_THRESHOLD = _env_int("GMAIL_MCP_CIRCUIT_FAILURE_THRESHOLD", 5)
+CIRCUIT_RESET_TIMEOUT = _env_float("GMAIL_MCP_CIRCUIT_RESET_TIMEOUT", 30.0)
+
+# Client-side pacing against Gmail's per-user quota (250 units/s by default);
+# DAILY_QUOTA_UNITS of 0 means no daily budget is enforced
+QUOTA_UNITS_PER_SECOND = _env_float("GMAIL_MCP_QUOTA_UNITS_PER_SECOND", 250.0)
+QUOTA_BURST_UNITS = _env_float("GMAIL_MCP_QUOTA_BURST_UNITS", 250.0)
+DAILY_QUOTA_UNITS = _env_int("GMAIL_MCP_DAILY_QUOTA_UNITS", 0)
+
+# Messages of one send_bulk_emails call in flight at once
+BULK_SEND_CONCURRENCY = _env_int("GMAIL_MCP_BULK_SEND_CONCURRENCY", 8)
+
+# Messages with attachments larger than this many bytes are sent with Gmail's
+# resumable media upload instead of inline base64 "raw" JSON
+RESUMABLE_UPLOAD_THRESHOLD = _env_int(
+    "GMAIL_MCP_RESUMABLE_UPLOAD_THRESHOLD", 5 * 1024 * 1024
+)
+# Directory attachments must be read from; empty allows any readable file
+# outside the config directory, which holds the encryption key and tokens
+ATTACHMENT_DIR = os.environ.get("GMAIL_MCP_ATTACHMENT_DIR", "").strip()
+# Bytes per resumable upload request, rounded down to Gmail's 256 KiB granularity
+UPLOAD_CHUNK_GRANULARITY = 256 * 1024
+UPLOAD_CHUNK_SIZE = max(
+    UPLOAD_CHUNK_GRANULARITY,
+    _env_int("GMAIL_MCP_UPLOAD_CHUNK_SIZE", 16 * UPLOAD_CHUNK_GRANULARITY)
+    // UPLOAD_CHUNK_GRANULARITY
+    * UPLOAD_CHUNK_GRANULARITY,
+)
+
+# Optional local full-text index: messages fetched when it is first built,
+# and characters of each message's text that are indexed
+LOCAL_INDEX_MAX_MESSAGES = _env_int("GMAIL_MCP_LOCAL_INDEX_MAX_MESSAGES", 5000)
+LOCAL_INDEX_MAX_BODY_CHARS = _env_int("GMAIL_MCP_LOCAL_INDEX_MAX_BODY_CHARS", 100_000)
+
+# Threads kept per user by get_thread so their parts can be read without
+# refetching, and characters of a part returned per get_message_part call
+THREAD_CACHE_SIZE = _env_int("GMAIL_MCP_THREAD_CACHE_SIZE", 20)
+PART_TEXT_PAGE_CHARS = _env_int("GMAIL_MCP_PART_TEXT_PAGE_CHARS", 20_000)
+
+# Directory get_message_part saves parts into, with save_path relative to it;
+# empty means downloads/ under the config directory
+DOWNLOAD_DIR = os.environ.get("GMAIL_MCP_DOWNLOAD_DIR", "").strip()
+
+# Where users' encrypted tokens are kept: "file" (one file per user under
+# tokens/) or "sqlite" (tokens.db, indexed and suited to many accounts)
+TOKEN_STORE = _env_choice("GMAIL_MCP_TOKEN_STORE", "file", ("file", "sqlite"))
+
+# Renew access tokens in the background this many seconds before they
+# expire, retrying failed renewals after TOKEN_REFRESH_RETRY_DELAY seconds
+TOKEN_REFRESH_AHEAD = _env_bool("GMAIL_MCP_TOKEN_REFRESH_AHEAD", True)
+TOKEN_REFRESH_MARGIN = _env_float("GMAIL_MCP_TOKEN_REFRESH_MARGIN", 300.0)
+TOKEN_REFRESH_RETRY_DELAY = _env_float("GMAIL_MCP_TOKEN_REFRESH_RETRY_DELAY", 30.0)
@@ -0,0 +1,109 @@
+"""Gmail service construction from the bundled, pinned discovery document."""
+
+import json
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+from googleapiclient.discovery import build_from_document
+from googleapiclient.http import BatchHttpRequest, build_http
+from google.oauth2.credentials import Credentials
+
+# Pinned copy of the Gmail v1 discovery document (revision 20250630)
+GMAIL_DISCOVERY_DOCUMENT = Path(__file__).parent / "gmail.v1.json"
+
+# googleapiclient fixes up method descriptions in place while building
+# resources, so builds from the shared document are serialized.
+_build_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def load_gmail_discovery_document() -> Dict[str, Any]:
+    """Load and parse the bundled discovery document once per process."""
+    with open(GMAIL_DISCOVERY_DOCUMENT, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_gmail_service(
+    credentials: Optional[Credentials] = None, http: Optional[Any] = None, **kwargs
+) -> Any:
+    """Build a Gmail v1 service without fetching or re-parsing discovery JSON."""
+    document = load_gmail_discovery_document()
+    with _build_lock:
+        return build_from_document(
+            document, credentials=credentials, http=http, **kwargs
+        )
+
+
+@lru_cache(maxsize=1)
+def shared_gmail_resources() -> "GmailResources":
+    """The process-wide Gmail resource tree, built on first use.
+
+    It is built without credentials and only constructs requests; clients
+    send them with their own authorized transport (request.execute(http=...)
+    or httpx), so building a client costs nothing per credential.
+    """
+    return GmailResources(build_gmail_service(http=build_http()))
+
+
+class GmailResources:
+    """Resource nodes of a built Gmail service, each created once on first use.
+
+    Every ``service.users()`` call constructs a fresh Resource and regenerates
+    its methods from the discovery document, so clients hold on to these.
+    """
+
+    def __init__(self, service: Any):
+        """Wrap a built service; nested resources are resolved lazily."""
+        self._service = service
+        self._nodes: Dict[str, Any] = {}
+
+    def _node(self, name: str, parent: Any) -> Any:
+        """Return a cached child resource of parent, building it on first use."""
+        node = self._nodes.get(name)
+        if node is None:
+            with _build_lock:
+                node = self._nodes.get(name)
+                if node is None:
+                    node = getattr(parent, name)()
+                    self._nodes[name] = node
+        return node
+
+    def new_batch_http_request(self, **kwargs) -> BatchHttpRequest:
+        """Start a batch request against the service's batch endpoint."""
+        return self._service.new_batch_http_request(**kwargs)
+
+    @property
+    def users(self) -> Any:
+        """The users resource."""
+        return self._node("users", self._service)
+
+    @property
+    def drafts(self) -> Any:
+        """The users.drafts resource."""
+        return self._node("drafts", self.users)
+
+    @property
+    def messages(self) -> Any:
+        """The users.messages resource."""
+        return self._node("messages", self.users)
+
+    @property
+    def history(self) -> Any:
+        """The users.history resource."""
+        return self._node("history", self.users)
+
+    @property
+    def labels(self) -> Any:
+        """The users.labels resource."""
+        return self._node("labels", self.users)
+
+    @property
+    def threads(self) -> Any:
+        """The users.threads resource."""
+        return self._node("threads", self.users)
+
+    @property
+    def attachments(self) -> Any:
+        """The users.messages.attachments resource."""
+        return self._node("attachments", self.messages)
@@ -0,0 +1,127 @@
+"""Per-user draft metadata cache kept current with the Gmail history API."""
+
+import asyncio
+import base64
+import binascii
+from typing import Any, Dict, List, Optional, Tuple
+
+from .gmail_operations import ClientCall, HistoryExpiredError
+from .metrics import metrics
+from .registry import UserRegistry
+
+
+_CURSOR_PREFIX = "drafts:"
+
+
+def encode_cursor(offset: int) -> str:
+    """Opaque page token for a position in a cached listing."""
+    return base64.urlsafe_b64encode(f"{_CURSOR_PREFIX}{offset}".encode()).decode()
+
+
+def decode_cursor(token: Optional[str]) -> int:
+    """Position encoded in a page token from encode_cursor (0 for none)."""
+    if not token:
+        return 0
+    try:
+        value = base64.urlsafe_b64decode(token.encode()).decode()
+        if value.startswith(_CURSOR_PREFIX):
+            return max(0, int(value[len(_CURSOR_PREFIX) :]))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        pass
+    raise ValueError(f"Invalid page token: {token}")
+
+
+class DraftCache:
+    """One user's drafts with Subject/To/snippet, synchronized incrementally.
+
+    The first listing fetches every draft and remembers the mailbox history
+    ID. Later listings ask history.list for DRAFT changes since that ID; when
+    there are none the cache is served as is, and when there are, only draft
+    IDs are relisted and headers are fetched for new or edited drafts. If
+    Gmail has expired the history ID, the cache is rebuilt from scratch.
+    """
+
+    def __init__(self, user: str):
+        """Initialize an empty cache that syncs on first use."""
+        self.user = user
+        self.history_id: Optional[str] = None
+        self._drafts: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+
+    async def drafts(self, call: ClientCall) -> List[Dict[str, Any]]:
+        """Bring the cache up to date and return all drafts in listing order."""
+        async with self._lock:
+            if self.history_id is None:
+                await self._resync(call)
+            else:
+                try:
+                    delta = await call("list_history", self.history_id, "DRAFT")
+                except HistoryExpiredError:
+                    metrics.increment("draft_cache_expired", self.user)
+                    await self._resync(call)
+                else:
+                    if delta["changed"]:
+                        await self._apply_changes(call)
+                    else:
+                        metrics.increment("draft_cache_hits", self.user)
+                    self.history_id = delta["history_id"]
+            return list(self._drafts.values())
+
+    async def _resync(self, call: ClientCall) -> None:
+        """Rebuild the cache from a full listing."""
+        metrics.increment("draft_cache_resyncs", self.user)
+        # Take the history ID first so changes made during the listing are
+        # replayed by the next delta rather than lost
+        history_id = await call("get_history_id")
+        refs = await call("list_draft_refs")
+        details = await call("get_draft_details", refs)
+        self._drafts = {draft["id"]: draft for draft in details}
+        self.history_id = history_id
+
+    async def _apply_changes(self, call: ClientCall) -> None:
+        """Relist draft IDs and fetch headers only for new or edited drafts."""
+        metrics.increment("draft_cache_deltas", self.user)
+        refs = await call("list_draft_refs")
+        # Editing a draft replaces its message, so a new message ID means
+        # its headers may have changed
+        stale = [
+            ref
+            for ref in refs
+            if self._drafts.get(ref["id"], {}).get("message_id") != ref["message"]["id"]
+        ]
+        fresh = {
+            draft["id"]: draft
+            for draft in (await call("get_draft_details", stale) if stale else [])
+        }
+        metrics.increment("draft_cache_fetched", self.user, len(fresh))
+
+        drafts = {}
+        for ref in refs:
+            draft = fresh.get(ref["id"]) or self._drafts.get(ref["id"])
+            if draft is not None and draft["message_id"] == ref["message"]["id"]:
+                drafts[ref["id"]] = draft
+        self._drafts = drafts
+
+    async def page(
+        self, call: ClientCall, max_results: int, page_token: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of drafts and the token for the next page, if any."""
+        start = decode_cursor(page_token)
+        drafts = await self.drafts(call)
+        end = start + max(1, max_results)
+        return drafts[start:end], (encode_cursor(end) if end < len(drafts) else None)
+
+
+class DraftCacheRegistry(UserRegistry[DraftCache]):
+    """Draft caches for every user seen by this process."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        super().__init__(DraftCache)
+
+    def invalidate(self, user: str) -> None:
+        """Drop a user's cache so the next listing resyncs."""
+        self.pop(user)
+
+
+draft_caches = DraftCacheRegistry()
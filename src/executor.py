@@ -0,0 +1,139 @@
+"""Bounded executor that keeps blocking Gmail I/O off the asyncio event loop."""
+
+import asyncio
+import functools
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional
+
+
+class FairScheduler:
+    """Shares a fixed number of slots between users in round-robin order.
+
+    At most capacity calls hold a slot at once, and at most per_user_limit
+    of them belong to one user. When a slot frees up it goes to the next
+    user in turn who has a call waiting, so an account with a long queue of
+    calls waits behind every other account's next call instead of ahead of
+    them. Slots must be taken and released on one event loop.
+    """
+
+    def __init__(self, capacity: int, per_user_limit: int):
+        """Initialize a scheduler with total and per-user slot limits."""
+        if capacity < 1 or per_user_limit < 1:
+            raise ValueError("Scheduler limits must be at least 1")
+        self.capacity = capacity
+        self.per_user_limit = min(per_user_limit, capacity)
+        self._active = 0
+        self._user_active: Dict[str, int] = {}
+        # Users with calls waiting, in the order they are next served
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    def _can_start(self, user: str) -> bool:
+        """Whether a slot is free for the user right now."""
+        return (
+            self._active < self.capacity
+            and self._user_active.get(user, 0) < self.per_user_limit
+        )
+
+    def _start(self, user: str) -> None:
+        """Count a slot as taken by the user."""
+        self._active += 1
+        self._user_active[user] = self._user_active.get(user, 0) + 1
+
+    def _release(self, user: str) -> None:
+        """Free one of the user's slots and hand free slots to waiting users."""
+        self._active -= 1
+        remaining = self._user_active[user] - 1
+        if remaining:
+            self._user_active[user] = remaining
+        else:
+            del self._user_active[user]
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant free slots to the waiting users next in turn."""
+        while self._active < self.capacity:
+            for user, queue in self._waiting.items():
+                if self._user_active.get(user, 0) < self.per_user_limit:
+                    break
+            else:
+                return
+            waiter = queue.popleft()
+            if queue:
+                self._waiting.move_to_end(user)
+            else:
+                del self._waiting[user]
+            # Skip calls cancelled since they queued; their tasks haven't
+            # run their cancellation handling yet
+            if waiter.done():
+                continue
+            self._start(user)
+            waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, user: str) -> AsyncIterator[None]:
+        """Hold one of the user's slots for the duration of the block."""
+        # Start at once only if the user has no earlier call still waiting
+        if user not in self._waiting and self._can_start(user):
+            self._start(user)
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiting.setdefault(user, deque()).append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if not waiter.cancelled():
+                    # Granted a slot just as the call was cancelled
+                    self._release(user)
+                else:
+                    # Still queued, unless _dispatch already skipped it
+                    queue = self._waiting.get(user)
+                    if queue is not None and waiter in queue:
+                        queue.remove(waiter)
+                        if not queue:
+                            del self._waiting[user]
+                raise
+        try:
+            yield
+        finally:
+            self._release(user)
+
+
+class GmailExecutor:
+    """Runs blocking Gmail calls on a shared thread pool.
+
+    Each user may occupy at most per_user_limit workers at a time, and
+    workers are handed to users in turn, so one account with a burst of
+    slow sends cannot starve the others.
+    """
+
+    def __init__(self, max_workers: int = 16, per_user_limit: int = 4):
+        """Initialize executor with total and per-user concurrency limits."""
+        if max_workers < 1 or per_user_limit < 1:
+            raise ValueError("Executor limits must be at least 1")
+        self.max_workers = max_workers
+        self.per_user_limit = min(per_user_limit, max_workers)
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="gmail-io"
+        )
+        self._scheduler = FairScheduler(max_workers, self.per_user_limit)
+
+    async def run(
+        self, user: Optional[str], func: Callable[..., Any], *args, **kwargs
+    ) -> Any:
+        """Run func(*args, **kwargs) on the pool and await its result.
+
+        Calls made before the user is known (e.g. loading credentials) pass
+        user=None and only count against the shared pool.
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        if user is None:
+            return await loop.run_in_executor(self._pool, call)
+        async with self._scheduler.slot(user):
+            return await loop.run_in_executor(self._pool, call)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work and release the worker threads."""
+        self._pool.shutdown(wait=wait)
@@ -1,32 +1,113 @@
 """Gmail API client wrapper for sending emails."""
 
-import base64
-from email.message import EmailMessage
-from typing import Optional, List, Dict, Any
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import threading
+import time
+from typing import Optional, List, Dict, Any, Iterator, Sequence, Tuple
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.http import HttpRequest, build_http
 from google.oauth2.credentials import Credentials
 
+from . import gmail_operations as operations
+from .attachments import resolve_attachments
+from .config import BATCH_SIZE, PROFILE_CACHE_TTL
+from .discovery import shared_gmail_resources
+from .gmail_operations import (
+    DRAFTS_PAGE_LIMIT,
+    MESSAGES_PAGE_LIMIT,
+    Batch,
+    Call,
+    Operation,
+    Step,
+    T,
+    drive,
+)
+from .metrics import metrics
+from .rate_limiter import rate_limiter, request_units
+from .retry import (
+    CircuitBreaker,
+    call_with_retry,
+    circuit_breakers,
+    default_policy,
+    is_retryable,
+)
+
 
 class GmailClient:
-    """Gmail API client for email operations."""
+    """Gmail API client for email operations.
+
+    Requests are built and responses shaped by gmail_operations; this client
+    sends them with googleapiclient from worker threads, and batches reads
+    through Gmail's batch endpoint.
+    """
 
-    def __init__(self, credentials: Credentials):
-        """Initialize Gmail client with OAuth2 credentials."""
+    def __init__(
+        self,
+        credentials: Credentials,
+        user_email: Optional[str] = None,
+        profile_ttl: int = PROFILE_CACHE_TTL,
+    ):
+        """Initialize Gmail client with OAuth2 credentials.
+
+        When the account's address is already known (e.g. from the token
+        store) it is used as the sender without a profile lookup.
+        """
         self.credentials = credentials
-        self.service = build("gmail", "v1", credentials=credentials)
-
-    def get_user_info(self) -> Dict[str, Any]:
-        """Get current user's Gmail profile information."""
-        try:
-            profile = self.service.users().getProfile(userId="me").execute()
-            return {
-                "email": profile.get("emailAddress"),
-                "messages_total": profile.get("messagesTotal", 0),
-                "threads_total": profile.get("threadsTotal", 0),
-            }
-        except HttpError as e:
-            raise Exception(f"Failed to get user info: {e}")
+        self.user_email = user_email
+
+        # httplib2.Http is not thread-safe, so every worker thread gets its
+        # own authorized transport, reused across that thread's requests.
+        # Requests come from the shared resource tree and are sent with it.
+        self._local = threading.local()
+        self.api = shared_gmail_resources()
+
+        # Cached users.getProfile result, shared by all methods of this client
+        self.profile_ttl = profile_ttl
+        self._profile: Optional[Dict[str, Any]] = None
+        self._profile_expires_at = 0.0
+        self._profile_lock = threading.Lock()
+
+    def _thread_http(self) -> AuthorizedHttp:
+        """Get the calling thread's authorized HTTP transport."""
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = AuthorizedHttp(self.credentials, http=build_http())
+            self._local.http = http
+        return http
+
+    def get_user_info(self, refresh: bool = False) -> Dict[str, Any]:
+        """Get current user's Gmail profile information.
+
+        Served from cache for up to profile_ttl seconds unless refresh is set.
+        """
+        with self._profile_lock:
+            if (
+                not refresh
+                and self._profile is not None
+                and time.monotonic() < self._profile_expires_at
+            ):
+                return dict(self._profile)
+
+            self._profile = self._run(operations.get_profile(self.api))
+            self._profile_expires_at = time.monotonic() + self.profile_ttl
+            if self._profile["email"]:
+                self.user_email = self._profile["email"]
+            return dict(self._profile)
+
+    def refresh_profile(self) -> Dict[str, Any]:
+        """Refetch the cached profile from Gmail."""
+        return self.get_user_info(refresh=True)
+
+    def invalidate_profile(self) -> None:
+        """Drop the cached profile so the next lookup hits Gmail."""
+        with self._profile_lock:
+            self._profile = None
+            self._profile_expires_at = 0.0
+
+    def get_sender_address(self) -> str:
+        """Get the address used in the From header of outgoing messages."""
+        if self.user_email:
+            return self.user_email
+        return self.get_user_info()["email"]
 
     def send_email(
         self,
@@ -36,49 +117,28 @@ class GmailClient:
         cc: Optional[str] = None,
         bcc: Optional[str] = None,
         html_body: Optional[str] = None,
+        attachments: Optional[List[str]] = None,
     ) -> Dict[str, Any]:
-        """Send an email message."""
-        try:
-            message = EmailMessage()
-
-            # Set recipients
-            message["To"] = to
-            if cc:
-                message["Cc"] = cc
-            if bcc:
-                message["Bcc"] = bcc
-
-            # Set subject and sender
-            message["Subject"] = subject
-            user_info = self.get_user_info()
-            message["From"] = user_info["email"]
-
-            # Set body content
-            if html_body:
-                message.set_content(body)  # Plain text version
-                message.add_alternative(html_body, subtype="html")
-            else:
-                message.set_content(body)
-
-            # Encode message
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode("utf-8")
-
-            # Send message
-            send_message = (
-                self.service.users()
-                .messages()
-                .send(userId="me", body={"raw": raw_message})
-                .execute()
+        """Send an email message, optionally with files attached."""
+        attachments = resolve_attachments(attachments)
+        return self._run(
+            operations.send_email(
+                self.api,
+                self.user_email,
+                self.get_sender_address(),
+                to,
+                subject,
+                body,
+                cc,
+                bcc,
+                html_body,
+                attachments,
             )
+        )
 
-            return {
-                "id": send_message["id"],
-                "thread_id": send_message["threadId"],
-                "status": "sent",
-            }
-
-        except HttpError as e:
-            raise Exception(f"Failed to send email: {e}")
+    def send_raw(self, raw_message: str) -> Dict[str, Any]:
+        """Send a message that is already MIME-built and base64url-encoded."""
+        return self._run(operations.send_raw(self.api, raw_message))
 
     def create_draft(
         self,
@@ -88,123 +148,228 @@ class GmailClient:
         cc: Optional[str] = None,
         bcc: Optional[str] = None,
         html_body: Optional[str] = None,
+        attachments: Optional[List[str]] = None,
     ) -> Dict[str, Any]:
-        """Create an email draft."""
-        try:
-            message = EmailMessage()
-
-            # Set recipients
-            message["To"] = to
-            if cc:
-                message["Cc"] = cc
-            if bcc:
-                message["Bcc"] = bcc
-
-            # Set subject and sender
-            message["Subject"] = subject
-            user_info = self.get_user_info()
-            message["From"] = user_info["email"]
-
-            # Set body content
-            if html_body:
-                message.set_content(body)
-                message.add_alternative(html_body, subtype="html")
-            else:
-                message.set_content(body)
-
-            # Encode message
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode("utf-8")
-
-            # Create draft
-            draft = (
-                self.service.users()
-                .drafts()
-                .create(userId="me", body={"message": {"raw": raw_message}})
-                .execute()
+        """Create an email draft, optionally with files attached."""
+        attachments = resolve_attachments(attachments)
+        return self._run(
+            operations.create_draft(
+                self.api,
+                self.user_email,
+                self.get_sender_address(),
+                to,
+                subject,
+                body,
+                cc,
+                bcc,
+                html_body,
+                attachments,
             )
-
-            return {
-                "id": draft["id"],
-                "message_id": draft["message"]["id"],
-                "thread_id": draft["message"]["threadId"],
-                "status": "draft",
-            }
-
-        except HttpError as e:
-            raise Exception(f"Failed to create draft: {e}")
+        )
 
     def send_draft(self, draft_id: str) -> Dict[str, Any]:
         """Send an existing draft."""
-        try:
-            sent_message = (
-                self.service.users()
-                .drafts()
-                .send(userId="me", body={"id": draft_id})
-                .execute()
+        return self._run(operations.send_draft(self.api, draft_id))
+
+    def list_drafts_page(
+        self, max_results: int = 10, page_token: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """List one page of drafts and the token for the next page, if any."""
+        return self._run(operations.list_drafts_page(self.api, max_results, page_token))
+
+    def iter_drafts(
+        self, page_size: int = DRAFTS_PAGE_LIMIT, limit: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield drafts across all pages, fetching each page only when needed.
+
+        Only one page is held at a time. limit stops after that many drafts
+        without fetching headers for drafts beyond it.
+        """
+        page_token = None
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            page = self.list_drafts_page(size, page_token)
+            yield from page["drafts"]
+            if remaining is not None:
+                remaining -= len(page["drafts"])
+            page_token = page["next_page_token"]
+            if not page_token:
+                return
+
+    def list_drafts(self, max_results: int = 10) -> List[Dict[str, Any]]:
+        """List up to max_results drafts, across as many pages as needed."""
+        return list(self.iter_drafts(limit=max_results))
+
+    def get_draft_details(self, drafts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fetch Subject/To headers for drafts from drafts.list."""
+        return self._run(operations.get_draft_details(self.api, drafts))
+
+    def search_messages(
+        self,
+        query: str,
+        max_results: int = 20,
+        page_token: Optional[str] = None,
+        include_spam_trash: bool = False,
+    ) -> Dict[str, Any]:
+        """Find messages matching a Gmail search query, with their headers."""
+        return self._run(
+            operations.search_messages(
+                self.api, query, max_results, page_token, include_spam_trash
             )
+        )
 
-            return {
-                "id": sent_message["id"],
-                "thread_id": sent_message["threadId"],
-                "status": "sent",
-            }
+    def get_message_summaries(self, message_ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch compact header summaries for messages, in the given order."""
+        return self._run(operations.get_message_summaries(self.api, message_ids))
 
-        except HttpError as e:
-            raise Exception(f"Failed to send draft: {e}")
+    def list_message_ids(
+        self, max_results: int, query: Optional[str] = None
+    ) -> List[str]:
+        """List the IDs of up to max_results messages, newest first."""
+        return self._run(operations.list_message_ids(self.api, max_results, query))
 
-    def list_drafts(self, max_results: int = 10) -> List[Dict[str, Any]]:
-        """List email drafts."""
-        try:
-            results = (
-                self.service.users()
-                .drafts()
-                .list(userId="me", maxResults=max_results)
-                .execute()
+    def list_message_ids_page(
+        self,
+        query: Optional[str] = None,
+        page_token: Optional[str] = None,
+        max_results: int = MESSAGES_PAGE_LIMIT,
+        include_spam_trash: bool = False,
+    ) -> Dict[str, Any]:
+        """List one page of IDs of messages matching a query, newest first."""
+        return self._run(
+            operations.list_message_ids_page(
+                self.api, query, page_token, max_results, include_spam_trash
+            )
+        )
+
+    def batch_modify_messages(
+        self,
+        message_ids: List[str],
+        add_label_ids: Optional[List[str]] = None,
+        remove_label_ids: Optional[List[str]] = None,
+    ) -> int:
+        """Add and remove labels on up to BATCH_MODIFY_LIMIT messages at once."""
+        return self._run(
+            operations.batch_modify_messages(
+                self.api, message_ids, add_label_ids, remove_label_ids
             )
+        )
+
+    def list_labels(self) -> List[Dict[str, str]]:
+        """List the mailbox's system and user labels with their IDs and names."""
+        return self._run(operations.list_labels(self.api))
+
+    def get_message_contents(self, message_ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch messages' headers and readable text, in the given order."""
+        return self._run(operations.get_message_contents(self.api, message_ids))
+
+    def get_thread(self, thread_id: str) -> Dict[str, Any]:
+        """Fetch a thread with every message's headers and part structure."""
+        return self._run(operations.get_thread(self.api, thread_id))
 
-            drafts = results.get("drafts", [])
-            draft_list = []
-
-            for draft in drafts:
-                # Get draft details
-                draft_detail = (
-                    self.service.users()
-                    .drafts()
-                    .get(userId="me", id=draft["id"])
-                    .execute()
-                )
-
-                message = draft_detail["message"]
-                headers = message.get("payload", {}).get("headers", [])
-
-                # Extract subject and to fields
-                subject = next(
-                    (h["value"] for h in headers if h["name"] == "Subject"),
-                    "No Subject",
-                )
-                to = next((h["value"] for h in headers if h["name"] == "To"), "Unknown")
-
-                draft_list.append(
-                    {
-                        "id": draft["id"],
-                        "message_id": message["id"],
-                        "thread_id": message["threadId"],
-                        "subject": subject,
-                        "to": to,
-                        "snippet": message.get("snippet", ""),
-                    }
-                )
-
-            return draft_list
-
-        except HttpError as e:
-            raise Exception(f"Failed to list drafts: {e}")
+    def get_message(self, message_id: str) -> Dict[str, Any]:
+        """Fetch one message in full format, without decoding any part."""
+        return self._run(operations.get_message(self.api, message_id))
+
+    def get_attachment(self, message_id: str, attachment_id: str) -> bytes:
+        """Download and decode the body of a part stored as an attachment."""
+        return self._run(operations.get_attachment(self.api, message_id, attachment_id))
+
+    def list_draft_refs(self) -> List[Dict[str, Any]]:
+        """List every draft's ID and message ID, without headers."""
+        return self._run(operations.list_draft_refs(self.api))
+
+    def get_history_id(self) -> str:
+        """Get the mailbox's current history ID."""
+        return self._run(operations.get_history_id(self.api))
+
+    def list_history(
+        self, start_history_id: str, label_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Check whether the mailbox changed since start_history_id."""
+        return self._run(operations.list_history(self.api, start_history_id, label_id))
+
+    def list_history_changes(self, start_history_id: str) -> Dict[str, Any]:
+        """Collect the messages added, deleted or relabeled since start_history_id."""
+        return self._run(operations.list_history_changes(self.api, start_history_id))
 
     def delete_draft(self, draft_id: str) -> bool:
         """Delete a draft."""
-        try:
-            self.service.users().drafts().delete(userId="me", id=draft_id).execute()
-            return True
-
-        except HttpError as e:
-            raise Exception(f"Failed to delete draft: {e}")
+        return self._run(operations.delete_draft(self.api, draft_id))
+
+    def _run(self, operation: Operation[T]) -> T:
+        """Run a Gmail operation, sending its requests from the calling thread."""
+        return drive(operation, self._perform)
+
+    def _perform(self, step: Step) -> Any:
+        """Carry out one step of an operation."""
+        if isinstance(step, Call):
+            return self._execute(step.request, step.idempotent)
+        if isinstance(step, Batch):
+            return self._execute_batch(step.requests)
+        return step.func(*step.args)
+
+    def _execute(
+        self, request: Any, idempotent: bool = True, units: Optional[int] = None
+    ) -> Any:
+        """Execute a request with quota pacing, retries and the circuit breaker.
+
+        Sends and draft creation pass idempotent=False so they are only
+        retried when Gmail cannot have acted on them. Every attempt is
+        charged against the user's quota (units defaults to the method's cost).
+        """
+        if units is None:
+            units = request_units(request)
+
+        def attempt() -> Any:
+            rate_limiter.acquire(self.user_email, units)
+            return request.execute(http=self._thread_http())
+
+        return call_with_retry(attempt, self._breaker, idempotent)
+
+    @property
+    def _breaker(self) -> CircuitBreaker:
+        """Circuit breaker shared by every client for this user."""
+        return circuit_breakers.get(self.user_email)
+
+    def _execute_batch(
+        self, requests: Sequence[Tuple[str, HttpRequest]]
+    ) -> Dict[str, Tuple[Any, Optional[Exception]]]:
+        """Execute read requests through Gmail's batch endpoint, BATCH_SIZE at a time.
+
+        Parts that fail with transient errors are retried in later batches.
+        Returns (response, error) keyed by the request ID given for each request.
+        """
+        results: Dict[str, Tuple[Any, Optional[Exception]]] = {}
+
+        def callback(request_id: str, response: Any, exception: Exception) -> None:
+            results[request_id] = (response, exception)
+
+        pending = list(requests)
+        attempt = 0
+        while pending:
+            for start in range(0, len(pending), BATCH_SIZE):
+                batch = self.api.new_batch_http_request(callback=callback)
+                chunk = pending[start : start + BATCH_SIZE]
+                for request_id, request in chunk:
+                    # Parts are signed with this client's credentials too
+                    request.http = self._thread_http()
+                    batch.add(request, request_id=request_id)
+                # Gmail charges each part of a batch as a separate request
+                self._execute(batch, units=sum(request_units(r) for _, r in chunk))
+
+            retry = [
+                (request_id, request)
+                for request_id, request in pending
+                if results[request_id][1] is not None
+                and is_retryable(results[request_id][1], idempotent=True)
+            ]
+            attempt += 1
+            if not retry or attempt >= default_policy.max_attempts:
+                break
+            metrics.increment("gmail_retries", self.user_email, len(retry))
+            time.sleep(default_policy.delay(attempt - 1, results[retry[0][0]][1]))
+            pending = retry
+
+        return results
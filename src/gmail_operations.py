@@ -0,0 +1,832 @@
+"""Gmail operations shared by the sync and async clients.
+
+An operation builds its googleapiclient requests and shapes the responses,
+but does no I/O itself: it is a generator that yields each step it needs
+performed and is resumed with the result, or with the step's exception
+thrown in. GmailClient and AsyncGmailClient drive the same operations with
+their own transport (see drive and drive_async).
+"""
+
+from email.message import EmailMessage
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+
+from .attachments import media_upload, needs_resumable_upload, spool_mime_message
+from .config import LOCAL_INDEX_MAX_BODY_CHARS
+from .discovery import GmailResources
+from .message_text import decode_body_data, extract_text
+from .metrics import metrics
+from .mime import build_raw_message, compose_mime_message, encode_raw_message
+
+# Partial responses: only the fields UserInfo, EmailResponse and DraftInfo use
+PROFILE_FIELDS = "emailAddress,messagesTotal,threadsTotal"
+HISTORY_ID_FIELDS = "historyId"
+SENT_MESSAGE_FIELDS = "id,threadId"
+DRAFT_FIELDS = "id,message(id,threadId)"
+
+# Headers and fields shown for each draft in listings
+DRAFT_METADATA_HEADERS = ["Subject", "To"]
+DRAFT_METADATA_FIELDS = "id,threadId,snippet,payload/headers"
+
+# Largest page drafts.list returns
+DRAFTS_PAGE_LIMIT = 500
+
+# Partial responses for change tracking: only IDs and paging fields
+DRAFT_REFS_FIELDS = "drafts(id,message/id),nextPageToken"
+HISTORY_FIELDS = "history/id,historyId,nextPageToken"
+
+
+# Headers and fields returned for each message in search results
+MESSAGE_SUMMARY_HEADERS = ["From", "To", "Subject", "Date"]
+MESSAGE_SUMMARY_FIELDS = "id,threadId,labelIds,snippet,payload/headers"
+MESSAGE_LIST_FIELDS = "messages/id,nextPageToken,resultSizeEstimate"
+
+# Largest page messages.list returns
+MESSAGES_PAGE_LIMIT = 500
+
+# Most messages one batchModify call accepts
+BATCH_MODIFY_LIMIT = 1000
+LABEL_LIST_FIELDS = "labels(id,name)"
+
+# Full messages for indexing: headers and inline bodies, no raw source
+MESSAGE_CONTENT_FIELDS = "id,threadId,labelIds,snippet,internalDate,payload"
+
+# Whole threads for get_thread; parts are decoded later, one at a time
+THREAD_FIELDS = "id,messages(id,threadId,labelIds,snippet,internalDate,payload)"
+ATTACHMENT_FIELDS = "data"
+
+# Message additions, deletions and label changes, with each message's labels
+HISTORY_CHANGE_TYPES = ["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"]
+HISTORY_CHANGES_FIELDS = (
+    "history(messagesAdded/message(id,labelIds),messagesDeleted/message/id,"
+    "labelsAdded/message(id,labelIds),labelsRemoved/message(id,labelIds)),"
+    "historyId,nextPageToken"
+)
+
+
+class HistoryExpiredError(Exception):
+    """Raised when Gmail no longer has history back to the requested ID."""
+
+
+class Call:
+    """Step: send one request; the operation resumes with its response."""
+
+    def __init__(self, request: HttpRequest, idempotent: bool = True):
+        """Describe a request; sends and draft creation pass idempotent=False."""
+        self.request = request
+        self.idempotent = idempotent
+
+
+class Batch:
+    """Step: send independent reads however the backend does it best.
+
+    The operation resumes with {request ID: (response, error)}.
+    """
+
+    def __init__(self, requests: Sequence[Tuple[str, HttpRequest]]):
+        """Describe reads keyed by request ID."""
+        self.requests = list(requests)
+
+
+class Blocking:
+    """Step: run blocking local work, such as spooling attachments."""
+
+    def __init__(self, func: Callable[..., Any], *args: Any):
+        """Describe a call of func(*args); the operation resumes with its result."""
+        self.func = func
+        self.args = args
+
+
+Step = Union[Call, Batch, Blocking]
+T = TypeVar("T")
+Operation = Generator[Step, Any, T]
+
+# Calls a Gmail client method by name on the right backend (see run_client)
+ClientCall = Callable[..., Awaitable[Any]]
+
+
+def drive(operation: Operation[T], perform: Callable[[Step], Any]) -> T:
+    """Run an operation to completion, performing each step with perform."""
+    result, error = None, None
+    while True:
+        try:
+            if error is not None:
+                step = operation.throw(error)
+            else:
+                step = operation.send(result)
+        except StopIteration as stop:
+            return stop.value
+        result, error = None, None
+        try:
+            result = perform(step)
+        except Exception as e:
+            error = e
+
+
+async def drive_async(
+    operation: Operation[T], perform: Callable[[Step], Awaitable[Any]]
+) -> T:
+    """Run an operation to completion, awaiting perform for each step."""
+    result, error = None, None
+    while True:
+        try:
+            if error is not None:
+                step = operation.throw(error)
+            else:
+                step = operation.send(result)
+        except StopIteration as stop:
+            return stop.value
+        result, error = None, None
+        try:
+            result = await perform(step)
+        except Exception as e:
+            error = e
+
+
+def _header_value(headers: List[Dict[str, str]], name: str, default: str) -> str:
+    """Return the first header with the given name (case-insensitive)."""
+    name = name.lower()
+    return next((h["value"] for h in headers if h["name"].lower() == name), default)
+
+
+def _message_summary(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a metadata-format message into the fields of MessageSummary."""
+    headers = message.get("payload", {}).get("headers", [])
+    labels = message.get("labelIds", [])
+    return {
+        "id": message["id"],
+        "thread_id": message["threadId"],
+        "sender": _header_value(headers, "From", ""),
+        "to": _header_value(headers, "To", ""),
+        "subject": _header_value(headers, "Subject", "No Subject"),
+        "date": _header_value(headers, "Date", ""),
+        "snippet": message.get("snippet", ""),
+        "labels": labels,
+        "unread": "UNREAD" in labels,
+    }
+
+
+def _message_content(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a full-format message into a summary plus its readable text."""
+    content = _message_summary(message)
+    content["internal_date"] = int(message.get("internalDate", 0))
+    content["body"] = extract_text(
+        message.get("payload", {}), LOCAL_INDEX_MAX_BODY_CHARS
+    )
+    return content
+
+
+def _merge_history(history: List[Dict[str, Any]], changes: Dict[str, Any]) -> None:
+    """Fold one page of history records into net added/deleted/relabeled sets.
+
+    changes holds "added" (IDs, in order), "deleted" (IDs) and "labels"
+    (ID -> label IDs after the last change). Records are applied in order,
+    so a message added and then deleted only appears as deleted.
+    """
+    for record in history:
+        for change in record.get("messagesAdded", []):
+            message = change["message"]
+            changes["added"][message["id"]] = None
+            changes["deleted"].discard(message["id"])
+            changes["labels"][message["id"]] = message.get("labelIds", [])
+        for change in record.get("messagesDeleted", []):
+            message_id = change["message"]["id"]
+            changes["added"].pop(message_id, None)
+            changes["labels"].pop(message_id, None)
+            changes["deleted"].add(message_id)
+        for key in ("labelsAdded", "labelsRemoved"):
+            for change in record.get(key, []):
+                message = change["message"]
+                if message["id"] not in changes["deleted"]:
+                    changes["labels"][message["id"]] = message.get("labelIds", [])
+
+
+def _draft_info(draft_id: str, message: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a draft's message resource into the fields of DraftInfo."""
+    headers = message.get("payload", {}).get("headers", [])
+    return {
+        "id": draft_id,
+        "message_id": message["id"],
+        "thread_id": message["threadId"],
+        "subject": _header_value(headers, "Subject", "No Subject"),
+        "to": _header_value(headers, "To", "Unknown"),
+        "snippet": message.get("snippet", ""),
+    }
+
+
+def _found(
+    results: Dict[str, Tuple[Any, Optional[Exception]]], request_ids: Sequence[str]
+) -> Iterator[Tuple[str, Any]]:
+    """Yield batch responses in request order, skipping resources now deleted."""
+    for request_id in request_ids:
+        response, error = results[request_id]
+        if error is not None:
+            # Deleted between listing it and fetching it
+            if isinstance(error, HttpError) and error.status_code == 404:
+                continue
+            raise error
+        yield request_id, response
+
+
+def _sent(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a sent message into the fields of EmailResponse."""
+    return {"id": message["id"], "thread_id": message["threadId"], "status": "sent"}
+
+
+def get_profile(api: GmailResources) -> Operation[Dict[str, Any]]:
+    """Fetch the address and mailbox totals of the account."""
+    try:
+        profile = yield Call(api.users.getProfile(userId="me", fields=PROFILE_FIELDS))
+    except HttpError as e:
+        raise Exception(f"Failed to get user info: {e}")
+
+    return {
+        "email": profile.get("emailAddress"),
+        "messages_total": profile.get("messagesTotal", 0),
+        "threads_total": profile.get("threadsTotal", 0),
+    }
+
+
+def send_email(
+    api: GmailResources,
+    user: Optional[str],
+    sender: str,
+    to: str,
+    subject: str,
+    body: str,
+    cc: Optional[str] = None,
+    bcc: Optional[str] = None,
+    html_body: Optional[str] = None,
+    attachments: Sequence[str] = (),
+) -> Operation[Dict[str, Any]]:
+    """Send an email message, optionally with files attached.
+
+    Messages with attachments are streamed into a spooled file; above
+    RESUMABLE_UPLOAD_THRESHOLD bytes they are sent by resumable upload.
+    """
+    if not attachments:
+        return (
+            yield from send_raw(
+                api, build_raw_message(sender, to, subject, body, cc, bcc, html_body)
+            )
+        )
+
+    message = compose_mime_message(sender, to, subject, body, cc, bcc, html_body)
+    spooled = yield Blocking(spool_mime_message, message, attachments)
+    try:
+        if not needs_resumable_upload(spooled):
+            raw_message = yield Blocking(lambda: encode_raw_message(spooled.read()))
+            return (yield from send_raw(api, raw_message))
+
+        try:
+            # A resumable upload only sends once the last byte arrives, and
+            # a retry resumes the same session, so it is safe to retry
+            metrics.increment("gmail_resumable_uploads", user)
+            send_message = yield Call(
+                api.messages.send(
+                    userId="me",
+                    media_body=media_upload(spooled),
+                    fields=SENT_MESSAGE_FIELDS,
+                )
+            )
+        except HttpError as e:
+            raise Exception(f"Failed to send email: {e}")
+    finally:
+        spooled.close()
+
+    return _sent(send_message)
+
+
+def send_raw(api: GmailResources, raw_message: str) -> Operation[Dict[str, Any]]:
+    """Send a message that is already MIME-built and base64url-encoded."""
+    try:
+        send_message = yield Call(
+            api.messages.send(
+                userId="me", body={"raw": raw_message}, fields=SENT_MESSAGE_FIELDS
+            ),
+            idempotent=False,
+        )
+        return _sent(send_message)
+
+    except HttpError as e:
+        raise Exception(f"Failed to send email: {e}")
+
+
+def create_draft(
+    api: GmailResources,
+    user: Optional[str],
+    sender: str,
+    to: str,
+    subject: str,
+    body: str,
+    cc: Optional[str] = None,
+    bcc: Optional[str] = None,
+    html_body: Optional[str] = None,
+    attachments: Sequence[str] = (),
+) -> Operation[Dict[str, Any]]:
+    """Create an email draft, optionally with files attached."""
+    try:
+        if not attachments:
+            raw_message = build_raw_message(
+                sender, to, subject, body, cc, bcc, html_body
+            )
+            draft = yield Call(
+                api.drafts.create(
+                    userId="me",
+                    body={"message": {"raw": raw_message}},
+                    fields=DRAFT_FIELDS,
+                ),
+                idempotent=False,
+            )
+        else:
+            draft = yield from _create_draft_with_attachments(
+                api,
+                user,
+                compose_mime_message(sender, to, subject, body, cc, bcc, html_body),
+                attachments,
+            )
+
+        return {
+            "id": draft["id"],
+            "message_id": draft["message"]["id"],
+            "thread_id": draft["message"]["threadId"],
+            "status": "draft",
+        }
+
+    except HttpError as e:
+        raise Exception(f"Failed to create draft: {e}")
+
+
+def _create_draft_with_attachments(
+    api: GmailResources,
+    user: Optional[str],
+    message: EmailMessage,
+    attachments: Sequence[str],
+) -> Operation[Dict[str, Any]]:
+    """Create a draft from a message streamed together with its attachments."""
+    spooled = yield Blocking(spool_mime_message, message, attachments)
+    try:
+        if not needs_resumable_upload(spooled):
+            raw_message = yield Blocking(lambda: encode_raw_message(spooled.read()))
+            return (
+                yield Call(
+                    api.drafts.create(
+                        userId="me",
+                        body={"message": {"raw": raw_message}},
+                        fields=DRAFT_FIELDS,
+                    ),
+                    idempotent=False,
+                )
+            )
+
+        metrics.increment("gmail_resumable_uploads", user)
+        return (
+            yield Call(
+                api.drafts.create(
+                    userId="me",
+                    body={},
+                    media_body=media_upload(spooled),
+                    fields=DRAFT_FIELDS,
+                )
+            )
+        )
+    finally:
+        spooled.close()
+
+
+def send_draft(api: GmailResources, draft_id: str) -> Operation[Dict[str, Any]]:
+    """Send an existing draft."""
+    try:
+        sent_message = yield Call(
+            api.drafts.send(
+                userId="me", body={"id": draft_id}, fields=SENT_MESSAGE_FIELDS
+            ),
+            idempotent=False,
+        )
+        return _sent(sent_message)
+
+    except HttpError as e:
+        raise Exception(f"Failed to send draft: {e}")
+
+
+def list_drafts_page(
+    api: GmailResources, max_results: int = 10, page_token: Optional[str] = None
+) -> Operation[Dict[str, Any]]:
+    """List one page of drafts and the token for the next page, if any."""
+    try:
+        results = yield Call(
+            api.drafts.list(
+                userId="me",
+                maxResults=min(max_results, DRAFTS_PAGE_LIMIT),
+                pageToken=page_token,
+                fields=DRAFT_REFS_FIELDS,
+            )
+        )
+        return {
+            "drafts": (yield from get_draft_details(api, results.get("drafts", []))),
+            "next_page_token": results.get("nextPageToken"),
+        }
+
+    except HttpError as e:
+        raise Exception(f"Failed to list drafts: {e}")
+
+
+def get_draft_details(
+    api: GmailResources, drafts: List[Dict[str, Any]]
+) -> Operation[List[Dict[str, Any]]]:
+    """Fetch Subject/To headers for drafts from drafts.list.
+
+    drafts.list already returns each draft's message ID, so only the headers
+    are fetched, as one batch of messages.get(format=metadata) reads.
+    """
+    results = yield Batch(
+        (
+            draft["id"],
+            api.messages.get(
+                userId="me",
+                id=draft["message"]["id"],
+                format="metadata",
+                metadataHeaders=DRAFT_METADATA_HEADERS,
+                fields=DRAFT_METADATA_FIELDS,
+            ),
+        )
+        for draft in drafts
+    )
+    return [
+        _draft_info(draft_id, message)
+        for draft_id, message in _found(results, [draft["id"] for draft in drafts])
+    ]
+
+
+def search_messages(
+    api: GmailResources,
+    query: str,
+    max_results: int = 20,
+    page_token: Optional[str] = None,
+    include_spam_trash: bool = False,
+) -> Operation[Dict[str, Any]]:
+    """Find messages matching a Gmail search query, with their headers.
+
+    messages.list is paged until max_results IDs are found; headers then
+    come from a batch of metadata reads. Both ask only for the fields used
+    in the results.
+    """
+    try:
+        ids: List[str] = []
+        estimate = 0
+        while len(ids) < max_results:
+            results = yield Call(
+                api.messages.list(
+                    userId="me",
+                    q=query,
+                    maxResults=min(max_results - len(ids), MESSAGES_PAGE_LIMIT),
+                    pageToken=page_token,
+                    includeSpamTrash=include_spam_trash,
+                    fields=MESSAGE_LIST_FIELDS,
+                )
+            )
+            ids.extend(message["id"] for message in results.get("messages", []))
+            estimate = results.get("resultSizeEstimate", estimate)
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                break
+
+        return {
+            "messages": (yield from get_message_summaries(api, ids)),
+            "next_page_token": page_token,
+            "result_size_estimate": estimate,
+        }
+
+    except HttpError as e:
+        raise Exception(f"Failed to search messages: {e}")
+
+
+def get_message_summaries(
+    api: GmailResources, message_ids: List[str]
+) -> Operation[List[Dict[str, Any]]]:
+    """Fetch compact header summaries for messages, in the given order."""
+    results = yield Batch(
+        (
+            message_id,
+            api.messages.get(
+                userId="me",
+                id=message_id,
+                format="metadata",
+                metadataHeaders=MESSAGE_SUMMARY_HEADERS,
+                fields=MESSAGE_SUMMARY_FIELDS,
+            ),
+        )
+        for message_id in message_ids
+    )
+    return [_message_summary(message) for _, message in _found(results, message_ids)]
+
+
+def list_message_ids(
+    api: GmailResources, max_results: int, query: Optional[str] = None
+) -> Operation[List[str]]:
+    """List the IDs of up to max_results messages, newest first.
+
+    Spam and Trash are excluded.
+    """
+    ids: List[str] = []
+    page_token = None
+    while len(ids) < max_results:
+        page = yield from list_message_ids_page(
+            api, query, page_token, max_results=max_results - len(ids)
+        )
+        ids.extend(page["ids"])
+        page_token = page["next_page_token"]
+        if not page_token:
+            break
+    return ids
+
+
+def list_message_ids_page(
+    api: GmailResources,
+    query: Optional[str] = None,
+    page_token: Optional[str] = None,
+    max_results: int = MESSAGES_PAGE_LIMIT,
+    include_spam_trash: bool = False,
+) -> Operation[Dict[str, Any]]:
+    """List one page of IDs of messages matching a query, newest first.
+
+    Returns {"ids", "next_page_token", "result_size_estimate"}.
+    """
+    try:
+        results = yield Call(
+            api.messages.list(
+                userId="me",
+                q=query,
+                maxResults=min(max_results, MESSAGES_PAGE_LIMIT),
+                pageToken=page_token,
+                includeSpamTrash=include_spam_trash,
+                fields=MESSAGE_LIST_FIELDS,
+            )
+        )
+        return {
+            "ids": [message["id"] for message in results.get("messages", [])],
+            "next_page_token": results.get("nextPageToken"),
+            "result_size_estimate": results.get("resultSizeEstimate", 0),
+        }
+
+    except HttpError as e:
+        raise Exception(f"Failed to list messages: {e}")
+
+
+def batch_modify_messages(
+    api: GmailResources,
+    message_ids: List[str],
+    add_label_ids: Optional[List[str]] = None,
+    remove_label_ids: Optional[List[str]] = None,
+) -> Operation[int]:
+    """Add and remove labels on up to BATCH_MODIFY_LIMIT messages at once.
+
+    Returns the number of messages in the request. Adding TRASH moves
+    messages to the trash; removing INBOX archives them.
+    """
+    if len(message_ids) > BATCH_MODIFY_LIMIT:
+        raise ValueError(
+            f"batchModify takes at most {BATCH_MODIFY_LIMIT} messages per call"
+        )
+    try:
+        yield Call(
+            api.messages.batchModify(
+                userId="me",
+                body={
+                    "ids": message_ids,
+                    "addLabelIds": add_label_ids or [],
+                    "removeLabelIds": remove_label_ids or [],
+                },
+            )
+        )
+        return len(message_ids)
+
+    except HttpError as e:
+        raise Exception(f"Failed to modify messages: {e}")
+
+
+def list_labels(api: GmailResources) -> Operation[List[Dict[str, str]]]:
+    """List the mailbox's system and user labels with their IDs and names."""
+    try:
+        results = yield Call(api.labels.list(userId="me", fields=LABEL_LIST_FIELDS))
+        return results.get("labels", [])
+
+    except HttpError as e:
+        raise Exception(f"Failed to list labels: {e}")
+
+
+def get_message_contents(
+    api: GmailResources, message_ids: List[str]
+) -> Operation[List[Dict[str, Any]]]:
+    """Fetch messages' headers and readable text, in the given order.
+
+    Messages deleted in the meantime are skipped.
+    """
+    results = yield Batch(
+        (
+            message_id,
+            api.messages.get(
+                userId="me",
+                id=message_id,
+                format="full",
+                fields=MESSAGE_CONTENT_FIELDS,
+            ),
+        )
+        for message_id in message_ids
+    )
+    return [_message_content(message) for _, message in _found(results, message_ids)]
+
+
+def get_thread(api: GmailResources, thread_id: str) -> Operation[Dict[str, Any]]:
+    """Fetch a thread with every message's headers and part structure.
+
+    Small bodies arrive inline, still base64url-encoded; attachments only
+    as IDs. Nothing is decoded here.
+    """
+    try:
+        return (
+            yield Call(
+                api.threads.get(
+                    userId="me", id=thread_id, format="full", fields=THREAD_FIELDS
+                )
+            )
+        )
+
+    except HttpError as e:
+        raise Exception(f"Failed to get thread: {e}")
+
+
+def get_message(api: GmailResources, message_id: str) -> Operation[Dict[str, Any]]:
+    """Fetch one message in full format, without decoding any part."""
+    try:
+        return (
+            yield Call(
+                api.messages.get(
+                    userId="me",
+                    id=message_id,
+                    format="full",
+                    fields=MESSAGE_CONTENT_FIELDS,
+                )
+            )
+        )
+
+    except HttpError as e:
+        raise Exception(f"Failed to get message: {e}")
+
+
+def get_attachment(
+    api: GmailResources, message_id: str, attachment_id: str
+) -> Operation[bytes]:
+    """Download and decode the body of a part stored as an attachment."""
+    try:
+        attachment = yield Call(
+            api.attachments.get(
+                userId="me",
+                messageId=message_id,
+                id=attachment_id,
+                fields=ATTACHMENT_FIELDS,
+            )
+        )
+        return decode_body_data(attachment.get("data", ""))
+
+    except HttpError as e:
+        raise Exception(f"Failed to get attachment: {e}")
+
+
+def list_draft_refs(api: GmailResources) -> Operation[List[Dict[str, Any]]]:
+    """List every draft's ID and message ID, without headers."""
+    try:
+        refs = []
+        page_token = None
+        while True:
+            results = yield Call(
+                api.drafts.list(
+                    userId="me",
+                    maxResults=DRAFTS_PAGE_LIMIT,
+                    pageToken=page_token,
+                    fields=DRAFT_REFS_FIELDS,
+                )
+            )
+            refs.extend(results.get("drafts", []))
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                return refs
+
+    except HttpError as e:
+        raise Exception(f"Failed to list drafts: {e}")
+
+
+def get_history_id(api: GmailResources) -> Operation[str]:
+    """Get the mailbox's current history ID."""
+    try:
+        profile = yield Call(
+            api.users.getProfile(userId="me", fields=HISTORY_ID_FIELDS)
+        )
+        return profile["historyId"]
+
+    except HttpError as e:
+        raise Exception(f"Failed to get history ID: {e}")
+
+
+def list_history(
+    api: GmailResources, start_history_id: str, label_id: Optional[str] = None
+) -> Operation[Dict[str, Any]]:
+    """Check whether the mailbox changed since start_history_id.
+
+    Returns {"changed": bool, "history_id": latest ID}. Stops at the first
+    page with changes, since the response always carries the current ID.
+    Raises HistoryExpiredError if the start ID is too old.
+    """
+    try:
+        page_token = None
+        while True:
+            results = yield Call(
+                api.history.list(
+                    userId="me",
+                    startHistoryId=start_history_id,
+                    labelId=label_id,
+                    pageToken=page_token,
+                    fields=HISTORY_FIELDS,
+                )
+            )
+            page_token = results.get("nextPageToken")
+            if results.get("history") or not page_token:
+                return {
+                    "changed": bool(results.get("history")),
+                    "history_id": results.get("historyId", start_history_id),
+                }
+
+    except HttpError as e:
+        if e.status_code == 404:
+            raise HistoryExpiredError(
+                f"History ID {start_history_id} is no longer available"
+            )
+        raise Exception(f"Failed to list history: {e}")
+
+
+def list_history_changes(
+    api: GmailResources, start_history_id: str
+) -> Operation[Dict[str, Any]]:
+    """Collect the messages added, deleted or relabeled since start_history_id.
+
+    Returns {"added": [IDs], "deleted": [IDs], "labels": {ID: label IDs},
+    "history_id": latest ID}. Raises HistoryExpiredError if the start ID
+    is too old.
+    """
+    try:
+        changes: Dict[str, Any] = {"added": {}, "deleted": set(), "labels": {}}
+        history_id = start_history_id
+        page_token = None
+        while True:
+            results = yield Call(
+                api.history.list(
+                    userId="me",
+                    startHistoryId=start_history_id,
+                    historyTypes=HISTORY_CHANGE_TYPES,
+                    pageToken=page_token,
+                    fields=HISTORY_CHANGES_FIELDS,
+                )
+            )
+            _merge_history(results.get("history", []), changes)
+            history_id = results.get("historyId", history_id)
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                break
+
+        return {
+            "added": list(changes["added"]),
+            "deleted": list(changes["deleted"]),
+            "labels": changes["labels"],
+            "history_id": history_id,
+        }
+
+    except HttpError as e:
+        if e.status_code == 404:
+            raise HistoryExpiredError(
+                f"History ID {start_history_id} is no longer available"
+            )
+        raise Exception(f"Failed to list history: {e}")
+
+
+def delete_draft(api: GmailResources, draft_id: str) -> Operation[bool]:
+    """Delete a draft."""
+    try:
+        yield Call(api.drafts.delete(userId="me", id=draft_id))
+        return True
+
+    except HttpError as e:
+        raise Exception(f"Failed to delete draft: {e}")
@@ -0,0 +1,95 @@
+"""File writes and locks that stay safe with several server processes.
+
+Several gmail-mcp processes may share one configuration directory, e.g. one
+per agent session. Files they all read are replaced atomically, and changes
+that must not interleave, such as refreshing a user's token, are serialized
+with a lock file.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from types import TracebackType
+from typing import Optional, Type
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def atomic_write(path: Path, data: bytes) -> os.stat_result:
+    """Replace path with data; readers see the old or new file, never a mix.
+
+    The data is written and flushed to disk in a temporary owner-only file
+    next to path, which is then renamed over it. Returns the new file's stat.
+    """
+    fd, temp_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            stat = os.fstat(f.fileno())
+        os.chmod(temp_path, 0o600)  # Owner read/write only
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return stat
+
+
+class InterProcessLock:
+    """An exclusive lock held through a lock file, released on process exit.
+
+    Use it as a context manager; entering blocks until no other holder of
+    the same path remains. It is not reentrant, so callers that may take it
+    from several threads should hold a threading lock around it.
+    """
+
+    def __init__(self, path: Path):
+        """Initialize a lock on path; the file is created when first taken."""
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> "InterProcessLock":
+        """Wait for and take the lock."""
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        # Gives up after about 10 seconds, so keep retrying
+                        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Release the lock."""
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
@@ -0,0 +1,357 @@
+"""Optional per-user full-text index of the mailbox in SQLite FTS5.
+
+The index lives in one SQLite file per user and holds each message's
+headers, labels and readable text. It is built by listing the newest
+messages and is then kept current from the Gmail history API, so searches
+are answered locally, in milliseconds and without a network connection.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import LOCAL_INDEX_MAX_MESSAGES
+from .gmail_operations import ClientCall, HistoryExpiredError
+from .metrics import metrics
+from .registry import UserRegistry
+
+
+# Messages fetched per request while filling the index, so progress is
+# saved as it goes and an interrupted build resumes where it stopped
+FETCH_CHUNK_SIZE = 100
+
+# Labels whose messages are left out of results unless asked for
+HIDDEN_LABELS = {"SPAM", "TRASH"}
+
+# Relative weight of a match in each indexed column, for bm25 ranking
+_COLUMN_WEIGHTS = (5.0, 3.0, 2.0, 1.0)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    thread_id TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    recipients TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    date TEXT NOT NULL,
+    internal_date INTEGER NOT NULL,
+    snippet TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    hidden INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS message_text USING fts5(
+    subject, sender, recipients, body, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+_SEARCH = """
+SELECT m.id, m.thread_id, m.sender, m.recipients, m.subject, m.date, m.labels,
+       snippet(message_text, -1, '[', ']', '...', 16),
+       bm25(message_text, ?, ?, ?, ?) AS rank
+FROM message_text JOIN messages AS m ON m.rowid = message_text.rowid
+WHERE message_text MATCH ? {filter}
+ORDER BY rank, m.internal_date DESC
+LIMIT ?
+"""
+
+
+def _quote_terms(query: str) -> str:
+    """Turn free text into an FTS5 query matching every word literally."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+class LocalIndex:
+    """One user's message index, stored at path.
+
+    Database calls block and are made through asyncio.to_thread by sync;
+    search and count may be called from any thread.
+    """
+
+    def __init__(self, user: str, path: Path):
+        """Initialize an index backed by path; the file is created on first use."""
+        self.user = user
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._sync_lock = asyncio.Lock()
+
+    @property
+    def exists(self) -> bool:
+        """Whether the index has been built at least once."""
+        return self.path.exists() and self.history_id is not None
+
+    def _db(self) -> sqlite3.Connection:
+        """Open the database and create its tables if needed."""
+        if self._connection is None:
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            try:
+                self.path.chmod(0o600)  # Owner read/write only
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                connection.executescript(_SCHEMA)
+            except sqlite3.OperationalError as e:
+                connection.close()
+                if "fts5" in str(e):
+                    raise RuntimeError(
+                        "The local index needs SQLite with FTS5, which this "
+                        "Python's sqlite3 module was built without"
+                    )
+                raise
+            self._connection = connection
+        return self._connection
+
+    @property
+    def history_id(self) -> Optional[str]:
+        """History ID the index is current to, or None before the first build."""
+        if not self.path.exists():
+            return None
+        with self._db_lock:
+            row = (
+                self._db()
+                .execute("SELECT value FROM state WHERE key = 'history_id'")
+                .fetchone()
+            )
+        return row[0] if row else None
+
+    def _set_history_id(self, history_id: str) -> None:
+        """Record the history ID the index is current to."""
+        with self._db_lock, self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO state VALUES ('history_id', ?)", (history_id,)
+            )
+
+    def _indexed_ids(self) -> List[str]:
+        """IDs of every indexed message."""
+        with self._db_lock:
+            return [row[0] for row in self._db().execute("SELECT id FROM messages")]
+
+    def _store(self, messages: List[Dict[str, Any]]) -> None:
+        """Add or replace messages (dicts from get_message_contents)."""
+        with self._db_lock, self._db() as db:
+            for message in messages:
+                self._delete_one(db, message["id"])
+                cursor = db.execute(
+                    "INSERT INTO messages (id, thread_id, sender, recipients, "
+                    "subject, date, internal_date, snippet, labels, hidden) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        message["id"],
+                        message["thread_id"],
+                        message["sender"],
+                        message["to"],
+                        message["subject"],
+                        message["date"],
+                        message["internal_date"],
+                        message["snippet"],
+                        " ".join(message["labels"]),
+                        bool(HIDDEN_LABELS.intersection(message["labels"])),
+                    ),
+                )
+                db.execute(
+                    "INSERT INTO message_text (rowid, subject, sender, recipients, "
+                    "body) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        cursor.lastrowid,
+                        message["subject"],
+                        message["sender"],
+                        message["to"],
+                        message["body"],
+                    ),
+                )
+
+    @staticmethod
+    def _delete_one(db: sqlite3.Connection, message_id: str) -> None:
+        """Remove a message and its text, if indexed."""
+        row = db.execute("SELECT rowid FROM messages WHERE id = ?", (message_id,))
+        row = row.fetchone()
+        if row:
+            db.execute("DELETE FROM message_text WHERE rowid = ?", row)
+            db.execute("DELETE FROM messages WHERE rowid = ?", row)
+
+    def _delete(self, message_ids: List[str]) -> None:
+        """Remove messages from the index."""
+        with self._db_lock, self._db() as db:
+            for message_id in message_ids:
+                self._delete_one(db, message_id)
+
+    def _relabel(self, labels: Dict[str, List[str]]) -> None:
+        """Update the labels of indexed messages."""
+        with self._db_lock, self._db() as db:
+            db.executemany(
+                "UPDATE messages SET labels = ?, hidden = ? WHERE id = ?",
+                [
+                    (" ".join(ids), bool(HIDDEN_LABELS.intersection(ids)), message_id)
+                    for message_id, ids in labels.items()
+                ],
+            )
+
+    def _clear(self) -> None:
+        """Remove every message and forget the history ID."""
+        with self._db_lock, self._db() as db:
+            db.execute("DELETE FROM message_text")
+            db.execute("DELETE FROM messages")
+            db.execute("DELETE FROM state")
+
+    async def sync(
+        self,
+        call: ClientCall,
+        max_messages: int = LOCAL_INDEX_MAX_MESSAGES,
+        rebuild: bool = False,
+    ) -> Dict[str, Any]:
+        """Bring the index up to date, building it first if needed.
+
+        Returns counts of messages added and deleted and whether the index
+        was (re)built from a listing.
+        """
+        async with self._sync_lock:
+            if rebuild:
+                await asyncio.to_thread(self._clear)
+            history_id = await asyncio.to_thread(lambda: self.history_id)
+            if history_id is not None:
+                try:
+                    changes = await call("list_history_changes", history_id)
+                except HistoryExpiredError:
+                    metrics.increment("local_index_expired", self.user)
+                    await asyncio.to_thread(self._clear)
+                else:
+                    return await self._apply_changes(call, changes)
+            return await self._build(call, max_messages)
+
+    async def _build(self, call: ClientCall, max_messages: int) -> Dict[str, Any]:
+        """Index the newest max_messages messages.
+
+        Messages already indexed by an interrupted build are kept rather
+        than fetched again; ones no longer listed are dropped.
+        """
+        metrics.increment("local_index_builds", self.user)
+        # Take the history ID first so changes made during the build are
+        # replayed by the next sync rather than lost
+        history_id = await call("get_history_id")
+        listed = await call("list_message_ids", max_messages)
+        indexed = set(await asyncio.to_thread(self._indexed_ids))
+        stale = list(indexed.difference(listed))
+        await asyncio.to_thread(self._delete, stale)
+
+        missing = [message_id for message_id in listed if message_id not in indexed]
+        added = await self._fetch(call, missing)
+        await asyncio.to_thread(self._set_history_id, history_id)
+        return {"added": added, "deleted": len(stale), "rebuilt": True}
+
+    async def _apply_changes(
+        self, call: ClientCall, changes: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Apply a history delta: fetch added messages, drop deleted ones."""
+        await asyncio.to_thread(self._delete, changes["deleted"])
+        added = await self._fetch(call, changes["added"])
+        await asyncio.to_thread(self._relabel, changes["labels"])
+        await asyncio.to_thread(self._set_history_id, changes["history_id"])
+        if added or changes["deleted"] or changes["labels"]:
+            metrics.increment("local_index_deltas", self.user)
+        return {"added": added, "deleted": len(changes["deleted"]), "rebuilt": False}
+
+    async def _fetch(self, call: ClientCall, message_ids: List[str]) -> int:
+        """Fetch and store messages in chunks; returns how many were stored."""
+        stored = 0
+        for start in range(0, len(message_ids), FETCH_CHUNK_SIZE):
+            chunk = message_ids[start : start + FETCH_CHUNK_SIZE]
+            messages = await call("get_message_contents", chunk)
+            await asyncio.to_thread(self._store, messages)
+            stored += len(messages)
+        metrics.increment("local_index_fetched", self.user, stored)
+        return stored
+
+    def search(
+        self, query: str, max_results: int = 20, include_spam_trash: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Rank indexed messages against a query, best match first.
+
+        query uses FTS5 syntax (words, "phrases", OR, NOT, prefix*, and
+        column filters such as subject:invoice); text that isn't valid FTS5
+        is searched for word by word. Matches in the subject weigh most,
+        then sender, recipients and body.
+        """
+        sql = _SEARCH.format(filter="" if include_spam_trash else "AND m.hidden = 0")
+        with self._db_lock:
+            db = self._db()
+            try:
+                rows = db.execute(
+                    sql, (*_COLUMN_WEIGHTS, query, max_results)
+                ).fetchall()
+            except sqlite3.OperationalError:
+                rows = db.execute(
+                    sql, (*_COLUMN_WEIGHTS, _quote_terms(query), max_results)
+                ).fetchall()
+        metrics.increment("local_index_searches", self.user)
+
+        results = []
+        for (
+            message_id,
+            thread_id,
+            sender,
+            to,
+            subject,
+            date,
+            labels,
+            snippet,
+            rank,
+        ) in rows:
+            labels = labels.split()
+            results.append(
+                {
+                    "id": message_id,
+                    "thread_id": thread_id,
+                    "sender": sender,
+                    "to": to,
+                    "subject": subject,
+                    "date": date,
+                    "snippet": snippet,
+                    "labels": labels,
+                    "unread": "UNREAD" in labels,
+                    # bm25 is lower for better matches
+                    "score": -rank,
+                }
+            )
+        return results
+
+    def count(self) -> int:
+        """Number of indexed messages."""
+        if not self.path.exists():
+            return 0
+        with self._db_lock:
+            return self._db().execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._db_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class LocalIndexRegistry(UserRegistry[LocalIndex]):
+    """Local indexes for every user seen by this process, under one directory."""
+
+    def __init__(self, directory: Path):
+        """Initialize a registry storing index files in directory."""
+        self.directory = directory
+        super().__init__(lambda user: LocalIndex(user, self.directory / f"{user}.db"))
+
+    def delete(self, user: str) -> bool:
+        """Close and remove a user's index files; returns whether one existed."""
+        index = self.pop(user)
+        if index is not None:
+            index.close()
+        path = self.directory / f"{user}.db"
+        existed = path.exists()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(f"{path}{suffix}")
+            except FileNotFoundError:
+                pass
+        return existed
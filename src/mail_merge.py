@@ -0,0 +1,216 @@
+"""Mail-merge engine for the bundled [PLACEHOLDER] templates."""
+
+import csv
+import html
+import io
+import json
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from .resources.email_signatures import EMAIL_SIGNATURES
+from .resources.html_email_templates import HTML_EMAIL_TEMPLATES
+
+# Placeholders are bracketed names on a single line, e.g. [YOUR_NAME] or
+# [Full Name]; the text between the brackets is the field name.
+PLACEHOLDER_PATTERN = re.compile(r"\[([^\[\]\n]+)\]")
+
+
+class MissingPlaceholderError(ValueError):
+    """Raised when values for some template placeholders are not supplied."""
+
+    def __init__(self, missing: List[str], row: Optional[int] = None):
+        self.missing = missing
+        self.row = row
+        where = f" (recipient {row})" if row is not None else ""
+        super().__init__(
+            f"Missing values for placeholders{where}: {', '.join(missing)}"
+        )
+
+
+class CompiledTemplate:
+    """A template split once into literal text and placeholder slots.
+
+    Rendering copies the precomputed segment list, drops each value into its
+    slot and joins, so the template text is never scanned again per recipient.
+    """
+
+    def __init__(self, source: str):
+        """Compile source into segments."""
+        self.source = source
+        segments: List[str] = []
+        slots: List[Tuple[int, str]] = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            segments.append(source[position : match.start()])
+            slots.append((len(segments), match.group(1)))
+            segments.append(match.group(0))
+            position = match.end()
+        segments.append(source[position:])
+
+        self._segments = segments
+        self._slots = slots
+        # Unique placeholder names in order of first appearance
+        self.placeholders: Tuple[str, ...] = tuple(dict.fromkeys(n for _, n in slots))
+
+    def missing(self, values: Mapping[str, object]) -> List[str]:
+        """List placeholders without a value in values."""
+        return [name for name in self.placeholders if values.get(name) is None]
+
+    def render(
+        self,
+        values: Mapping[str, object],
+        escape_html: bool = False,
+        row: Optional[int] = None,
+    ) -> str:
+        """Fill every placeholder from values.
+
+        Raises MissingPlaceholderError if any placeholder has no value. With
+        escape_html, values are HTML-escaped before insertion.
+        """
+        missing = self.missing(values)
+        if missing:
+            raise MissingPlaceholderError(missing, row)
+
+        output = self._segments[:]
+        if escape_html:
+            for index, name in self._slots:
+                output[index] = html.escape(str(values[name]))
+        else:
+            for index, name in self._slots:
+                output[index] = str(values[name])
+        return "".join(output)
+
+    def render_many(
+        self, records: Iterable[Mapping[str, object]], escape_html: bool = False
+    ) -> Iterator[str]:
+        """Render one body per record, lazily."""
+        for row, values in enumerate(records):
+            yield self.render(values, escape_html=escape_html, row=row)
+
+
+@lru_cache(maxsize=256)
+def compile_template(source: str) -> CompiledTemplate:
+    """Compile a template, reusing the result for identical source text."""
+    return CompiledTemplate(source)
+
+
+def get_compiled_template(template_type: str, name: str) -> CompiledTemplate:
+    """Get a bundled template ("html" or "signature") in compiled form."""
+    if template_type == "html":
+        templates = HTML_EMAIL_TEMPLATES
+    elif template_type == "signature":
+        templates = EMAIL_SIGNATURES
+    else:
+        raise ValueError(
+            f"Unknown template type: {template_type}. Use 'html' or 'signature'"
+        )
+
+    source = templates.get(name)
+    if source is None:
+        raise ValueError(
+            f"Template '{name}' not found. Available: {', '.join(templates.keys())}"
+        )
+    return compile_template(source)
+
+
+def iter_csv_records(data: str) -> Iterator[Dict[str, str]]:
+    """Stream records from CSV text whose header row names the fields."""
+    reader = csv.DictReader(io.StringIO(data))
+    for record in reader:
+        yield {key.strip(): value for key, value in record.items() if key}
+
+
+def iter_json_records(data: str) -> Iterator[Dict[str, object]]:
+    """Stream records from a JSON array of objects or JSON Lines text."""
+    stripped = data.lstrip()
+    if stripped.startswith("["):
+        records = json.loads(stripped)
+        if not isinstance(records, list):
+            raise ValueError("Recipient JSON must be an array of objects")
+        for record in records:
+            if not isinstance(record, dict):
+                raise ValueError("Recipient JSON must be an array of objects")
+            yield record
+        return
+
+    for line_number, line in enumerate(data.splitlines(), start=1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError(f"Recipient JSON line {line_number} is not an object")
+        yield record
+
+
+def iter_recipient_records(
+    recipients_csv: Optional[str] = None, recipients_json: Optional[str] = None
+) -> Iterator[Dict[str, object]]:
+    """Stream recipient records from exactly one of CSV or JSON text."""
+    if (recipients_csv is None) == (recipients_json is None):
+        raise ValueError("Pass exactly one of recipients_csv or recipients_json")
+    if recipients_csv is not None:
+        return iter_csv_records(recipients_csv)
+    return iter_json_records(recipients_json)
+
+
+class MailMerge:
+    """An HTML template with subject and text templates, rendered per recipient."""
+
+    def __init__(
+        self,
+        template_name: str,
+        subject: str,
+        body: str,
+        email_field: str = "email",
+        escape_html: bool = True,
+    ):
+        """Compile all three templates up front."""
+        self.html = get_compiled_template("html", template_name)
+        self.subject = compile_template(subject)
+        self.body = compile_template(body)
+        self.email_field = email_field
+        self.escape_html = escape_html
+
+    @property
+    def placeholders(self) -> List[str]:
+        """Every field a recipient record must supply, including the address."""
+        fields = dict.fromkeys(
+            self.subject.placeholders + self.body.placeholders + self.html.placeholders
+        )
+        return [
+            self.email_field,
+            *(name for name in fields if name != self.email_field),
+        ]
+
+    def missing(self, record: Mapping[str, object]) -> List[str]:
+        """List fields the record does not supply."""
+        missing = [name for name in self.placeholders[1:] if record.get(name) is None]
+        if not record.get(self.email_field):
+            missing.insert(0, self.email_field)
+        return missing
+
+    def validate(self, records: Iterable[Mapping[str, object]]) -> Dict[int, List[str]]:
+        """Map the index of each incomplete record to its missing fields."""
+        problems = {}
+        for row, record in enumerate(records):
+            missing = self.missing(record)
+            if missing:
+                problems[row] = missing
+        return problems
+
+    def render(
+        self, record: Mapping[str, object], row: Optional[int] = None
+    ) -> Dict[str, str]:
+        """Render the message fields for one recipient record."""
+        to = record.get(self.email_field)
+        if not to:
+            raise MissingPlaceholderError([self.email_field], row)
+        return {
+            "to": str(to),
+            "subject": self.subject.render(record, row=row),
+            "body": self.body.render(record, row=row),
+            "html_body": self.html.render(
+                record, escape_html=self.escape_html, row=row
+            ),
+        }
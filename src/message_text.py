@@ -0,0 +1,128 @@
+"""Decoding of message parts returned by messages.get in "full" format."""
+
+import base64
+from email.message import Message
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterator, List, Optional
+
+# Elements whose text is never shown to the reader
+_HIDDEN_ELEMENTS = {"head", "script", "style", "title"}
+# Elements that start a new line of text
+_BLOCK_ELEMENTS = {"br", "div", "p", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6"}
+
+
+def decode_body_data(data: str) -> bytes:
+    """Decode a part's base64url "data" field, which Gmail sends unpadded."""
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def part_header(part: Dict[str, Any], name: str) -> str:
+    """Return a part header's value (case-insensitive), or "" if absent."""
+    name = name.lower()
+    for header in part.get("headers", []):
+        if header["name"].lower() == name:
+            return header["value"]
+    return ""
+
+
+def part_charset(part: Dict[str, Any]) -> str:
+    """Charset declared in a part's Content-Type, defaulting to UTF-8."""
+    message = Message()
+    message["Content-Type"] = part_header(part, "Content-Type") or "text/plain"
+    return message.get_content_charset("utf-8")
+
+
+def decode_part_text(part: Dict[str, Any], data: Optional[bytes] = None) -> str:
+    """Decode a text part's body in its declared charset.
+
+    data is the body when it was fetched separately as an attachment;
+    otherwise the part's inline data is used.
+    """
+    if data is None:
+        data = decode_body_data(part.get("body", {}).get("data", ""))
+    try:
+        return data.decode(part_charset(part), errors="replace")
+    except LookupError:
+        return data.decode("utf-8", errors="replace")
+
+
+def iter_parts(payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Walk a message payload's parts depth-first, the payload itself first."""
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        yield part
+        stack.extend(reversed(part.get("parts", [])))
+
+
+def part_id(part: Dict[str, Any]) -> str:
+    """A part's ID within its message; a single-part message's body is "0"."""
+    return part.get("partId") or "0"
+
+
+def leaf_parts(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The parts of a message that hold content, skipping multipart containers."""
+    return [part for part in iter_parts(payload) if not part.get("parts")]
+
+
+def find_part(payload: Dict[str, Any], wanted: str) -> Optional[Dict[str, Any]]:
+    """Find a content part by its part ID."""
+    return next((p for p in leaf_parts(payload) if part_id(p) == wanted), None)
+
+
+def _is_inline_text(part: Dict[str, Any], mime_type: str) -> bool:
+    """Whether a part is a body of the given type rather than an attachment."""
+    return (
+        part.get("mimeType") == mime_type
+        and not part.get("filename")
+        and "data" in part.get("body", {})
+    )
+
+
+class _HTMLText(HTMLParser):
+    """Collects the visible text of an HTML document."""
+
+    def __init__(self):
+        """Initialize with no text collected."""
+        super().__init__(convert_charrefs=True)
+        self.chunks: List[str] = []
+        self._hidden = 0
+
+    def handle_starttag(self, tag, attrs):
+        """Enter hidden elements and break lines at block elements."""
+        if tag in _HIDDEN_ELEMENTS:
+            self._hidden += 1
+        elif tag in _BLOCK_ELEMENTS:
+            self.chunks.append("\n")
+
+    def handle_endtag(self, tag):
+        """Leave hidden elements."""
+        if tag in _HIDDEN_ELEMENTS and self._hidden:
+            self._hidden -= 1
+
+    def handle_data(self, data):
+        """Keep text outside hidden elements."""
+        if not self._hidden:
+            self.chunks.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """Reduce HTML to its visible text, one line per block element."""
+    parser = _HTMLText()
+    parser.feed(html)
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.chunks).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def extract_text(payload: Dict[str, Any], max_chars: int) -> str:
+    """Readable text of a message: its text/plain bodies, else its HTML's text.
+
+    Attachments are skipped. The result is truncated to max_chars.
+    """
+    parts = list(iter_parts(payload))
+    plain = [decode_part_text(p) for p in parts if _is_inline_text(p, "text/plain")]
+    if plain:
+        return "\n".join(plain)[:max_chars]
+    html = [decode_part_text(p) for p in parts if _is_inline_text(p, "text/html")]
+    return "\n".join(html_to_text(text) for text in html)[:max_chars]
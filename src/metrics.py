@@ -0,0 +1,48 @@
+"""In-process counters for monitoring Gmail client behaviour."""
+
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+
+
+class Metrics:
+    """Thread-safe counters, optionally broken down per user."""
+
+    def __init__(self):
+        """Initialize an empty counter registry."""
+        self._counters: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+        self._lock = threading.Lock()
+
+    def increment(
+        self, name: str, user: Optional[str] = None, value: float = 1
+    ) -> None:
+        """Add value to a counter, tracked in total and for the given user."""
+        with self._lock:
+            counter = self._counters[name]
+            counter["total"] += value
+            if user:
+                counter[user] += value
+
+    def get(self, name: str, user: Optional[str] = None) -> float:
+        """Read a counter's total, or its value for one user."""
+        with self._lock:
+            counter = self._counters.get(name)
+            if counter is None:
+                return 0
+            return counter.get(user or "total", 0)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Copy all counters as {name: {"total": n, user: n, ...}}."""
+        with self._lock:
+            return {name: dict(values) for name, values in self._counters.items()}
+
+    def reset(self) -> None:
+        """Clear all counters."""
+        with self._lock:
+            self._counters.clear()
+
+
+# Process-wide registry shared by clients, retry and rate limiting layers
+metrics = Metrics()
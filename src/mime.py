@@ -0,0 +1,251 @@
+"""MIME message construction shared by every send and draft path.
+
+Plain text and text+HTML messages, the common case, are written straight
+into one byte buffer without going through email.message.EmailMessage.
+Messages that need the full email package (attachments) use
+compose_mime_message.
+"""
+
+import base64
+import binascii
+import email.policy
+import random
+import sys
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import metrics
+
+_POLICY = email.policy.default
+_LINESEP = b"\n"
+# Longest header line written without folding (RFC 5322 recommends 78)
+_MAX_LINE_LENGTH = _POLICY.max_line_length
+# Longest body line sent without a transfer encoding (RFC 5322 hard limit)
+_MAX_UNENCODED_LINE_LENGTH = 998
+# Lines the email package samples when choosing quoted-printable or base64
+_SNIFF_LINES = 10
+# Quoted-printable output line length, and the bytes it carries unescaped
+_QP_LINE_LENGTH = 76
+_QP_LITERAL = bytes(range(33, 61)) + bytes(range(62, 127)) + b" \t\n"
+
+_URLSAFE = bytes.maketrans(b"+/", b"-_")
+
+
+def compose_mime_message(
+    sender: str,
+    to: Optional[str],
+    subject: str,
+    body: str,
+    cc: Optional[str] = None,
+    bcc: Optional[str] = None,
+    html_body: Optional[str] = None,
+) -> EmailMessage:
+    """Compose a MIME message; with to=None the To header is left for the caller."""
+    message = EmailMessage()
+
+    # Set recipients
+    if to:
+        message["To"] = to
+    if cc:
+        message["Cc"] = cc
+    if bcc:
+        message["Bcc"] = bcc
+
+    # Set subject and sender
+    message["Subject"] = subject
+    message["From"] = sender
+
+    # Set body content
+    if html_body:
+        message.set_content(body, cte=text_transfer_encoding(body))  # Plain text
+        message.add_alternative(
+            html_body, subtype="html", cte=text_transfer_encoding(html_body)
+        )
+    else:
+        message.set_content(body, cte=text_transfer_encoding(body))
+
+    return message
+
+
+def format_header(name: str, value: str) -> bytes:
+    """Serialize one header, folding and RFC 2047-encoding only when needed."""
+    if "\n" in value or "\r" in value:
+        raise ValueError(
+            "Header values may not contain linefeed or carriage return characters"
+        )
+    if value.isascii() and len(name) + len(value) + 2 <= _MAX_LINE_LENGTH:
+        return f"{name}: {value}".encode("ascii") + _LINESEP
+    return _POLICY.fold_binary(name, _POLICY.header_factory(name, value))
+
+
+def _estimated_sizes(lines: List[bytes], data: bytes) -> Dict[str, int]:
+    """Estimate encoded sizes from the body's byte distribution.
+
+    Quoted-printable costs two extra bytes per byte it must escape plus a soft
+    line break every 75 encoded characters; base64 costs a fixed 4/3 plus a
+    newline per 76 characters.
+    """
+    size = len(data)
+    escaped = len(data.translate(None, _QP_LITERAL))
+    expansion = 1 + 2 * escaped / size if size else 1
+    soft_breaks = sum(
+        int(len(line) * expansion) // (_QP_LINE_LENGTH - 1) for line in lines
+    )
+    return {
+        "quoted-printable": size + 2 * escaped + 2 * soft_breaks,
+        "base64": (size + 2) // 3 * 4 + (size + 56) // 57,
+    }
+
+
+def _default_encoding_size(
+    lines: List[bytes], data: bytes, longest: int, sizes: Dict[str, int]
+) -> Tuple[str, int]:
+    """Encoding and size the email package's own heuristics would produce.
+
+    It only sends lines of up to 78 bytes unencoded, and otherwise decides
+    between quoted-printable and base64 by sampling the first lines.
+    """
+    if longest <= _POLICY.max_line_length:
+        return ("7bit" if data.isascii() else "8bit"), len(data)
+    sniff = _LINESEP.join(lines[:_SNIFF_LINES]) + _LINESEP
+    if len(binascii.b2a_qp(sniff, istext=True)) > len(binascii.b2a_base64(sniff)):
+        return "base64", sizes["base64"]
+    return "quoted-printable", sizes["quoted-printable"]
+
+
+def _body_lines(text: str) -> Tuple[List[bytes], bytes, int]:
+    """Split a body into lines, normalize line endings, and find the longest."""
+    lines = text.encode("utf-8").splitlines()
+    data = _LINESEP.join(lines) + _LINESEP
+    return lines, data, max((len(line) for line in lines), default=0)
+
+
+def _choose_encoding(
+    lines: List[bytes], data: bytes, longest: int
+) -> Tuple[str, Dict[str, int]]:
+    """Pick the transfer encoding that yields the fewest bytes.
+
+    Bodies whose lines all fit within the RFC 5322 limit go out unencoded
+    (7bit, or 8bit when not ASCII). Otherwise the smaller of quoted-printable
+    and base64 is chosen from the body's byte distribution, so markup full of
+    "=" or mostly non-ASCII text doesn't get quoted-printable's 3x expansion.
+    Returns the encoding and the size estimates it was chosen from, if any.
+    """
+    if longest <= _MAX_UNENCODED_LINE_LENGTH:
+        return ("7bit" if data.isascii() else "8bit"), {}
+    sizes = _estimated_sizes(lines, data)
+    if sizes["base64"] < sizes["quoted-printable"]:
+        return "base64", sizes
+    return "quoted-printable", sizes
+
+
+def text_transfer_encoding(text: str) -> str:
+    """Transfer encoding the fast path would choose for a text body."""
+    return _choose_encoding(*_body_lines(text))[0]
+
+
+def _encode_text(text: str) -> Tuple[str, bytes]:
+    """Encode a text body with the smallest transfer encoding.
+
+    Bytes saved against the email package's heuristics are counted in
+    metrics, along with the encodings chosen.
+    """
+    lines, data, longest = _body_lines(text)
+    cte, sizes = _choose_encoding(lines, data, longest)
+    if cte == "base64":
+        payload = base64.encodebytes(data)
+    elif cte == "quoted-printable":
+        payload = binascii.b2a_qp(data, istext=True)
+    else:
+        payload = data
+
+    if longest > _POLICY.max_line_length:
+        default_cte, default_size = _default_encoding_size(
+            lines, data, longest, sizes or _estimated_sizes(lines, data)
+        )
+        if default_cte != cte:
+            metrics.increment("mime_bytes_saved", value=default_size - len(payload))
+    metrics.increment(f"mime_parts_{cte.replace('-', '_')}")
+    metrics.increment("mime_encoded_bytes", value=len(payload))
+    return cte, payload
+
+
+def _text_part(subtype: str, text: str) -> List[bytes]:
+    """Content headers and encoded payload of a text part."""
+    cte, payload = _encode_text(text)
+    return [
+        f'Content-Type: text/{subtype}; charset="utf-8"\n'
+        f"Content-Transfer-Encoding: {cte}\n\n".encode("ascii"),
+        payload,
+    ]
+
+
+def _make_boundary(payloads: List[bytes]) -> bytes:
+    """Choose a multipart boundary that occurs in none of the payloads."""
+    while True:
+        token = random.randrange(sys.maxsize)
+        boundary = b"=" * 15 + b"%019d" % token + b"=="
+        if not any(boundary in payload for payload in payloads):
+            return boundary
+
+
+def build_mime_message(
+    sender: str,
+    to: Optional[str],
+    subject: str,
+    body: str,
+    cc: Optional[str] = None,
+    bcc: Optional[str] = None,
+    html_body: Optional[str] = None,
+) -> bytes:
+    """Build a MIME message; with to=None the To header is left for the caller."""
+    parts = []
+    if to:
+        parts.append(format_header("To", to))
+    if cc:
+        parts.append(format_header("Cc", cc))
+    if bcc:
+        parts.append(format_header("Bcc", bcc))
+    parts.append(format_header("Subject", subject))
+    parts.append(format_header("From", sender))
+    parts.append(b"MIME-Version: 1.0\n")
+
+    if not html_body:
+        parts.extend(_text_part("plain", body))
+        return b"".join(parts)
+
+    plain = _text_part("plain", body)
+    html = _text_part("html", html_body)
+    boundary = _make_boundary([plain[1], html[1]])
+    delimiter = b"\n--" + boundary + b"\n"
+    parts.append(
+        b'Content-Type: multipart/alternative;\n boundary="' + boundary + b'"\n'
+    )
+    parts.append(delimiter)
+    parts.extend(plain)
+    parts.append(delimiter)
+    parts.extend(html)
+    parts.append(b"\n--" + boundary + b"--\n")
+    return b"".join(parts)
+
+
+def encode_raw_message(message: bytes) -> str:
+    """Encode MIME bytes as the base64url "raw" field the API expects."""
+    return (
+        binascii.b2a_base64(message, newline=False).translate(_URLSAFE).decode("ascii")
+    )
+
+
+def build_raw_message(
+    sender: str,
+    to: str,
+    subject: str,
+    body: str,
+    cc: Optional[str] = None,
+    bcc: Optional[str] = None,
+    html_body: Optional[str] = None,
+) -> str:
+    """Build a MIME message and return it base64url-encoded for the API."""
+    return encode_raw_message(
+        build_mime_message(sender, to, subject, body, cc, bcc, html_body)
+    )
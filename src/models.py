@@ -1,6 +1,6 @@
 """Pydantic models for Gmail MCP server."""
 
-from typing import Optional
+from typing import Optional, List
 from pydantic import BaseModel
 
 
@@ -13,6 +13,7 @@ class EmailRequest(BaseModel):
     cc: Optional[str] = None
     bcc: Optional[str] = None
     html_body: Optional[str] = None
+    attachments: Optional[List[str]] = None
 
 
 class DraftRequest(BaseModel):
@@ -24,6 +25,7 @@ class DraftRequest(BaseModel):
     cc: Optional[str] = None
     bcc: Optional[str] = None
     html_body: Optional[str] = None
+    attachments: Optional[List[str]] = None
 
 
 class EmailResponse(BaseModel):
@@ -46,9 +48,137 @@ class DraftInfo(BaseModel):
     snippet: str
 
 
+class DraftPage(BaseModel):
+    """One page of drafts with the cursor for the next page."""
+
+    drafts: List[DraftInfo]
+    next_page_token: Optional[str] = None
+
+
+class AccountPage(BaseModel):
+    """One page of authenticated accounts with the cursor for the next page."""
+
+    accounts: List[str]
+    current: Optional[str] = None
+    next_after: Optional[str] = None
+
+
 class UserInfo(BaseModel):
     """User profile information model."""
 
     email: str
     messages_total: int
     threads_total: int
+
+
+class BulkEmailMessage(BaseModel):
+    """One message in a bulk send."""
+
+    to: str
+    subject: str
+    body: str
+    cc: Optional[str] = None
+    bcc: Optional[str] = None
+    html_body: Optional[str] = None
+
+
+class BulkSendResult(BaseModel):
+    """Delivery outcome for one message of a bulk send."""
+
+    index: int
+    to: str
+    status: str
+    id: Optional[str] = None
+    thread_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkSendResponse(BaseModel):
+    """Summary and per-message results of a bulk send."""
+
+    total: int
+    sent: int
+    failed: int
+    results: List[BulkSendResult]
+
+
+class MessageSummary(BaseModel):
+    """Compact view of a message in search results."""
+
+    id: str
+    thread_id: str
+    sender: str
+    to: str
+    subject: str
+    date: str
+    snippet: str
+    labels: List[str]
+    unread: bool
+
+
+class SearchResult(BaseModel):
+    """One page of message search results."""
+
+    messages: List[MessageSummary]
+    next_page_token: Optional[str] = None
+    result_size_estimate: int = 0
+
+
+class LocalSearchHit(MessageSummary):
+    """A message found in the local index, with its relevance score."""
+
+    score: float
+
+
+class LocalSearchResult(BaseModel):
+    """Ranked results from the local index."""
+
+    messages: List[LocalSearchHit]
+    indexed_messages: int
+    stale: bool = False
+
+
+class MessagePart(BaseModel):
+    """A content part of a message, described without its body."""
+
+    part_id: str
+    mime_type: str
+    filename: str = ""
+    size: int = 0
+    attachment: bool = False
+
+
+class ThreadMessage(MessageSummary):
+    """A message in a thread, with its headers and an outline of its parts."""
+
+    cc: str = ""
+    parts: List[MessagePart]
+
+
+class ThreadView(BaseModel):
+    """A conversation with its messages in order."""
+
+    id: str
+    messages: List[ThreadMessage]
+
+
+class PartContent(BaseModel):
+    """The decoded body of one message part, or where it was saved."""
+
+    message_id: str
+    part_id: str
+    mime_type: str
+    filename: str = ""
+    size: int = 0
+    text: Optional[str] = None
+    next_offset: Optional[int] = None
+    saved_to: Optional[str] = None
+
+
+class BulkModifyResult(BaseModel):
+    """Outcome of a bulk label change, archive or trash."""
+
+    matched: int
+    modified: int
+    batches: int
+    dry_run: bool = False
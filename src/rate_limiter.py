@@ -0,0 +1,155 @@
+"""Client-side pacing of Gmail requests against per-user quota units."""
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from .config import DAILY_QUOTA_UNITS, QUOTA_BURST_UNITS, QUOTA_UNITS_PER_SECOND
+from .metrics import metrics
+from .registry import UserRegistry
+
+# Quota units charged by Gmail per method, keyed by discovery method ID
+# (https://developers.google.com/gmail/api/reference/quota)
+QUOTA_UNITS: Dict[str, int] = {
+    "gmail.users.getProfile": 1,
+    "gmail.users.drafts.create": 10,
+    "gmail.users.drafts.delete": 10,
+    "gmail.users.drafts.get": 5,
+    "gmail.users.drafts.list": 5,
+    "gmail.users.drafts.send": 100,
+    "gmail.users.drafts.update": 15,
+    "gmail.users.history.list": 2,
+    "gmail.users.labels.list": 1,
+    "gmail.users.messages.attachments.get": 5,
+    "gmail.users.messages.batchDelete": 50,
+    "gmail.users.messages.batchModify": 50,
+    "gmail.users.messages.delete": 10,
+    "gmail.users.messages.get": 5,
+    "gmail.users.messages.list": 5,
+    "gmail.users.messages.modify": 5,
+    "gmail.users.messages.send": 100,
+    "gmail.users.messages.trash": 5,
+    "gmail.users.messages.untrash": 5,
+    "gmail.users.threads.get": 10,
+    "gmail.users.threads.list": 10,
+    "gmail.users.threads.modify": 10,
+    "gmail.users.threads.trash": 10,
+}
+
+# Charge for methods missing from the table above
+DEFAULT_QUOTA_UNITS = 5
+
+
+class QuotaExceededError(Exception):
+    """Raised when a request would exceed the configured daily quota."""
+
+
+def request_units(request: Any) -> int:
+    """Quota units Gmail charges for a googleapiclient request."""
+    return QUOTA_UNITS.get(getattr(request, "methodId", None), DEFAULT_QUOTA_UNITS)
+
+
+class QuotaBucket:
+    """Token bucket for one user, refilled at a fixed number of units per second.
+
+    Callers reserve units up front, letting the balance go negative, and then
+    sleep until their reservation is covered. This queues bursts in arrival
+    order instead of rejecting them.
+    """
+
+    def __init__(
+        self,
+        user: str,
+        units_per_second: float = QUOTA_UNITS_PER_SECOND,
+        burst: float = QUOTA_BURST_UNITS,
+        daily_limit: int = DAILY_QUOTA_UNITS,
+    ):
+        """Initialize a full bucket; daily_limit of 0 disables the daily budget."""
+        self.user = user
+        self.units_per_second = units_per_second
+        self.burst = burst
+        self.daily_limit = daily_limit
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._day = self._today()
+        self._used_today = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _today() -> str:
+        # Gmail's daily quotas reset at midnight Pacific; UTC days are close
+        # enough for pacing purposes.
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def reserve(self, units: int) -> float:
+        """Reserve units and return how many seconds to wait before sending."""
+        with self._lock:
+            if self.daily_limit:
+                today = self._today()
+                if today != self._day:
+                    self._day = today
+                    self._used_today = 0
+                if self._used_today + units > self.daily_limit:
+                    metrics.increment("gmail_quota_rejections", self.user)
+                    raise QuotaExceededError(
+                        f"Daily Gmail quota of {self.daily_limit} units exhausted "
+                        f"for {self.user}"
+                    )
+                self._used_today += units
+
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst,
+                self._tokens + (now - self._updated_at) * self.units_per_second,
+            )
+            self._updated_at = now
+            self._tokens -= units
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.units_per_second
+
+        metrics.increment("gmail_quota_units", self.user, units)
+        if wait > 0:
+            metrics.increment("gmail_rate_limit_waits", self.user)
+            metrics.increment("gmail_rate_limit_wait_seconds", self.user, wait)
+        return wait
+
+    def usage(self) -> Dict[str, Any]:
+        """Report the current balance and daily consumption."""
+        with self._lock:
+            return {
+                "available_units": round(self._tokens, 1),
+                "used_today": self._used_today,
+                "daily_limit": self.daily_limit or None,
+            }
+
+
+class RateLimiter:
+    """Per-user quota buckets shared by all clients in the process."""
+
+    def __init__(self):
+        """Initialize with no buckets; they are created per user on demand."""
+        self._buckets: UserRegistry[QuotaBucket] = UserRegistry(QuotaBucket)
+
+    def bucket(self, user: Optional[str]) -> QuotaBucket:
+        """Get or create the bucket for a user."""
+        return self._buckets.get(user)
+
+    def acquire(self, user: Optional[str], units: int) -> None:
+        """Block until the user's budget covers units."""
+        wait = self.bucket(user).reserve(units)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, user: Optional[str], units: int) -> None:
+        """Wait, without blocking the event loop, until the budget covers units."""
+        wait = self.bucket(user).reserve(units)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def usage(self) -> Dict[str, Dict[str, Any]]:
+        """Report quota usage for every user seen so far."""
+        return {user: bucket.usage() for user, bucket in self._buckets.items()}
+
+
+rate_limiter = RateLimiter()
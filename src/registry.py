@@ -0,0 +1,39 @@
+"""Per-user state shared by every client and tool call in the process."""
+
+import threading
+from typing import Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class UserRegistry(Generic[T]):
+    """Creates one object per user on first use and hands out the same one after.
+
+    Calls made before the user is known share the "unknown" entry.
+    """
+
+    def __init__(self, factory: Callable[[str], T]):
+        """Initialize an empty registry that builds entries with factory(user)."""
+        self._factory = factory
+        self._entries: Dict[str, T] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user: Optional[str]) -> T:
+        """Get or create the entry for a user."""
+        key = user or "unknown"
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._factory(key)
+                self._entries[key] = entry
+            return entry
+
+    def pop(self, user: str) -> Optional[T]:
+        """Remove and return a user's entry, if there is one."""
+        with self._lock:
+            return self._entries.pop(user, None)
+
+    def items(self) -> List[Tuple[str, T]]:
+        """Snapshot of every user's entry."""
+        with self._lock:
+            return list(self._entries.items())
@@ -0,0 +1,303 @@
+"""Retry policy and per-user circuit breaking for Gmail API calls."""
+
+import asyncio
+import email.utils
+import random
+import socket
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+import httplib2
+import httpx
+from googleapiclient.errors import HttpError
+
+from .config import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_DELAY,
+)
+from .metrics import metrics
+from .registry import UserRegistry
+
+# Statuses worth retrying for reads; Gmail also signals throttling with 403
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+# Transport failures where the request never reached Gmail, safe even for sends
+CONNECT_ERRORS = (
+    ConnectionRefusedError,
+    httplib2.ServerNotFoundError,
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+)
+TRANSPORT_ERRORS = (
+    OSError,
+    socket.timeout,
+    httplib2.HttpLib2Error,
+    httpx.TransportError,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a user's circuit is open and calls fail fast."""
+
+
+def _status(error: Exception) -> Optional[int]:
+    """HTTP status of a Gmail error (BatchError is an HttpError with no response)."""
+    if isinstance(error, HttpError) and error.resp is not None:
+        return error.status_code
+    return None
+
+
+def _error_reason(error: HttpError) -> Optional[str]:
+    """Extract the first Gmail error reason (e.g. rateLimitExceeded)."""
+    details = error.error_details
+    if isinstance(details, list) and details and isinstance(details[0], dict):
+        return details[0].get("reason")
+    return None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def is_throttled(error: Exception) -> bool:
+    """Whether Gmail rejected the request for rate limiting (never processed)."""
+    status = _status(error)
+    return status == 429 or (
+        status == 403 and _error_reason(error) in RATE_LIMIT_REASONS
+    )
+
+
+def is_retryable(error: Exception, idempotent: bool) -> bool:
+    """Decide whether a failed call may be attempted again.
+
+    Reads retry on throttling, 5xx and network errors. Sends are not
+    idempotent, so they only retry when Gmail cannot have processed them:
+    throttling responses and failures to connect.
+    """
+    if is_throttled(error) or isinstance(error, CONNECT_ERRORS):
+        return True
+    if not idempotent:
+        return False
+    if isinstance(error, HttpError):
+        return _status(error) in RETRYABLE_STATUSES
+    return isinstance(error, TRANSPORT_ERRORS)
+
+
+def indicates_degradation(error: Exception) -> bool:
+    """Whether an error suggests Gmail itself is unhealthy (trips the breaker)."""
+    if isinstance(error, HttpError):
+        return _status(error) in RETRYABLE_STATUSES or is_throttled(error)
+    return isinstance(error, TRANSPORT_ERRORS)
+
+
+class RetryPolicy:
+    """Jittered exponential backoff that honours Retry-After."""
+
+    def __init__(
+        self,
+        max_attempts: int = RETRY_MAX_ATTEMPTS,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: float = RETRY_MAX_DELAY,
+    ):
+        """Initialize policy with attempt limit and delay bounds in seconds."""
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, error: Exception) -> float:
+        """Seconds to wait before retry number attempt (0-based).
+
+        Uses full jitter over an exponentially growing window, but never less
+        than the server's Retry-After.
+        """
+        window = min(self.max_delay, self.base_delay * (2**attempt))
+        delay = random.uniform(0, window)
+        if _status(error) is not None:
+            retry_after = parse_retry_after(error.resp.get("retry-after"))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        return delay
+
+
+class CircuitBreaker:
+    """Fails fast for a user after repeated signs that Gmail is degraded.
+
+    closed -> open after failure_threshold consecutive failures; open ->
+    half-open after reset_timeout, letting a single trial call through;
+    a successful trial closes the circuit, a failed one reopens it.
+    """
+
+    def __init__(
+        self,
+        user: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+    ):
+        """Initialize a closed circuit for a user."""
+        self.user = user
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Admit a call or raise CircuitOpenError."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    metrics.increment("gmail_circuit_rejections", self.user)
+                    raise CircuitOpenError(
+                        f"Gmail is failing for {self.user}; "
+                        f"retry in {self.retry_in():.0f}s"
+                    )
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                metrics.increment("gmail_circuit_rejections", self.user)
+                raise CircuitOpenError(
+                    f"Gmail is failing for {self.user}; trial request in progress"
+                )
+            self._trial_in_flight = True
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit admits a trial call."""
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful call."""
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a degradation failure, opening the circuit at the threshold."""
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    metrics.increment("gmail_circuit_opened", self.user)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def record_neutral(self) -> None:
+        """Finish a call whose error says nothing about Gmail's health (e.g. 404)."""
+        with self._lock:
+            self._trial_in_flight = False
+            if self.state == "half_open":
+                self.state = "closed"
+                self.failures = 0
+
+
+class CircuitBreakerRegistry(UserRegistry[CircuitBreaker]):
+    """Per-user circuit breakers, kept across client rebuilds."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        super().__init__(CircuitBreaker)
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        """Report each user's circuit state and consecutive failure count."""
+        return {
+            user: {"state": breaker.state, "failures": breaker.failures}
+            for user, breaker in self.items()
+        }
+
+
+circuit_breakers = CircuitBreakerRegistry()
+
+
+def _record_outcome(breaker: CircuitBreaker, error: Exception) -> None:
+    """Update the breaker and failure counters for a failed attempt."""
+    if indicates_degradation(error):
+        breaker.record_failure()
+        metrics.increment("gmail_transient_errors", breaker.user)
+    else:
+        breaker.record_neutral()
+
+
+def call_with_retry(
+    func: Callable[[], Any],
+    breaker: CircuitBreaker,
+    idempotent: bool = True,
+    policy: Optional[RetryPolicy] = None,
+) -> Any:
+    """Run a blocking Gmail call under the retry policy and circuit breaker."""
+    policy = policy or default_policy
+    attempt = 0
+    while True:
+        breaker.before_call()
+        metrics.increment("gmail_requests", breaker.user)
+        try:
+            result = func()
+        except Exception as e:
+            _record_outcome(breaker, e)
+            if attempt + 1 >= policy.max_attempts or not is_retryable(e, idempotent):
+                metrics.increment("gmail_failures", breaker.user)
+                raise
+            metrics.increment("gmail_retries", breaker.user)
+            time.sleep(policy.delay(attempt, e))
+            attempt += 1
+            continue
+        except BaseException:
+            # Cancelled or interrupted: free a half-open trial slot
+            breaker.record_neutral()
+            raise
+        breaker.record_success()
+        return result
+
+
+async def call_with_retry_async(
+    func: Callable[[], Awaitable[Any]],
+    breaker: CircuitBreaker,
+    idempotent: bool = True,
+    policy: Optional[RetryPolicy] = None,
+) -> Any:
+    """Run an async Gmail call under the retry policy and circuit breaker."""
+    policy = policy or default_policy
+    attempt = 0
+    while True:
+        breaker.before_call()
+        metrics.increment("gmail_requests", breaker.user)
+        try:
+            result = await func()
+        except Exception as e:
+            _record_outcome(breaker, e)
+            if attempt + 1 >= policy.max_attempts or not is_retryable(e, idempotent):
+                metrics.increment("gmail_failures", breaker.user)
+                raise
+            metrics.increment("gmail_retries", breaker.user)
+            await asyncio.sleep(policy.delay(attempt, e))
+            attempt += 1
+            continue
+        except BaseException:
+            # Cancelled or interrupted: free a half-open trial slot
+            breaker.record_neutral()
+            raise
+        breaker.record_success()
+        return result
+
+
+default_policy = RetryPolicy()
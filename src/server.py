@@ -1,11 +1,58 @@
 """MCP server implementation for Gmail functionality."""
 
-from typing import Optional, List
-from mcp.server.fastmcp import FastMCP
-
+import inspect
+from functools import partial
+from pathlib import Path
+from typing import Optional, List, Union
+from mcp.server.fastmcp import Context, FastMCP
+
+from .async_gmail_client import AsyncGmailClient
+from .attachments import resolve_attachments
 from .auth_manager import AuthManager
+from .client_pool import ClientPool
+from .bulk_modify import modify_messages, resolve_labels
+from .bulk_sender import BulkJob, TemplateMessage, deliver_bulk
+from .config import (
+    ASYNC_MAX_CALLS,
+    ASYNC_MAX_CALLS_PER_USER,
+    ATTACHMENT_DIR,
+    BACKEND,
+    BULK_SEND_CONCURRENCY,
+    CLIENT_POOL_SIZE,
+    DOWNLOAD_DIR,
+    MAX_WORKERS,
+    MAX_WORKERS_PER_USER,
+    PART_TEXT_PAGE_CHARS,
+    TOKEN_REFRESH_AHEAD,
+)
+from .draft_cache import draft_caches
+from .executor import FairScheduler, GmailExecutor
+from .local_index import LocalIndexRegistry
+from .mail_merge import MailMerge, iter_recipient_records
+from .metrics import metrics
+from .rate_limiter import rate_limiter
+from .retry import circuit_breakers
+from .threads import fetch_thread, read_part, thread_caches
+from .token_refresher import TokenRefresher
 from .gmail_client import GmailClient
-from .models import EmailRequest, DraftRequest, EmailResponse, DraftInfo, UserInfo
+from .models import (
+    EmailRequest,
+    DraftRequest,
+    EmailResponse,
+    DraftInfo,
+    DraftPage,
+    AccountPage,
+    UserInfo,
+    BulkEmailMessage,
+    BulkSendResponse,
+    MessageSummary,
+    SearchResult,
+    LocalSearchHit,
+    LocalSearchResult,
+    ThreadView,
+    PartContent,
+    BulkModifyResult,
+)
 from .resources.html_email_templates import HTML_EMAIL_TEMPLATES
 from .resources.email_signatures import EMAIL_SIGNATURES, get_signature_template
 from .resources.subject_line_guidelines import (
@@ -21,6 +68,40 @@ mcp = FastMCP("Gmail MCP Server")
 # Global auth manager
 auth_manager = AuthManager()
 
+# The only directory get_message_part writes message parts into
+download_dir = (
+    Path(DOWNLOAD_DIR).expanduser()
+    if DOWNLOAD_DIR
+    else auth_manager.config_dir / "downloads"
+)
+
+# Built Gmail clients reused across tool calls, dropped when credentials change
+client_pool = ClientPool(
+    max_size=CLIENT_POOL_SIZE,
+    client_factory=(
+        partial(AsyncGmailClient, refresh_credentials=auth_manager.refresh_credentials)
+        if BACKEND == "async"
+        else GmailClient
+    ),
+)
+auth_manager.add_invalidation_listener(client_pool.invalidate)
+
+# Renews access tokens of users seen by this process before they expire
+token_refresher = TokenRefresher(auth_manager)
+auth_manager.add_invalidation_listener(token_refresher.forget)
+auth_manager.add_invalidation_listener(draft_caches.invalidate)
+
+# Blocking Gmail and credential I/O runs here so tools never stall the event loop
+gmail_executor = GmailExecutor(
+    max_workers=MAX_WORKERS, per_user_limit=MAX_WORKERS_PER_USER
+)
+
+# Fair turn order for async backend calls, with limits of their own
+async_scheduler = FairScheduler(ASYNC_MAX_CALLS, ASYNC_MAX_CALLS_PER_USER)
+
+# Optional full-text indexes of each user's mail, built by sync_local_index
+local_indexes = LocalIndexRegistry(auth_manager.config_dir / "index")
+
 
 # Add prompts for enhanced email composition guidance
 @mcp.prompt()
@@ -609,12 +690,91 @@ def email_review_checklist(
     """
 
 
-def get_authenticated_client() -> Optional[GmailClient]:
-    """Get authenticated Gmail client for current user."""
-    credentials = auth_manager.get_credentials()
+def resolve_account(account: Optional[str] = None) -> Optional[str]:
+    """The account a tool acts for: account if it is authenticated, else None.
+
+    Without account, this is the current user. Names the token store can't
+    hold (e.g. containing a path separator) are never authenticated.
+    """
+    if account is None:
+        return auth_manager.get_current_user()
+    try:
+        return account if auth_manager.has_user(account) else None
+    except ValueError:
+        return None
+
+
+def _no_account_error(account: Optional[str]) -> Exception:
+    """The error raised when a tool has no authenticated account to act for."""
+    if account is None:
+        return Exception(
+            "No authenticated user. Please login first with: gmail-mcp --login"
+        )
+    return Exception(
+        f"Account not authenticated: {account}. Log it in with: gmail-mcp --login"
+    )
+
+
+def allowed_attachments(paths: Optional[List[str]]) -> List[str]:
+    """Resolve attachment paths, refusing the config directory's key and tokens."""
+    return resolve_attachments(
+        paths,
+        allowed_dir=ATTACHMENT_DIR or None,
+        private_dirs=[str(auth_manager.config_dir)],
+    )
+
+
+def get_authenticated_client(
+    account: Optional[str] = None,
+) -> Optional[Union[GmailClient, AsyncGmailClient]]:
+    """Get authenticated Gmail client for an account (current user by default)."""
+    email = resolve_account(account)
+    if not email:
+        return None
+    credentials = auth_manager.get_credentials(email)
     if not credentials:
         return None
-    return GmailClient(credentials)
+    if TOKEN_REFRESH_AHEAD:
+        token_refresher.watch(email, credentials)
+    return client_pool.get(email, credentials)
+
+
+async def require_client(
+    account: Optional[str] = None,
+) -> Union[GmailClient, AsyncGmailClient]:
+    """Load an account's client off the event loop, or fail if not logged in."""
+    try:
+        client = await gmail_executor.run(None, get_authenticated_client, account)
+    except Exception as e:
+        # The token is kept; the next call tries to refresh it again
+        raise Exception(f"Failed to refresh credentials: {str(e)}")
+    if not client:
+        raise _no_account_error(account)
+    return client
+
+
+async def require_account(account: Optional[str] = None) -> str:
+    """Resolve an account off the event loop, or fail if not logged in."""
+    user = await gmail_executor.run(None, resolve_account, account)
+    if not user:
+        raise _no_account_error(account)
+    return user
+
+
+async def run_client(
+    client: Union[GmailClient, AsyncGmailClient], method: str, *args, **kwargs
+):
+    """Call a client method without blocking the event loop.
+
+    Async backend methods are awaited directly under async_scheduler and
+    blocking GmailClient methods run on the executor; either way the call
+    waits for a slot of its user's fair share.
+    """
+    func = getattr(client, method)
+    if inspect.iscoroutinefunction(func):
+        async with async_scheduler.slot(client.user_email):
+            return await func(*args, **kwargs)
+    return await gmail_executor.run(client.user_email, func, *args, **kwargs)
 
 
 @mcp.tool()
@@ -625,7 +785,9 @@ async def send_email(
     cc: Optional[str] = None,
     bcc: Optional[str] = None,
     html_body: Optional[str] = None,
-    ctx=None,
+    attachments: Optional[List[str]] = None,
+    account: Optional[str] = None,
+    ctx: Context = None,
 ) -> EmailResponse:
     """Send an email via Gmail.
 
@@ -636,12 +798,10 @@ async def send_email(
         cc: CC recipients (optional)
         bcc: BCC recipients (optional)
         html_body: HTML version of email body (optional)
+        attachments: Paths of files to attach (optional)
+        account: Account to act for (default: the current user; see list_accounts)
     """
-    client = get_authenticated_client()
-    if not client:
-        raise Exception(
-            "No authenticated user. Please login first with: gmail-mcp --login"
-        )
+    client = await require_client(account)
 
     if ctx:
         await ctx.info(f"Sending email to {to}")
@@ -649,16 +809,25 @@ async def send_email(
     try:
         # Validate email request
         email_req = EmailRequest(
-            to=to, subject=subject, body=body, cc=cc, bcc=bcc, html_body=html_body
+            to=to,
+            subject=subject,
+            body=body,
+            cc=cc,
+            bcc=bcc,
+            html_body=html_body,
+            attachments=attachments,
         )
 
-        result = client.send_email(
+        result = await run_client(
+            client,
+            "send_email",
             to=email_req.to,
             subject=email_req.subject,
             body=email_req.body,
             cc=email_req.cc,
             bcc=email_req.bcc,
             html_body=email_req.html_body,
+            attachments=allowed_attachments(email_req.attachments),
         )
 
         if ctx:
@@ -672,6 +841,211 @@ async def send_email(
         raise Exception(f"Failed to send email: {str(e)}")
 
 
+async def _deliver_and_summarize(
+    jobs: List[BulkJob], label: str, ctx: Optional[Context]
+) -> BulkSendResponse:
+    """Run bulk send jobs, reporting progress to ctx, and count the outcomes."""
+
+    async def report_progress(done: int, total: int) -> None:
+        if ctx:
+            await ctx.report_progress(done, total)
+
+    results = await deliver_bulk(jobs, BULK_SEND_CONCURRENCY, report_progress)
+    sent = sum(1 for result in results if result.status == "sent")
+
+    if ctx:
+        await ctx.info(f"{label} finished: {sent} sent, {len(results) - sent} failed")
+
+    return BulkSendResponse(
+        total=len(results), sent=sent, failed=len(results) - sent, results=results
+    )
+
+
+@mcp.tool()
+async def send_bulk_emails(
+    messages: Optional[List[BulkEmailMessage]] = None,
+    recipients: Optional[List[str]] = None,
+    subject: Optional[str] = None,
+    body: Optional[str] = None,
+    cc: Optional[str] = None,
+    bcc: Optional[str] = None,
+    html_body: Optional[str] = None,
+    account: Optional[str] = None,
+    ctx: Context = None,
+) -> BulkSendResponse:
+    """Send many emails concurrently and report the outcome of each.
+
+    Either pass `messages` (each with its own to/subject/body), or pass
+    `recipients` with a shared `subject`/`body` (and optional cc, bcc,
+    html_body) to send one message to every recipient individually. The
+    shared message's cc and bcc addresses get one copy, sent together with
+    the first recipient's.
+
+    Args:
+        messages: Individual messages to send
+        recipients: Recipient addresses for a shared message
+        subject: Subject of the shared message
+        body: Plain text body of the shared message
+        cc: CC recipients of the shared message (optional)
+        bcc: BCC recipients of the shared message (optional)
+        html_body: HTML body of the shared message (optional)
+        account: Account to act for (default: the current user; see list_accounts)
+    """
+    if messages and recipients:
+        raise ValueError("Pass either messages or recipients, not both")
+    if recipients and (subject is None or body is None):
+        raise ValueError("subject and body are required with recipients")
+    if not messages and not recipients:
+        raise ValueError("Nothing to send: pass messages or recipients")
+
+    client = await require_client(account)
+
+    if messages:
+        jobs = [
+            (
+                message.to,
+                lambda message=message: run_client(
+                    client,
+                    "send_email",
+                    to=message.to,
+                    subject=message.subject,
+                    body=message.body,
+                    cc=message.cc,
+                    bcc=message.bcc,
+                    html_body=message.html_body,
+                ),
+            )
+            for message in messages
+        ]
+    else:
+        # Build the shared MIME once; each recipient only adds a To header
+        sender = client.user_email or await run_client(client, "get_sender_address")
+        template = TemplateMessage(sender, subject, body, cc, bcc, html_body)
+        jobs = template.jobs(recipients, partial(run_client, client, "send_raw"))
+
+    if ctx:
+        await ctx.info(f"Sending {len(jobs)} emails")
+
+    return await _deliver_and_summarize(jobs, "Bulk send", ctx)
+
+
+@mcp.tool()
+async def preview_mail_merge(
+    template_name: str,
+    subject: str,
+    body: str,
+    recipients_csv: Optional[str] = None,
+    recipients_json: Optional[str] = None,
+    email_field: str = "email",
+    escape_html: bool = True,
+    ctx: Context = None,
+) -> dict:
+    """Check a mail merge and render the first recipient without sending.
+
+    Reports the placeholders the merge needs and any recipients missing them.
+
+    Args:
+        template_name: HTML template to merge (see get_email_templates)
+        subject: Subject line, may contain [PLACEHOLDER] fields
+        body: Plain text body, may contain [PLACEHOLDER] fields
+        recipients_csv: CSV text with a header row naming the fields (optional)
+        recipients_json: JSON array of objects or JSON Lines (optional)
+        email_field: Field holding each recipient's address (default: email)
+        escape_html: Escape field values inserted into the HTML (default: True)
+    """
+    try:
+        merge = MailMerge(template_name, subject, body, email_field, escape_html)
+        records = list(iter_recipient_records(recipients_csv, recipients_json))
+        problems = merge.validate(records)
+        first = next((row for row in range(len(records)) if row not in problems), None)
+
+        if ctx:
+            await ctx.info(
+                f"Previewed mail merge of {template_name} for {len(records)} recipients"
+            )
+
+        return {
+            "placeholders": merge.placeholders,
+            "recipients": len(records),
+            "valid": not problems,
+            "missing": {str(row): missing for row, missing in problems.items()},
+            "preview": (
+                merge.render(records[first], first) if first is not None else None
+            ),
+        }
+
+    except Exception as e:
+        if ctx:
+            await ctx.error(f"Failed to preview mail merge: {str(e)}")
+        raise Exception(f"Failed to preview mail merge: {str(e)}")
+
+
+@mcp.tool()
+async def send_mail_merge(
+    template_name: str,
+    subject: str,
+    body: str,
+    recipients_csv: Optional[str] = None,
+    recipients_json: Optional[str] = None,
+    email_field: str = "email",
+    escape_html: bool = True,
+    account: Optional[str] = None,
+    ctx: Context = None,
+) -> BulkSendResponse:
+    """Send a personalized copy of an HTML template to every recipient.
+
+    Every recipient is validated before anything is sent; if any record is
+    missing a placeholder value, nothing is sent.
+
+    Args:
+        template_name: HTML template to merge (see get_email_templates)
+        subject: Subject line, may contain [PLACEHOLDER] fields
+        body: Plain text body, may contain [PLACEHOLDER] fields
+        recipients_csv: CSV text with a header row naming the fields (optional)
+        recipients_json: JSON array of objects or JSON Lines (optional)
+        email_field: Field holding each recipient's address (default: email)
+        escape_html: Escape field values inserted into the HTML (default: True)
+        account: Account to act for (default: the current user; see list_accounts)
+    """
+    client = await require_client(account)
+
+    try:
+        merge = MailMerge(template_name, subject, body, email_field, escape_html)
+        records = list(iter_recipient_records(recipients_csv, recipients_json))
+        problems = merge.validate(records)
+        if problems:
+            details = "; ".join(
+                f"recipient {row}: {', '.join(missing)}"
+                for row, missing in list(problems.items())[:5]
+            )
+            raise ValueError(
+                f"{len(problems)} recipients are missing placeholder values ({details})"
+            )
+        if not records:
+            raise ValueError("Nothing to send: no recipients")
+
+    except Exception as e:
+        if ctx:
+            await ctx.error(f"Failed to send mail merge: {str(e)}")
+        raise Exception(f"Failed to send mail merge: {str(e)}")
+
+    # Bodies are rendered just before each send rather than all up front
+    jobs = [
+        (
+            str(record[email_field]),
+            lambda row=row, record=record: run_client(
+                client, "send_email", **merge.render(record, row)
+            ),
+        )
+        for row, record in enumerate(records)
+    ]
+
+    if ctx:
+        await ctx.info(f"Sending {template_name} to {len(jobs)} recipients")
+
+    return await _deliver_and_summarize(jobs, "Mail merge", ctx)
+
+
 @mcp.tool()
 async def create_draft(
     to: str,
@@ -680,7 +1054,9 @@ async def create_draft(
     cc: Optional[str] = None,
     bcc: Optional[str] = None,
     html_body: Optional[str] = None,
-    ctx=None,
+    attachments: Optional[List[str]] = None,
+    account: Optional[str] = None,
+    ctx: Context = None,
 ) -> EmailResponse:
     """Create an email draft.
 
@@ -691,28 +1067,35 @@ async def create_draft(
         cc: CC recipients (optional)
         bcc: BCC recipients (optional)
         html_body: HTML version of email body (optional)
+        attachments: Paths of files to attach (optional)
+        account: Account to act for (default: the current user; see list_accounts)
     """
-    client = get_authenticated_client()
-    if not client:
-        raise Exception(
-            "No authenticated user. Please login first with: gmail-mcp --login"
-        )
+    client = await require_client(account)
 
     if ctx:
         await ctx.info(f"Creating draft for {to}")
 
     try:
         draft_req = DraftRequest(
-            to=to, subject=subject, body=body, cc=cc, bcc=bcc, html_body=html_body
+            to=to,
+            subject=subject,
+            body=body,
+            cc=cc,
+            bcc=bcc,
+            html_body=html_body,
+            attachments=attachments,
         )
 
-        result = client.create_draft(
+        result = await run_client(
+            client,
+            "create_draft",
             to=draft_req.to,
             subject=draft_req.subject,
             body=draft_req.body,
             cc=draft_req.cc,
             bcc=draft_req.bcc,
             html_body=draft_req.html_body,
+            attachments=allowed_attachments(draft_req.attachments),
         )
 
         if ctx:
@@ -727,23 +1110,22 @@ async def create_draft(
 
 
 @mcp.tool()
-async def send_draft(draft_id: str, ctx=None) -> EmailResponse:
+async def send_draft(
+    draft_id: str, account: Optional[str] = None, ctx: Context = None
+) -> EmailResponse:
     """Send an existing email draft.
 
     Args:
         draft_id: ID of the draft to send
+        account: Account to act for (default: the current user; see list_accounts)
     """
-    client = get_authenticated_client()
-    if not client:
-        raise Exception(
-            "No authenticated user. Please login first with: gmail-mcp --login"
-        )
+    client = await require_client(account)
 
     if ctx:
         await ctx.info(f"Sending draft {draft_id}")
 
     try:
-        result = client.send_draft(draft_id)
+        result = await run_client(client, "send_draft", draft_id)
 
         if ctx:
             await ctx.info(f"Draft sent with message ID: {result['id']}")
@@ -757,27 +1139,48 @@ async def send_draft(draft_id: str, ctx=None) -> EmailResponse:
 
 
 @mcp.tool()
-async def list_drafts(max_results: int = 10, ctx=None) -> List[DraftInfo]:
-    """List email drafts.
+async def list_drafts(
+    max_results: int = 10,
+    page_token: Optional[str] = None,
+    use_cache: bool = False,
+    account: Optional[str] = None,
+    ctx: Context = None,
+) -> DraftPage:
+    """List email drafts one page at a time.
+
+    With use_cache, drafts are served from a local cache that is brought up to
+    date with a small Gmail history request on each call. Filling the cache
+    fetches every draft, so it pays off for accounts whose drafts are listed
+    repeatedly.
 
     Args:
-        max_results: Maximum number of drafts to return (default: 10)
+        max_results: Maximum number of drafts per page (default: 10, max: 500)
+        page_token: Token from a previous page's next_page_token (optional)
+        use_cache: Serve from the local draft cache (default: False) instead
+            of paging through Gmail directly
+        account: Account to act for (default: the current user; see list_accounts)
     """
-    client = get_authenticated_client()
-    if not client:
-        raise Exception(
-            "No authenticated user. Please login first with: gmail-mcp --login"
-        )
+    client = await require_client(account)
 
     if ctx:
         await ctx.info(f"Listing up to {max_results} drafts")
 
     try:
-        drafts = client.list_drafts(max_results)
-        result = [DraftInfo(**draft) for draft in drafts]
+        if use_cache:
+            drafts, next_page_token = await draft_caches.get(client.user_email).page(
+                partial(run_client, client), min(max_results, 500), page_token
+            )
+        else:
+            page = await run_client(client, "list_drafts_page", max_results, page_token)
+            drafts, next_page_token = page["drafts"], page["next_page_token"]
+
+        result = DraftPage(
+            drafts=[DraftInfo(**draft) for draft in drafts],
+            next_page_token=next_page_token,
+        )
 
         if ctx:
-            await ctx.info(f"Found {len(result)} drafts")
+            await ctx.info(f"Found {len(result.drafts)} drafts")
 
         return result
 
@@ -788,16 +1191,421 @@ async def list_drafts(max_results: int = 10, ctx=None) -> List[DraftInfo]:
 
 
 @mcp.tool()
-async def get_user_info(ctx=None) -> UserInfo:
-    """Get current authenticated user information."""
-    client = get_authenticated_client()
-    if not client:
-        raise Exception(
-            "No authenticated user. Please login first with: gmail-mcp --login"
+async def search_messages(
+    query: str,
+    max_results: int = 20,
+    page_token: Optional[str] = None,
+    include_spam_trash: bool = False,
+    account: Optional[str] = None,
+    ctx: Context = None,
+) -> SearchResult:
+    """Search mail with a Gmail query and return compact message summaries.
+
+    Args:
+        query: Gmail search query, e.g. "from:alice is:unread newer_than:7d"
+        max_results: Maximum number of messages to return (default: 20)
+        page_token: Token from a previous result's next_page_token (optional)
+        include_spam_trash: Also search Spam and Trash (default: False)
+        account: Account to act for (default: the current user; see list_accounts)
+    """
+    client = await require_client(account)
+
+    if ctx:
+        await ctx.info(f"Searching messages: {query}")
+
+    try:
+        result = await run_client(
+            client,
+            "search_messages",
+            query,
+            max_results=max_results,
+            page_token=page_token,
+            include_spam_trash=include_spam_trash,
+        )
+        result = SearchResult(
+            messages=[MessageSummary(**message) for message in result["messages"]],
+            next_page_token=result["next_page_token"],
+            result_size_estimate=result["result_size_estimate"],
+        )
+
+        if ctx:
+            await ctx.info(f"Found {len(result.messages)} messages")
+
+        return result
+
+    except Exception as e:
+        if ctx:
+            await ctx.error(f"Failed to search messages: {str(e)}")
+        raise Exception(f"Failed to search messages: {str(e)}")
+
+
+async def _bulk_modify(
+    action: str,
+    add_labels: Optional[List[str]],
+    remove_labels: Optional[List[str]],
+    query: Optional[str],
+    message_ids: Optional[List[str]],
+    dry_run: bool,
+    include_spam_trash: bool,
+    account: Optional[str],
+    ctx: Optional[Context],
+) -> BulkModifyResult:
+    """Shared body of the bulk label, archive and trash tools."""
+    client = await require_client(account)
+    call = partial(run_client, client)
+
+    if ctx:
+        target = f"query {query!r}" if query is not None else "given messages"
+        await ctx.info(
+            f"{'Counting' if dry_run else action.capitalize()} messages: {target}"
+        )
+
+    async def progress(done: int, total: Optional[int]) -> None:
+        """Report messages processed so far to the client."""
+        if ctx:
+            await ctx.report_progress(done, total)
+
+    try:
+        result = BulkModifyResult(
+            **await modify_messages(
+                call,
+                await resolve_labels(call, add_labels),
+                await resolve_labels(call, remove_labels),
+                query=query,
+                message_ids=message_ids,
+                include_spam_trash=include_spam_trash,
+                dry_run=dry_run,
+                progress=progress,
+            )
+        )
+
+        if ctx:
+            await ctx.info(
+                f"{result.matched} messages matched, {result.modified} modified "
+                f"in {result.batches} requests"
+            )
+
+        return result
+
+    except Exception as e:
+        if ctx:
+            await ctx.error(f"Failed to {action} messages: {str(e)}")
+        raise Exception(f"Failed to {action} messages: {str(e)}")
+
+
+@mcp.tool()
+async def modify_labels(
+    add_labels: Optional[List[str]] = None,
+    remove_labels: Optional[List[str]] = None,
+    query: Optional[str] = None,
+    message_ids: Optional[List[str]] = None,
+    dry_run: bool = False,
+    include_spam_trash: bool = False,
+    account: Optional[str] = None,
+    ctx: Context = None,
+) -> BulkModifyResult:
+    """Add and remove labels on every message matching a query, or on given IDs.
+
+    Messages are changed up to 1000 per request. Use dry_run to count the
+    matches first.
+
+    Args:
+        add_labels: Label names or IDs to add, e.g. ["Receipts", "STARRED"]
+        remove_labels: Label names or IDs to remove, e.g. ["UNREAD"]
+        query: Gmail search query selecting the messages
+        message_ids: Message IDs to change instead of a query
+        dry_run: Only count the matching messages (default: False)
+        include_spam_trash: Also match messages in Spam and Trash (default: False)
+        account: Account to act for (default: the current user; see list_accounts)
+    """
+    return await _bulk_modify(
+        "modify",
+        add_labels,
+        remove_labels,
+        query,
+        message_ids,
+        dry_run,
+        include_spam_trash,
+        account,
+        ctx,
+    )
+
+
+@mcp.tool()
+async def archive_messages(
+    query: Optional[str] = None,
+    message_ids: Optional[List[str]] = None,
+    dry_run: bool = False,
+    account: Optional[str] = None,
+    ctx: Context = None,
+) -> BulkModifyResult:
+    """Archive (remove from the inbox) every message matching a query, or given IDs.
+
+    Args:
+        query: Gmail search query selecting the messages, e.g.
+            "in:inbox older_than:1y"
+        message_ids: Message IDs to archive instead of a query
+        dry_run: Only count the matching messages (default: False)
+        account: Account to act for (default: the current user; see list_accounts)
+    """
+    return await _bulk_modify(
+        "archive", None, ["INBOX"], query, message_ids, dry_run, False, account, ctx
+    )
+
+
+@mcp.tool()
+async def trash_messages(
+    query: Optional[str] = None,
+    message_ids: Optional[List[str]] = None,
+    dry_run: bool = False,
+    account: Optional[str] = None,
+    ctx: Context = None,
+) -> BulkModifyResult:
+    """Move every message matching a query, or given IDs, to the trash.
+
+    Trashed messages can be restored from Trash for 30 days.
+
+    Args:
+        query: Gmail search query selecting the messages, e.g.
+            "from:newsletter@example.com"
+        message_ids: Message IDs to trash instead of a query
+        dry_run: Only count the matching messages (default: False)
+        account: Account to act for (default: the current user; see list_accounts)
+    """
+    return await _bulk_modify(
+        "trash", ["TRASH"], None, query, message_ids, dry_run, False, account, ctx
+    )
+
+
+@mcp.tool()
+async def get_thread(
+    thread_id: str, account: Optional[str] = None, ctx: Context = None
+) -> ThreadView:
+    """Get a conversation: each message's headers, snippet and list of parts.
+
+    Bodies and attachments are not included; read a part with
+    get_message_part using the message ID and part ID listed here.
+
+    Args:
+        thread_id: Thread ID, e.g. the thread_id of a search result
+        account: Account to act for (default: the current user; see list_accounts)
+    """
+    client = await require_client(account)
+
+    if ctx:
+        await ctx.info(f"Fetching thread {thread_id}")
+
+    try:
+        result = ThreadView(
+            **await fetch_thread(
+                partial(run_client, client),
+                thread_caches.get(client.user_email),
+                thread_id,
+            )
+        )
+
+        if ctx:
+            await ctx.info(f"Thread has {len(result.messages)} messages")
+
+        return result
+
+    except Exception as e:
+        if ctx:
+            await ctx.error(f"Failed to get thread: {str(e)}")
+        raise Exception(f"Failed to get thread: {str(e)}")
+
+
+@mcp.tool()
+async def get_message_part(
+    message_id: str,
+    part_id: str,
+    offset: int = 0,
+    max_chars: int = PART_TEXT_PAGE_CHARS,
+    as_text: bool = True,
+    save_path: Optional[str] = None,
+    account: Optional[str] = None,
+    ctx: Context = None,
+) -> PartContent:
+    """Read one part of a message listed by get_thread.
+
+    Text parts are returned a page at a time; binary parts and attachments
+    can be saved to a file in the download directory instead.
+
+    Args:
+        message_id: Message ID from get_thread
+        part_id: Part ID from that message's parts
+        offset: Character to start from, e.g. a previous call's next_offset (default: 0)
+        max_chars: Maximum characters of text to return (default: 20000)
+        as_text: Reduce HTML to its visible text (default: True)
+        save_path: Write the part's decoded bytes to this new file instead, given
+            relative to the download directory (optional)
+        account: Account to act for (default: the current user; see list_accounts)
+    """
+    client = await require_client(account)
+
+    if ctx:
+        await ctx.info(f"Reading part {part_id} of message {message_id}")
+
+    try:
+        return PartContent(
+            **await read_part(
+                partial(run_client, client),
+                thread_caches.get(client.user_email),
+                message_id,
+                part_id,
+                offset=offset,
+                max_chars=max_chars,
+                as_text=as_text,
+                save_path=save_path,
+                download_dir=download_dir,
+            )
+        )
+
+    except Exception as e:
+        if ctx:
+            await ctx.error(f"Failed to read message part: {str(e)}")
+        raise Exception(f"Failed to read message part: {str(e)}")
+
+
+@mcp.tool()
+async def sync_local_index(
+    max_messages: Optional[int] = None,
+    rebuild: bool = False,
+    account: Optional[str] = None,
+    ctx: Context = None,
+) -> dict:
+    """Build or update the local full-text index used by local_search.
+
+    The first call indexes the newest messages (headers and text bodies)
+    into a SQLite file under ~/.gmail-mcp/index; later calls only fetch
+    what changed since the last sync.
+
+    Args:
+        max_messages: Messages to index when building (default:
+            GMAIL_MCP_LOCAL_INDEX_MAX_MESSAGES)
+        rebuild: Discard the index and build it again (default: False)
+        account: Account to act for (default: the current user; see list_accounts)
+    """
+    client = await require_client(account)
+    index = local_indexes.get(client.user_email)
+
+    if ctx:
+        await ctx.info(f"Syncing local index for {client.user_email}")
+
+    try:
+        kwargs = {"rebuild": rebuild}
+        if max_messages is not None:
+            kwargs["max_messages"] = max_messages
+        result = await index.sync(partial(run_client, client), **kwargs)
+        result["indexed_messages"] = await gmail_executor.run(None, index.count)
+
+        if ctx:
+            await ctx.info(
+                f"Local index has {result['indexed_messages']} messages "
+                f"({result['added']} added, {result['deleted']} removed)"
+            )
+
+        return result
+
+    except Exception as e:
+        if ctx:
+            await ctx.error(f"Failed to sync local index: {str(e)}")
+        raise Exception(f"Failed to sync local index: {str(e)}")
+
+
+@mcp.tool()
+async def local_search(
+    query: str,
+    max_results: int = 20,
+    include_spam_trash: bool = False,
+    sync: bool = True,
+    account: Optional[str] = None,
+    ctx: Context = None,
+) -> LocalSearchResult:
+    """Search the local full-text index, best matches first.
+
+    Works offline: if the index can't be synced first, results come from
+    the last sync and are marked stale. Build the index with
+    sync_local_index before the first search.
+
+    Args:
+        query: Words to find; supports "exact phrases", OR, NOT, prefix* and
+            column filters (subject:, sender:, recipients:, body:)
+        max_results: Maximum number of messages to return (default: 20)
+        include_spam_trash: Also search Spam and Trash (default: False)
+        sync: Fetch changes from Gmail before searching (default: True)
+        account: Account to act for (default: the current user; see list_accounts)
+    """
+    user = await require_account(account)
+    index = local_indexes.get(user)
+
+    try:
+        if not await gmail_executor.run(None, lambda: index.exists):
+            raise Exception("No local index yet; build it with sync_local_index")
+
+        stale = False
+        if sync:
+            try:
+                client = await require_client(user)
+                await index.sync(partial(run_client, client))
+            except Exception as e:
+                stale = True
+                if ctx:
+                    await ctx.warning(f"Searching without syncing: {str(e)}")
+
+        hits = await gmail_executor.run(
+            None, index.search, query, max_results, include_spam_trash
         )
+        result = LocalSearchResult(
+            messages=[LocalSearchHit(**hit) for hit in hits],
+            indexed_messages=await gmail_executor.run(None, index.count),
+            stale=stale,
+        )
+
+        if ctx:
+            await ctx.info(f"Found {len(result.messages)} messages in local index")
+
+        return result
+
+    except Exception as e:
+        if ctx:
+            await ctx.error(f"Failed to search local index: {str(e)}")
+        raise Exception(f"Failed to search local index: {str(e)}")
+
+
+@mcp.tool()
+async def delete_local_index(
+    account: Optional[str] = None, ctx: Context = None
+) -> dict:
+    """Delete an account's local full-text index from disk.
+
+    Args:
+        account: Account to act for (default: the current user; see list_accounts)
+    """
+    user = await require_account(account)
+
+    deleted = await gmail_executor.run(None, local_indexes.delete, user)
+
+    if ctx:
+        await ctx.info(f"Local index {'deleted' if deleted else 'not found'}")
+
+    return {"deleted": deleted}
+
+
+@mcp.tool()
+async def get_user_info(
+    refresh: bool = False, account: Optional[str] = None, ctx: Context = None
+) -> UserInfo:
+    """Get current authenticated user information.
+
+    Args:
+        refresh: Bypass the cached profile and fetch fresh totals from Gmail
+        account: Account to act for (default: the current user; see list_accounts)
+    """
+    client = await require_client(account)
 
     try:
-        user_info = client.get_user_info()
+        user_info = await run_client(client, "get_user_info", refresh=refresh)
         result = UserInfo(**user_info)
 
         if ctx:
@@ -811,6 +1619,49 @@ async def get_user_info(ctx=None) -> UserInfo:
         raise Exception(f"Failed to get user info: {str(e)}")
 
 
+@mcp.tool()
+async def list_accounts(
+    limit: int = 100, after: Optional[str] = None, ctx: Context = None
+) -> AccountPage:
+    """List the authenticated accounts that tools can act for.
+
+    Pass one of them as a tool's account argument to act for it instead of
+    the current user.
+
+    Args:
+        limit: Maximum number of accounts to return (default: 100)
+        after: Return accounts after this one, e.g. a previous next_after (optional)
+    """
+    limit = max(1, limit)
+    accounts = await gmail_executor.run(None, auth_manager.list_users, limit, after)
+    current = await gmail_executor.run(None, auth_manager.get_current_user)
+    result = AccountPage(
+        accounts=accounts,
+        current=current,
+        next_after=accounts[-1] if len(accounts) == limit else None,
+    )
+
+    if ctx:
+        await ctx.info(f"Found {len(result.accounts)} accounts")
+
+    return result
+
+
+@mcp.tool()
+async def get_client_metrics(ctx: Context = None) -> dict:
+    """Get Gmail client counters, circuit states and per-user quota usage."""
+    result = {
+        "counters": metrics.snapshot(),
+        "circuit_breakers": circuit_breakers.states(),
+        "quota": rate_limiter.usage(),
+    }
+
+    if ctx:
+        await ctx.info("Retrieved Gmail client metrics")
+
+    return result
+
+
 # Resource access tools
 @mcp.resource("template://html_email/{template_name}")
 def get_html_template(template_name: str) -> str:
@@ -881,7 +1732,7 @@ def get_etiquette_resource(category: str) -> dict:
 
 @mcp.tool()
 async def get_subject_line_help(
-    email_type: str = "general", industry: str = None, ctx=None
+    email_type: str = "general", industry: str = None, ctx: Context = None
 ) -> dict:
     """Get subject line suggestions and best practices.
 
@@ -906,7 +1757,7 @@ async def get_subject_line_help(
 
 
 @mcp.tool()
-async def validate_subject_line_tool(subject: str, ctx=None) -> dict:
+async def validate_subject_line_tool(subject: str, ctx: Context = None) -> dict:
     """Validate a subject line against best practices.
 
     Args:
@@ -927,7 +1778,7 @@ async def validate_subject_line_tool(subject: str, ctx=None) -> dict:
 
 
 @mcp.tool()
-async def get_email_templates(template_type: str = "html", ctx=None) -> dict:
+async def get_email_templates(template_type: str = "html", ctx: Context = None) -> dict:
     """Get available email templates.
 
     Args:
@@ -0,0 +1,203 @@
+"""Thread retrieval with message parts decoded only when they are read."""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import PART_TEXT_PAGE_CHARS, THREAD_CACHE_SIZE
+from .gmail_operations import ClientCall, _header_value, _message_summary
+from .message_text import (
+    decode_body_data,
+    decode_part_text,
+    find_part,
+    html_to_text,
+    leaf_parts,
+    part_id,
+)
+from .metrics import metrics
+from .registry import UserRegistry
+
+
+def outline_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a full-format message into the fields of ThreadMessage.
+
+    Parts are described by ID, type, name and size; no body is decoded.
+    """
+    summary = _message_summary(message)
+    payload = message.get("payload", {})
+    summary["cc"] = _header_value(payload.get("headers", []), "Cc", "")
+    summary["parts"] = [
+        {
+            "part_id": part_id(part),
+            "mime_type": part.get("mimeType", ""),
+            "filename": part.get("filename", ""),
+            "size": part.get("body", {}).get("size", 0),
+            "attachment": "attachmentId" in part.get("body", {}),
+        }
+        for part in leaf_parts(payload)
+    ]
+    return summary
+
+
+class ThreadCache:
+    """One user's recently fetched threads, least recently used evicted first.
+
+    Threads are kept as threads.get returned them, bodies still encoded, so
+    a part can be decoded later without fetching the thread again.
+    """
+
+    def __init__(self, user: str, max_threads: int = THREAD_CACHE_SIZE):
+        """Initialize an empty cache holding up to max_threads threads."""
+        self.user = user
+        self.max_threads = max_threads
+        self._threads: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, thread: Dict[str, Any]) -> None:
+        """Remember a thread, evicting the least recently used beyond the limit."""
+        with self._lock:
+            self._threads[thread["id"]] = thread.get("messages", [])
+            self._threads.move_to_end(thread["id"])
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+
+    def message(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """Find a message in the cached threads, marking its thread as used."""
+        with self._lock:
+            for thread_id, messages in self._threads.items():
+                for message in messages:
+                    if message["id"] == message_id:
+                        self._threads.move_to_end(thread_id)
+                        return message
+        return None
+
+
+class ThreadCacheRegistry(UserRegistry[ThreadCache]):
+    """Thread caches for every user seen by this process."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        super().__init__(ThreadCache)
+
+
+thread_caches = ThreadCacheRegistry()
+
+
+async def fetch_thread(
+    call: ClientCall, cache: ThreadCache, thread_id: str
+) -> Dict[str, Any]:
+    """Fetch a thread once and return its messages' headers and part outlines."""
+    thread = await call("get_thread", thread_id)
+    cache.put(thread)
+    return {
+        "id": thread["id"],
+        "messages": [outline_message(m) for m in thread.get("messages", [])],
+    }
+
+
+def resolve_download_path(directory: Path, save_path: str) -> Path:
+    """Resolve save_path inside directory, refusing paths that would leave it.
+
+    Part names and contents are chosen by whoever sent the message, so
+    absolute paths, ~ and .. are rejected, as are symlinks out of directory.
+    """
+    relative = Path(save_path)
+    if (
+        not save_path
+        or relative.is_absolute()
+        or save_path.startswith("~")
+        or ".." in relative.parts
+    ):
+        raise ValueError(
+            f"save_path must be a relative path inside {directory}: {save_path}"
+        )
+    root = directory.resolve()
+    path = (root / relative).resolve()
+    if path == root or not path.is_relative_to(root):
+        raise ValueError(f"save_path must stay inside {directory}: {save_path}")
+    return path
+
+
+def _write_new_file(path: Path, data: bytes) -> None:
+    """Write data to a file that must not already exist."""
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    with open(path, "xb") as f:
+        f.write(data)
+
+
+async def read_part(
+    call: ClientCall,
+    cache: ThreadCache,
+    message_id: str,
+    wanted: str,
+    offset: int = 0,
+    max_chars: int = PART_TEXT_PAGE_CHARS,
+    as_text: bool = True,
+    save_path: Optional[str] = None,
+    download_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """Decode one part of a message, or save it to a file.
+
+    The message comes from the thread cache when get_thread fetched it, and
+    is fetched on its own otherwise. Parts stored as attachments are
+    downloaded only here. Text is returned max_chars at a time from offset;
+    HTML is reduced to its visible text unless as_text is False. Parts that
+    aren't text must be saved with save_path, a new file relative to
+    download_dir.
+    """
+    if save_path:
+        if download_dir is None:
+            raise ValueError("No download directory is configured")
+        path = resolve_download_path(download_dir, save_path)
+        if path.exists():
+            raise ValueError(f"File already exists: {path}")
+
+    message = cache.message(message_id)
+    if message is None:
+        metrics.increment("thread_cache_misses", cache.user)
+        message = await call("get_message", message_id)
+
+    part = find_part(message.get("payload", {}), wanted)
+    if part is None:
+        raise ValueError(f"Message {message_id} has no part {wanted}")
+
+    mime_type = part.get("mimeType", "")
+    body = part.get("body", {})
+    result = {
+        "message_id": message_id,
+        "part_id": wanted,
+        "mime_type": mime_type,
+        "filename": part.get("filename", ""),
+        "size": body.get("size", 0),
+    }
+    if not save_path and not mime_type.startswith("text/"):
+        raise ValueError(
+            f"Part {wanted} is {mime_type or 'not text'}; "
+            "pass save_path to save it to a file"
+        )
+
+    data = None
+    if "attachmentId" in body:
+        metrics.increment("thread_attachments_fetched", cache.user)
+        data = await call("get_attachment", message_id, body["attachmentId"])
+    metrics.increment("thread_parts_decoded", cache.user)
+
+    if save_path:
+        if data is None:
+            data = decode_body_data(body.get("data", ""))
+        try:
+            await asyncio.to_thread(_write_new_file, path, data)
+        except FileExistsError:
+            raise ValueError(f"File already exists: {path}")
+        result["saved_to"] = str(path)
+        return result
+
+    text = decode_part_text(part, data)
+    if as_text and mime_type == "text/html":
+        text = html_to_text(text)
+    end = offset + max(1, max_chars)
+    result["text"] = text[offset:end]
+    result["next_offset"] = end if end < len(text) else None
+    return result
@@ -0,0 +1,111 @@
+"""Background renewal of access tokens before they expire."""
+
+import threading
+import time
+from typing import Dict, Optional
+
+from google.oauth2.credentials import Credentials
+
+from .auth_manager import AuthManager, _utcnow
+from .config import TOKEN_REFRESH_MARGIN, TOKEN_REFRESH_RETRY_DELAY
+from .metrics import metrics
+
+
+class TokenRefresher:
+    """Renews watched users' access tokens a margin ahead of their expiry.
+
+    One daemon thread sleeps until the next token is due and refreshes it
+    through AuthManager.refresh_credentials, whose per-user lock means a
+    request that finds its token expired waits for this refresh instead of
+    starting its own. Failed refreshes are retried after retry_delay; users
+    whose grant was revoked are dropped.
+    """
+
+    def __init__(
+        self,
+        auth_manager: AuthManager,
+        margin: float = TOKEN_REFRESH_MARGIN,
+        retry_delay: float = TOKEN_REFRESH_RETRY_DELAY,
+    ):
+        """Initialize a refresher; its thread starts with the first watched user."""
+        self.auth_manager = auth_manager
+        self.margin = margin
+        self.retry_delay = retry_delay
+        # Monotonic time at which each watched user's token is due for renewal
+        self._due: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def watch(self, email: str, credentials: Credentials) -> None:
+        """Keep a user's token renewed from now on; no-op if already watched."""
+        with self._lock:
+            if email in self._due or self._stopped:
+                return
+            self._due[email] = self._due_at(credentials)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="gmail-token-refresher", daemon=True
+                )
+                self._thread.start()
+        self._wake.set()
+
+    def forget(self, email: str) -> None:
+        """Stop renewing a user's token."""
+        with self._lock:
+            self._due.pop(email, None)
+
+    def stop(self) -> None:
+        """Stop the background thread."""
+        with self._lock:
+            self._stopped = True
+        self._wake.set()
+
+    def _due_at(self, credentials: Credentials) -> float:
+        """When to renew a token; now if its expiry is unknown."""
+        if credentials.expiry is None:
+            return time.monotonic()
+        remaining = (credentials.expiry - _utcnow()).total_seconds()
+        return time.monotonic() + max(0.0, remaining - self.margin)
+
+    def _run(self) -> None:
+        """Refresh tokens as they come due, sleeping until the next one."""
+        while True:
+            with self._lock:
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                due = [email for email, at in self._due.items() if at <= now]
+                upcoming = [at for at in self._due.values() if at > now]
+
+            for email in due:
+                self._refresh(email)
+
+            if not due:
+                timeout = min(upcoming) - now if upcoming else None
+                self._wake.wait(timeout)
+                self._wake.clear()
+
+    def _refresh(self, email: str) -> None:
+        """Renew one user's token and schedule the next renewal."""
+        try:
+            credentials = self.auth_manager.refresh_credentials(
+                email, margin=self.margin
+            )
+        except Exception:
+            metrics.increment("token_refresh_failures", email)
+            next_at = time.monotonic() + self.retry_delay
+        else:
+            if credentials is None:
+                self.forget(email)
+                return
+            # A token issued with less lifetime than the margin would
+            # otherwise be renewed in a tight loop
+            next_at = max(
+                self._due_at(credentials), time.monotonic() + self.retry_delay
+            )
+
+        with self._lock:
+            if email in self._due:
+                self._due[email] = next_at
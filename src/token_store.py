@@ -0,0 +1,282 @@
+"""Pluggable storage for users' encrypted OAuth tokens.
+
+Two backends keep the same records: FileTokenStore, the original layout of
+one file per user under tokens/, and SqliteTokenStore, a single SQLite
+database in WAL mode that stays fast with thousands of accounts. Records are
+encrypted by AuthManager before they reach a store, so both hold only
+ciphertext and migrate_tokens can copy records between them as they are.
+"""
+
+import bisect
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Hashable, List, Optional, Tuple
+
+from .interprocess import atomic_write
+
+# Identifies one version of a file: (inode, mtime in ns, size)
+FileSignature = Tuple[int, int, int]
+
+# Changes whenever a user's record is written; compared to reuse decrypted data
+TokenVersion = Hashable
+
+# Records copied per page by migrate_tokens
+MIGRATION_PAGE_SIZE = 500
+
+
+def stat_signature(stat: os.stat_result) -> FileSignature:
+    """The signature of a file version from its stat result."""
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def file_signature(path: Path) -> Optional[FileSignature]:
+    """Stat a file cheaply enough to check it on every call; None if missing."""
+    try:
+        return stat_signature(path.stat())
+    except FileNotFoundError:
+        return None
+
+
+class TokenStore(ABC):
+    """Encrypted token records keyed by email address."""
+
+    @abstractmethod
+    def version(self, email: str) -> Optional[TokenVersion]:
+        """The current version of a user's record, or None if there is none."""
+
+    @abstractmethod
+    def get(self, email: str) -> Optional[Tuple[TokenVersion, bytes]]:
+        """A user's record and its version, or None if there is none."""
+
+    @abstractmethod
+    def put(self, email: str, data: bytes) -> TokenVersion:
+        """Atomically create or replace a user's record; returns its version."""
+
+    @abstractmethod
+    def delete(self, email: str) -> bool:
+        """Delete a user's record; returns whether there was one."""
+
+    @abstractmethod
+    def list_users(
+        self, limit: Optional[int] = None, after: Optional[str] = None
+    ) -> List[str]:
+        """Users with a record in sorted order, up to limit, starting after after."""
+
+    def close(self) -> None:
+        """Release any resources held by the store."""
+
+
+class FileTokenStore(TokenStore):
+    """One encrypted file per user, named <email>.json, in a directory."""
+
+    def __init__(self, directory: Path):
+        """Initialize a store in directory, creating it if needed."""
+        self.directory = directory
+        self.directory.mkdir(exist_ok=True)
+
+    def _path(self, email: str) -> Path:
+        """The file holding a user's record."""
+        # Names come from tool arguments too; keep them inside the directory
+        if not email or email.startswith(".") or "/" in email or "\\" in email:
+            raise ValueError(f"Invalid email address: {email}")
+        return self.directory / f"{email}.json"
+
+    def version(self, email: str) -> Optional[TokenVersion]:
+        """The token file's signature, which changes whenever it is replaced."""
+        return file_signature(self._path(email))
+
+    def get(self, email: str) -> Optional[Tuple[TokenVersion, bytes]]:
+        """Read a token file and the signature of the version read."""
+        try:
+            with open(self._path(email), "rb") as f:
+                stat = os.fstat(f.fileno())
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        return stat_signature(stat), data
+
+    def put(self, email: str, data: bytes) -> TokenVersion:
+        """Write to a temporary file and rename it over the token file.
+
+        Readers see either the old record or the new one, never a partly
+        written file.
+        """
+        return stat_signature(atomic_write(self._path(email), data))
+
+    def delete(self, email: str) -> bool:
+        """Delete a user's token file."""
+        try:
+            self._path(email).unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def list_users(
+        self, limit: Optional[int] = None, after: Optional[str] = None
+    ) -> List[str]:
+        """List token files; every page scans the whole directory."""
+        users = sorted(
+            entry.name[: -len(".json")]
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith(".json") and not entry.name.startswith(".")
+        )
+        start = bisect.bisect_right(users, after) if after is not None else 0
+        end = start + limit if limit is not None else None
+        return users[start:end]
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    email TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO state (key, value) VALUES ('version', 0);
+"""
+
+
+class SqliteTokenStore(TokenStore):
+    """All users' records in one SQLite database, indexed by email address.
+
+    Each write takes the next value of a database-wide counter as the
+    record's version, so a version is never reused, even for a user who is
+    removed and added again. The database may be shared by several
+    processes; WAL mode lets readers proceed while one of them writes.
+    """
+
+    def __init__(self, path: Path):
+        """Initialize a store backed by path; the file is created on first use."""
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        """Open the database and create its tables if needed."""
+        if self._connection is None:
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            # The -wal and -shm files hold token data too; create every file
+            # owner-only, and tighten any left by an older version
+            umask = os.umask(0o077)
+            try:
+                # Autocommit, with transactions started explicitly by put
+                connection = sqlite3.connect(
+                    self.path, timeout=30, isolation_level=None, check_same_thread=False
+                )
+                try:
+                    connection.execute("PRAGMA journal_mode=WAL")
+                    connection.execute("PRAGMA synchronous=NORMAL")
+                    connection.executescript(_SCHEMA)
+                    for suffix in ("", "-wal", "-shm"):
+                        path = f"{self.path}{suffix}"
+                        if os.path.exists(path):
+                            os.chmod(path, 0o600)
+                except Exception:
+                    connection.close()
+                    raise
+            finally:
+                os.umask(umask)
+            self._connection = connection
+        return self._connection
+
+    def version(self, email: str) -> Optional[TokenVersion]:
+        """Look up a record's version by primary key."""
+        with self._db_lock:
+            row = (
+                self._db()
+                .execute("SELECT version FROM tokens WHERE email = ?", (email,))
+                .fetchone()
+            )
+        return row[0] if row else None
+
+    def get(self, email: str) -> Optional[Tuple[TokenVersion, bytes]]:
+        """Look up a record and its version by primary key."""
+        with self._db_lock:
+            row = (
+                self._db()
+                .execute("SELECT version, data FROM tokens WHERE email = ?", (email,))
+                .fetchone()
+            )
+        return (row[0], bytes(row[1])) if row else None
+
+    def put(self, email: str, data: bytes) -> TokenVersion:
+        """Write a record and bump the version counter in one transaction."""
+        with self._db_lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("UPDATE state SET value = value + 1 WHERE key = 'version'")
+                (version,) = db.execute(
+                    "SELECT value FROM state WHERE key = 'version'"
+                ).fetchone()
+                db.execute(
+                    "INSERT INTO tokens (email, data, version) VALUES (?, ?, ?) "
+                    "ON CONFLICT (email) DO UPDATE "
+                    "SET data = excluded.data, version = excluded.version",
+                    (email, data, version),
+                )
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        return version
+
+    def delete(self, email: str) -> bool:
+        """Delete a record by primary key."""
+        with self._db_lock:
+            cursor = self._db().execute("DELETE FROM tokens WHERE email = ?", (email,))
+        return cursor.rowcount > 0
+
+    def list_users(
+        self, limit: Optional[int] = None, after: Optional[str] = None
+    ) -> List[str]:
+        """Read one page of users from the primary key index."""
+        with self._db_lock:
+            rows = (
+                self._db()
+                .execute(
+                    "SELECT email FROM tokens WHERE email > ? ORDER BY email LIMIT ?",
+                    (after or "", -1 if limit is None else limit),
+                )
+                .fetchall()
+            )
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._db_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def open_token_store(kind: str, config_dir: Path) -> TokenStore:
+    """Open the "file" or "sqlite" token store under config_dir."""
+    if kind == "file":
+        return FileTokenStore(config_dir / "tokens")
+    if kind == "sqlite":
+        return SqliteTokenStore(config_dir / "tokens.db")
+    raise ValueError(f"Unknown token store: {kind}")
+
+
+def migrate_tokens(source: TokenStore, target: TokenStore) -> int:
+    """Copy every record from source to target, overwriting what target has.
+
+    Records are copied still encrypted, one page of users at a time. Source
+    is left unchanged. Returns the number of records copied.
+    """
+    copied = 0
+    after = None
+    while True:
+        users = source.list_users(limit=MIGRATION_PAGE_SIZE, after=after)
+        if not users:
+            return copied
+        for email in users:
+            record = source.get(email)
+            if record is not None:
+                target.put(email, record[1])
+                copied += 1
+        after = users[-1]
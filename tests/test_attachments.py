@@ -0,0 +1,52 @@
+"""Tests for checking attachment paths before they are read."""
+
+import pytest
+
+from src.attachments import resolve_attachments
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    """A config directory with a key, and an attachment directory with a file."""
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    (config_dir / ".key").write_bytes(b"secret")
+    attachment_dir = tmp_path / "outbox"
+    attachment_dir.mkdir()
+    (attachment_dir / "report.pdf").write_bytes(b"%PDF")
+    return config_dir, attachment_dir
+
+
+def test_files_in_private_directories_are_refused(dirs):
+    config_dir, attachment_dir = dirs
+    with pytest.raises(ValueError, match="private"):
+        resolve_attachments([str(config_dir / ".key")], private_dirs=[str(config_dir)])
+
+    # Also through a symlink from an ordinary directory
+    (attachment_dir / "key.txt").symlink_to(config_dir / ".key")
+    with pytest.raises(ValueError, match="private"):
+        resolve_attachments(
+            [str(attachment_dir / "key.txt")], private_dirs=[str(config_dir)]
+        )
+
+
+def test_files_outside_the_allowed_directory_are_refused(dirs, tmp_path):
+    config_dir, attachment_dir = dirs
+    outside = tmp_path / "notes.txt"
+    outside.write_text("notes")
+    with pytest.raises(ValueError, match="must be inside"):
+        resolve_attachments([str(outside)], allowed_dir=str(attachment_dir))
+    with pytest.raises(ValueError, match="must be inside"):
+        resolve_attachments(
+            [str(attachment_dir / ".." / "notes.txt")], allowed_dir=str(attachment_dir)
+        )
+
+
+def test_allowed_files_are_resolved(dirs):
+    config_dir, attachment_dir = dirs
+    path = str(attachment_dir / "report.pdf")
+    assert resolve_attachments(
+        [path], allowed_dir=str(attachment_dir), private_dirs=[str(config_dir)]
+    ) == [path]
+    with pytest.raises(ValueError, match="not found"):
+        resolve_attachments([str(attachment_dir / "missing.pdf")])
@@ -0,0 +1,123 @@
+"""Tests for AuthManager credential loading and token refresh."""
+
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from google.auth.exceptions import RefreshError, TransportError
+from google.oauth2.credentials import Credentials
+
+from src.auth_manager import AuthManager, _utcnow
+from src.token_store import FileTokenStore
+
+EMAIL = "user@example.com"
+
+
+def make_credentials(token: str = "old", expires_in: float = -60) -> Credentials:
+    """Credentials expiring expires_in seconds from now (expired by default)."""
+    return Credentials(
+        token=token,
+        refresh_token="refresh",
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id="client",
+        client_secret="secret",
+        scopes=["https://www.googleapis.com/auth/gmail.modify"],
+        expiry=_utcnow() + timedelta(seconds=expires_in),
+    )
+
+
+@pytest.fixture
+def auth_manager(tmp_path):
+    """An AuthManager with one stored user whose token has expired."""
+    manager = AuthManager(tmp_path, token_store=FileTokenStore(tmp_path / "tokens"))
+    manager._store_credentials(EMAIL, make_credentials())
+    return manager
+
+
+@pytest.fixture
+def invalidated(auth_manager):
+    """Users the auth manager reported as invalidated."""
+    users = []
+    auth_manager.add_invalidation_listener(users.append)
+    return users
+
+
+def fail_refresh(monkeypatch, error: Exception) -> None:
+    """Make every token refresh raise error."""
+
+    def refresh(self, request):
+        raise error
+
+    monkeypatch.setattr(Credentials, "refresh", refresh)
+
+
+def succeed_refresh(monkeypatch, delay: float = 0.0) -> list:
+    """Make token refreshes succeed; returns the list of refreshed tokens."""
+    refreshed = []
+
+    def refresh(self, request):
+        time.sleep(delay)
+        self.token = f"new-{len(refreshed)}"
+        self.expiry = _utcnow() + timedelta(hours=1)
+        refreshed.append(self.token)
+
+    monkeypatch.setattr(Credentials, "refresh", refresh)
+    return refreshed
+
+
+@pytest.mark.parametrize(
+    "error",
+    [TransportError("network down"), RefreshError("server error", retryable=True)],
+)
+def test_transient_refresh_failure_keeps_credentials(
+    auth_manager, invalidated, monkeypatch, error
+):
+    fail_refresh(monkeypatch, error)
+    with pytest.raises(type(error)):
+        auth_manager.get_credentials(EMAIL)
+    assert invalidated == []
+    assert auth_manager.has_user(EMAIL)
+
+    refreshed = succeed_refresh(monkeypatch)
+    assert auth_manager.get_credentials(EMAIL).token == "new-0"
+    assert refreshed == ["new-0"]
+
+
+def test_rejected_grant_drops_credentials(auth_manager, invalidated, monkeypatch):
+    fail_refresh(monkeypatch, RefreshError("invalid_grant"))
+    assert auth_manager.get_credentials(EMAIL) is None
+    assert invalidated == [EMAIL]
+
+
+def test_undecryptable_record_is_treated_as_logged_out(auth_manager, invalidated):
+    auth_manager.token_store.put(EMAIL, b"not a fernet token")
+    assert auth_manager.get_credentials(EMAIL) is None
+    assert invalidated == [EMAIL]
+
+
+def test_refreshed_token_is_stored(auth_manager, monkeypatch, tmp_path):
+    succeed_refresh(monkeypatch)
+    auth_manager.get_credentials(EMAIL)
+
+    reloaded = AuthManager(tmp_path, token_store=FileTokenStore(tmp_path / "tokens"))
+    credentials = reloaded._load_credentials(EMAIL)
+    assert credentials.token == "new-0"
+    assert credentials.valid
+
+
+def test_concurrent_callers_share_one_refresh(auth_manager, monkeypatch):
+    refreshed = succeed_refresh(monkeypatch, delay=0.1)
+    tokens = []
+
+    def load() -> None:
+        tokens.append(auth_manager.get_credentials(EMAIL).token)
+
+    threads = [threading.Thread(target=load) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert refreshed == ["new-0"]
+    assert tokens == ["new-0"] * 8
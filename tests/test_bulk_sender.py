@@ -0,0 +1,64 @@
+"""Tests for shared-template bulk delivery."""
+
+import base64
+from collections import Counter
+from email import message_from_bytes
+from email.utils import getaddresses
+
+import pytest
+
+from src.bulk_sender import TemplateMessage, deliver_bulk
+
+RECIPIENTS = ["a@example.com", "b@example.com", "c@example.com"]
+
+
+def decode(raw: str):
+    return message_from_bytes(base64.urlsafe_b64decode(raw))
+
+
+@pytest.mark.asyncio
+async def test_cc_and_bcc_receive_one_copy():
+    template = TemplateMessage(
+        "me@example.com",
+        "Hello",
+        "Body",
+        cc="boss@example.com, team@example.com",
+        bcc="archive@example.com",
+    )
+    sent = []
+
+    async def send_raw(raw: str):
+        sent.append(decode(raw))
+        return {"id": f"m{len(sent)}", "thread_id": f"t{len(sent)}"}
+
+    results = await deliver_bulk(template.jobs(RECIPIENTS, send_raw), concurrency=3)
+
+    assert [result.status for result in results] == ["sent"] * 3
+    copies = Counter(
+        address
+        for message in sent
+        for _, address in getaddresses(
+            message.get_all("To", [])
+            + message.get_all("Cc", [])
+            + message.get_all("Bcc", [])
+        )
+    )
+    assert copies == {
+        "a@example.com": 1,
+        "b@example.com": 1,
+        "c@example.com": 1,
+        "boss@example.com": 1,
+        "team@example.com": 1,
+        "archive@example.com": 1,
+    }
+
+
+def test_each_copy_keeps_the_shared_body():
+    template = TemplateMessage("me@example.com", "Hello", "Body", cc="x@example.com")
+    first = decode(template.raw_for("a@example.com", with_copies=True))
+    other = decode(template.raw_for("b@example.com"))
+
+    assert first["Cc"] == "x@example.com"
+    assert other["Cc"] is None
+    assert first["Subject"] == other["Subject"] == "Hello"
+    assert first.get_payload() == other.get_payload() == "Body\n"
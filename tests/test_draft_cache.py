@@ -0,0 +1,155 @@
+"""Tests for the history-synced draft cache."""
+
+import pytest
+
+from src.draft_cache import (
+    DraftCache,
+    DraftCacheRegistry,
+    decode_cursor,
+    encode_cursor,
+)
+from src.gmail_operations import HistoryExpiredError
+
+
+class FakeMailbox:
+    """Drafts and history as the Gmail client methods used by the cache see them."""
+
+    def __init__(self, count: int):
+        self.drafts = {f"d{n}": f"m{n}" for n in range(count)}
+        self.history_id = 100
+        self.expired = False
+        self.calls = []
+
+    def edit(self, draft_id: str, message_id: str) -> None:
+        """Create or edit a draft, which gives it a new message."""
+        self.drafts[draft_id] = message_id
+        self.history_id += 1
+
+    def delete(self, draft_id: str) -> None:
+        del self.drafts[draft_id]
+        self.history_id += 1
+
+    async def __call__(self, method: str, *args):
+        self.calls.append(method)
+        if method == "get_history_id":
+            return str(self.history_id)
+        if method == "list_history":
+            if self.expired:
+                raise HistoryExpiredError(args[0])
+            start = int(args[0])
+            return {
+                "changed": start < self.history_id,
+                "history_id": str(self.history_id),
+            }
+        if method == "list_draft_refs":
+            return [
+                {"id": draft_id, "message": {"id": message_id}}
+                for draft_id, message_id in self.drafts.items()
+            ]
+        if method == "get_draft_details":
+            return [
+                {
+                    "id": ref["id"],
+                    "message_id": ref["message"]["id"],
+                    "subject": f"Subject {ref['message']['id']}",
+                }
+                for ref in args[0]
+            ]
+        raise AssertionError(f"unexpected call {method}")
+
+
+def details_fetched(mailbox: FakeMailbox) -> int:
+    return mailbox.calls.count("get_draft_details")
+
+
+@pytest.mark.asyncio
+async def test_first_listing_fills_the_cache_and_later_ones_hit_it():
+    mailbox = FakeMailbox(3)
+    cache = DraftCache("user@example.com")
+
+    drafts = await cache.drafts(mailbox)
+    assert [draft["id"] for draft in drafts] == ["d0", "d1", "d2"]
+    assert cache.history_id == "100"
+
+    mailbox.calls.clear()
+    assert await cache.drafts(mailbox) == drafts
+    assert mailbox.calls == ["list_history"]
+
+
+@pytest.mark.asyncio
+async def test_changes_only_fetch_new_or_edited_drafts():
+    mailbox = FakeMailbox(3)
+    cache = DraftCache("user@example.com")
+    await cache.drafts(mailbox)
+
+    mailbox.edit("d1", "m1-edited")
+    mailbox.edit("d3", "m3")
+    mailbox.delete("d0")
+    fetched = []
+    original = mailbox.__call__
+
+    async def call(method, *args):
+        if method == "get_draft_details":
+            fetched.extend(ref["id"] for ref in args[0])
+        return await original(method, *args)
+
+    drafts = await cache.drafts(call)
+
+    assert sorted(fetched) == ["d1", "d3"]
+    assert {draft["id"]: draft["subject"] for draft in drafts} == {
+        "d1": "Subject m1-edited",
+        "d2": "Subject m2",
+        "d3": "Subject m3",
+    }
+    assert cache.history_id == str(mailbox.history_id)
+
+
+@pytest.mark.asyncio
+async def test_expired_history_rebuilds_the_cache():
+    mailbox = FakeMailbox(2)
+    cache = DraftCache("user@example.com")
+    await cache.drafts(mailbox)
+
+    mailbox.edit("d2", "m2")
+    mailbox.expired = True
+    mailbox.calls.clear()
+    drafts = await cache.drafts(mailbox)
+
+    assert mailbox.calls == [
+        "list_history",
+        "get_history_id",
+        "list_draft_refs",
+        "get_draft_details",
+    ]
+    assert [draft["id"] for draft in drafts] == ["d0", "d1", "d2"]
+    assert cache.history_id == str(mailbox.history_id)
+
+
+@pytest.mark.asyncio
+async def test_pages_follow_cursor_tokens():
+    mailbox = FakeMailbox(5)
+    cache = DraftCache("user@example.com")
+
+    first, token = await cache.page(mailbox, 2)
+    second, token = await cache.page(mailbox, 2, token)
+    third, token = await cache.page(mailbox, 2, token)
+
+    assert [d["id"] for d in first + second + third] == [f"d{n}" for n in range(5)]
+    assert token is None
+    assert details_fetched(mailbox) == 1
+
+
+def test_cursor_tokens_round_trip_and_reject_garbage():
+    assert decode_cursor(encode_cursor(40)) == 40
+    assert decode_cursor(None) == 0
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-token")
+
+
+def test_invalidate_drops_a_users_cache():
+    registry = DraftCacheRegistry()
+    cache = registry.get("user@example.com")
+    assert registry.get("user@example.com") is cache
+
+    registry.invalidate("user@example.com")
+    assert registry.get("user@example.com") is not cache
@@ -0,0 +1,155 @@
+"""Tests for the fair scheduler behind GmailExecutor."""
+
+import asyncio
+import time
+
+import pytest
+
+from src.executor import FairScheduler, GmailExecutor
+
+
+async def _settle() -> None:
+    """Let every ready task run until it blocks again."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _assert_idle(scheduler: FairScheduler) -> None:
+    """No slot is held and no call is waiting."""
+    assert scheduler._active == 0
+    assert scheduler._user_active == {}
+    assert not scheduler._waiting
+
+
+@pytest.mark.asyncio
+async def test_slots_go_to_waiting_users_in_turn():
+    scheduler = FairScheduler(capacity=2, per_user_limit=2)
+    order = []
+
+    async def call(user: str, n: int) -> None:
+        async with scheduler.slot(user):
+            order.append(f"{user}{n}")
+            await asyncio.sleep(0.001)
+
+    tasks = [asyncio.create_task(call("a", n)) for n in range(6)]
+    await asyncio.sleep(0)
+    tasks += [asyncio.create_task(call("b", n)) for n in range(2)]
+    tasks += [asyncio.create_task(call("c", n)) for n in range(2)]
+    await asyncio.gather(*tasks)
+
+    # a takes both free slots, then waits its turn behind b and c
+    assert order[:2] == ["a0", "a1"]
+    assert order.index("b0") < order.index("a3")
+    assert order.index("c0") < order.index("a3")
+    assert order.index("c1") < order.index("a5")
+    _assert_idle(scheduler)
+
+
+@pytest.mark.asyncio
+async def test_per_user_limit_caps_one_users_calls():
+    scheduler = FairScheduler(capacity=4, per_user_limit=2)
+    running = peak = 0
+
+    async def call() -> None:
+        nonlocal running, peak
+        async with scheduler.slot("a"):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001)
+            running -= 1
+
+    await asyncio.gather(*(call() for _ in range(6)))
+    assert peak == 2
+    _assert_idle(scheduler)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    scheduler = FairScheduler(capacity=1, per_user_limit=1)
+    release = asyncio.Event()
+
+    async def hold() -> None:
+        async with scheduler.slot("a"):
+            await release.wait()
+
+    async def call() -> None:
+        async with scheduler.slot("b"):
+            pass
+
+    holder = asyncio.create_task(hold())
+    await _settle()
+    waiter = asyncio.create_task(call())
+    await _settle()
+    waiter.cancel()
+    await _settle()
+    assert not scheduler._waiting
+
+    release.set()
+    await holder
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    _assert_idle(scheduler)
+
+
+@pytest.mark.asyncio
+async def test_waiter_cancelled_as_slot_is_released_does_not_leak_it():
+    scheduler = FairScheduler(capacity=1, per_user_limit=1)
+    release = asyncio.Event()
+
+    async def hold() -> None:
+        async with scheduler.slot("a"):
+            await release.wait()
+
+    async def call() -> None:
+        async with scheduler.slot("b"):
+            pass
+
+    holder = asyncio.create_task(hold())
+    await _settle()
+    waiter = asyncio.create_task(call())
+    await _settle()
+
+    # The holder releases on its next step, after the waiter was cancelled
+    release.set()
+    waiter.cancel()
+    await holder
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    _assert_idle(scheduler)
+
+    # The slot is free again: b's next call doesn't deadlock
+    await asyncio.wait_for(call(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_waiter_cancelled_after_being_granted_releases_its_slot():
+    scheduler = FairScheduler(capacity=1, per_user_limit=1)
+    entered = []
+
+    async def call(user: str) -> None:
+        async with scheduler.slot(user):
+            entered.append(user)
+
+    async with scheduler.slot("a"):
+        waiter = asyncio.create_task(call("b"))
+        await _settle()
+    # Leaving the block granted b's waiter; cancel before b resumes
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert entered == []
+    _assert_idle(scheduler)
+
+
+@pytest.mark.asyncio
+async def test_executor_runs_blocking_calls_under_the_scheduler():
+    executor = GmailExecutor(max_workers=4, per_user_limit=2)
+    try:
+        results = await asyncio.gather(
+            *(executor.run("a", time.sleep, 0.001) for _ in range(5)),
+            executor.run(None, sum, [1, 2]),
+        )
+        assert results[-1] == 3
+        _assert_idle(executor._scheduler)
+    finally:
+        executor.shutdown()
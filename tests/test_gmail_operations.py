@@ -0,0 +1,189 @@
+"""Tests for the shared Gmail operations and the clients that drive them."""
+
+import json
+from datetime import timedelta
+from urllib.parse import parse_qs, urlsplit
+
+import httplib2
+import httpx
+import pytest
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpMockSequence
+from google.auth.exceptions import RefreshError
+from google.oauth2.credentials import Credentials
+
+from src import gmail_operations as operations
+from src.async_gmail_client import AsyncGmailClient
+from src.auth_manager import AuthManager, _utcnow
+from src.discovery import shared_gmail_resources
+from src.gmail_client import GmailClient
+from src.gmail_operations import Batch, Call, HistoryExpiredError, drive
+from src.token_store import FileTokenStore
+
+EMAIL = "user@example.com"
+
+
+def not_found() -> HttpError:
+    return HttpError(httplib2.Response({"status": 404}), b"{}")
+
+
+def message(message_id: str) -> dict:
+    return {
+        "id": message_id,
+        "threadId": f"t-{message_id}",
+        "snippet": "",
+        "payload": {"headers": [{"name": "Subject", "value": f"About {message_id}"}]},
+    }
+
+
+def make_credentials(token: str = "old") -> Credentials:
+    return Credentials(
+        token=token,
+        refresh_token="refresh",
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id="client",
+        client_secret="secret",
+        expiry=_utcnow() + timedelta(hours=1),
+    )
+
+
+def test_search_skips_messages_deleted_before_their_headers_are_read():
+    api = shared_gmail_resources()
+    steps = []
+
+    def perform(step):
+        steps.append(step)
+        if isinstance(step, Call):
+            return {"messages": [{"id": "a"}, {"id": "b"}], "resultSizeEstimate": 2}
+        return {"a": (message("a"), None), "b": (None, not_found())}
+
+    result = drive(operations.search_messages(api, "in:inbox", 10), perform)
+
+    assert [type(step) for step in steps] == [Call, Batch]
+    assert [request_id for request_id, _ in steps[1].requests] == ["a", "b"]
+    assert [m["subject"] for m in result["messages"]] == ["About a"]
+    assert result["next_page_token"] is None
+
+
+def test_errors_are_thrown_into_the_operation():
+    api = shared_gmail_resources()
+
+    def perform(step):
+        raise not_found()
+
+    with pytest.raises(HistoryExpiredError):
+        drive(operations.list_history(api, "100", "DRAFT"), perform)
+    with pytest.raises(Exception, match="Failed to get thread"):
+        drive(operations.get_thread(api, "t1"), perform)
+
+
+def test_sends_are_not_idempotent():
+    api = shared_gmail_resources()
+    calls = []
+
+    def perform(step):
+        calls.append(step)
+        return {"id": "m1", "threadId": "t1"}
+
+    result = drive(operations.send_raw(api, "cmF3"), perform)
+    assert result == {"id": "m1", "thread_id": "t1", "status": "sent"}
+    assert calls[0].idempotent is False
+
+
+def test_sync_clients_share_one_resource_tree_and_send_with_their_own_transport(
+    monkeypatch,
+):
+    first = GmailClient(make_credentials("a"), "a@example.com")
+    second = GmailClient(make_credentials("b"), "b@example.com")
+    assert first.api is second.api is shared_gmail_resources()
+
+    for client, message_id in ((first, "m1"), (second, "m2")):
+        http = HttpMockSequence(
+            [({"status": "200"}, json.dumps({"id": message_id, "threadId": "t"}))]
+        )
+        monkeypatch.setattr(client, "_thread_http", lambda http=http: http)
+        assert client.send_raw("cmF3")["id"] == message_id
+
+
+def gmail_transport(tokens_seen: list, reject: set) -> httpx.MockTransport:
+    """Answer messages.get with a message, rejecting the given access tokens."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        token = request.headers["authorization"].split()[-1]
+        tokens_seen.append(token)
+        if token in reject:
+            return httpx.Response(401, json={"error": {"code": 401}})
+        message_id = urlsplit(str(request.url)).path.rsplit("/", 1)[-1]
+        query = parse_qs(urlsplit(str(request.url)).query)
+        assert query["format"] == ["metadata"]
+        if message_id == "gone":
+            return httpx.Response(404, json={"error": {"code": 404}})
+        return httpx.Response(200, content=json.dumps(message(message_id)))
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_async_client_batches_reads_concurrently():
+    async with httpx.AsyncClient(transport=gmail_transport([], set())) as http:
+        client = AsyncGmailClient(make_credentials(), EMAIL, http=http)
+        summaries = await client.get_message_summaries(["a", "gone", "b"])
+    assert [summary["id"] for summary in summaries] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_rejected_token_is_refreshed_through_the_auth_manager():
+    refreshes = []
+
+    def refresh_credentials(email, stale_token=None):
+        refreshes.append((email, stale_token))
+        return make_credentials("new")
+
+    tokens = []
+    transport = gmail_transport(tokens, reject={"old"})
+    async with httpx.AsyncClient(transport=transport) as http:
+        client = AsyncGmailClient(
+            make_credentials("old"),
+            EMAIL,
+            http=http,
+            refresh_credentials=refresh_credentials,
+        )
+        summaries = await client.get_message_summaries(["a"])
+
+    assert refreshes == [(EMAIL, "old")]
+    assert tokens == ["old", "new"]
+    assert summaries[0]["id"] == "a"
+
+
+@pytest.mark.asyncio
+async def test_revoked_grant_fails_the_request():
+    transport = gmail_transport([], reject={"old"})
+    async with httpx.AsyncClient(transport=transport) as http:
+        client = AsyncGmailClient(
+            make_credentials("old"),
+            EMAIL,
+            http=http,
+            refresh_credentials=lambda email, stale_token=None: None,
+        )
+        with pytest.raises(RefreshError):
+            await client.get_message_summaries(["a"])
+
+
+def test_stale_token_forces_a_refresh_unless_already_replaced(tmp_path, monkeypatch):
+    manager = AuthManager(tmp_path, token_store=FileTokenStore(tmp_path / "tokens"))
+    manager._store_credentials(EMAIL, make_credentials("old"))
+    refreshed = []
+
+    def refresh(self, request):
+        refreshed.append(self.token)
+        self.token = f"new-{len(refreshed)}"
+        self.expiry = _utcnow() + timedelta(hours=1)
+
+    monkeypatch.setattr(Credentials, "refresh", refresh)
+
+    # A valid-looking token is not refreshed without a reason
+    assert manager.refresh_credentials(EMAIL).token == "old"
+    assert manager.refresh_credentials(EMAIL, stale_token="old").token == "new-1"
+    # A second request rejected with the old token shares the refresh
+    assert manager.refresh_credentials(EMAIL, stale_token="old").token == "new-1"
+    assert refreshed == ["old"]
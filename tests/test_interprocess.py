@@ -0,0 +1,123 @@
+"""Tests for atomic writes, lock files and token refresh across processes."""
+
+import multiprocessing
+import os
+import stat
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+from src.auth_manager import AuthManager, _utcnow
+from src.interprocess import InterProcessLock, atomic_write
+from src.token_store import open_token_store
+
+EMAIL = "user@example.com"
+
+
+def test_atomic_write_replaces_file_owner_only(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("old")
+
+    atomic_write(path, b"new")
+
+    assert path.read_bytes() == b"new"
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    assert os.listdir(tmp_path) == ["state.json"]
+
+
+def test_atomic_write_failure_keeps_old_file(tmp_path, monkeypatch):
+    path = tmp_path / "state.json"
+    path.write_text("old")
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        atomic_write(path, b"new")
+
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["state.json"]
+
+
+def _hold_lock(path: str, held: str, seconds: float) -> None:
+    """Take the lock in a child process and keep it for a while."""
+    with InterProcessLock(Path(path)):
+        Path(held).touch()
+        time.sleep(seconds)
+
+
+def test_lock_excludes_other_processes(tmp_path):
+    lock_path = tmp_path / "locks" / "test.lock"
+    held = tmp_path / "held"
+    child = multiprocessing.Process(
+        target=_hold_lock, args=(str(lock_path), str(held), 0.5)
+    )
+    child.start()
+    try:
+        deadline = time.monotonic() + 10
+        while not held.exists():
+            assert time.monotonic() < deadline, "child never took the lock"
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        with InterProcessLock(lock_path):
+            waited = time.monotonic() - started
+        assert waited > 0.2
+    finally:
+        child.join()
+
+
+def _refresh_in_process(config_dir: str, kind: str, log: str, queue) -> None:
+    """Load the expired token in a fresh AuthManager, as a server process does."""
+
+    def refresh(self, request):
+        with open(log, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        time.sleep(0.3)
+        self.token = f"token-{os.getpid()}"
+        self.expiry = _utcnow() + timedelta(hours=1)
+
+    Credentials.refresh = refresh
+    manager = AuthManager(
+        Path(config_dir), token_store=open_token_store(kind, Path(config_dir))
+    )
+    queue.put(manager.get_credentials(EMAIL).token)
+
+
+@pytest.mark.parametrize("kind", ["file", "sqlite"])
+def test_processes_share_one_token_refresh(tmp_path, kind):
+    store = open_token_store(kind, tmp_path)
+    AuthManager(tmp_path, token_store=store)._store_credentials(
+        EMAIL,
+        Credentials(
+            token="expired",
+            refresh_token="refresh",
+            token_uri="https://oauth2.googleapis.com/token",
+            client_id="client",
+            client_secret="secret",
+            expiry=_utcnow() - timedelta(minutes=1),
+        ),
+    )
+    store.close()
+
+    log = tmp_path / "refreshes.log"
+    queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=_refresh_in_process, args=(str(tmp_path), kind, str(log), queue)
+        )
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    tokens = [queue.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join()
+
+    refreshes = log.read_text().split()
+    assert len(refreshes) == 1
+    assert tokens == [f"token-{refreshes[0]}"] * len(processes)
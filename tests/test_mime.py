@@ -0,0 +1,91 @@
+"""Tests for MIME construction and the transfer encoding chosen for bodies."""
+
+import base64
+import email
+import email.policy
+
+import pytest
+
+from src.mime import (
+    build_mime_message,
+    build_raw_message,
+    compose_mime_message,
+    format_header,
+    text_transfer_encoding,
+)
+
+SHORT_ASCII = "Hello,\nsee you tomorrow.\n"
+SHORT_UTF8 = "Grüße aus München\n"
+LONG_ASCII = "word " * 300
+LONG_MARKUP = "<td a=b c=d e=f g=h>" * 60
+LONG_CYRILLIC = "Привет мир " * 120
+
+ENCODINGS = [
+    pytest.param(SHORT_ASCII, "7bit", id="short-ascii"),
+    pytest.param(SHORT_UTF8, "8bit", id="short-utf8"),
+    pytest.param(LONG_ASCII, "quoted-printable", id="long-ascii"),
+    pytest.param(LONG_MARKUP, "base64", id="long-markup"),
+    pytest.param(LONG_CYRILLIC, "base64", id="long-cyrillic"),
+]
+
+
+def parse(message: bytes) -> email.message.EmailMessage:
+    return email.message_from_bytes(message, policy=email.policy.default)
+
+
+@pytest.mark.parametrize("text,encoding", ENCODINGS)
+def test_text_transfer_encoding(text, encoding):
+    assert text_transfer_encoding(text) == encoding
+
+
+def test_lines_up_to_the_rfc_limit_are_not_encoded():
+    assert text_transfer_encoding("a" * 998) == "7bit"
+    assert text_transfer_encoding("a" * 999) == "quoted-printable"
+
+
+@pytest.mark.parametrize("text,encoding", ENCODINGS)
+def test_plain_message_round_trips(text, encoding):
+    message = parse(build_mime_message("me@example.com", "you@example.com", "Hi", text))
+    assert message["Content-Transfer-Encoding"] == encoding
+    assert message.get_content().rstrip("\n") == text.rstrip("\n")
+
+
+def test_alternative_parts_are_encoded_separately():
+    message = parse(
+        build_mime_message(
+            "me@example.com",
+            "you@example.com",
+            "Hi",
+            SHORT_ASCII,
+            html_body=LONG_MARKUP,
+        )
+    )
+    assert message.get_content_type() == "multipart/alternative"
+    plain, html = message.iter_parts()
+    assert plain["Content-Transfer-Encoding"] == "7bit"
+    assert html["Content-Transfer-Encoding"] == "base64"
+    assert plain.get_content() == SHORT_ASCII
+    assert html.get_content().rstrip("\n") == LONG_MARKUP
+
+
+@pytest.mark.parametrize("text,encoding", ENCODINGS)
+def test_compose_uses_the_same_encoding(text, encoding):
+    message = compose_mime_message("me@example.com", "you@example.com", "Hi", text)
+    assert message["Content-Transfer-Encoding"] == encoding
+
+
+def test_headers_are_encoded_only_when_needed():
+    assert format_header("Subject", "Hello") == b"Subject: Hello\n"
+    folded = format_header("Subject", "Grüße " * 20)
+    assert b"=?utf-8?" in folded
+    assert all(len(line) <= 78 for line in folded.splitlines())
+    with pytest.raises(ValueError):
+        format_header("Subject", "Hello\nBcc: attacker@example.com")
+
+
+def test_raw_message_is_base64url():
+    raw = build_raw_message("me@example.com", "you@example.com", "Hi", LONG_MARKUP)
+    assert "+" not in raw and "/" not in raw
+    message = parse(base64.urlsafe_b64decode(raw))
+    assert message["To"] == "you@example.com"
+    assert message.get_content().rstrip("\n") == LONG_MARKUP
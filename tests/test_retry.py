@@ -0,0 +1,193 @@
+"""Tests for retry classification, backoff and circuit breaking."""
+
+import asyncio
+import json
+
+import httplib2
+import httpx
+import pytest
+from googleapiclient.errors import BatchError, HttpError
+
+from src.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    call_with_retry,
+    call_with_retry_async,
+    indicates_degradation,
+    is_retryable,
+    is_throttled,
+    parse_retry_after,
+)
+
+
+def http_error(status: int, reason: str = "", **headers: str) -> HttpError:
+    """An HttpError as Gmail returns it, with an optional error reason."""
+    content = json.dumps(
+        {"error": {"code": status, "message": "", "errors": [{"reason": reason}]}}
+    ).encode()
+    return HttpError(httplib2.Response({"status": status, **headers}), content)
+
+
+@pytest.mark.parametrize(
+    "error,throttled",
+    [
+        (http_error(429), True),
+        (http_error(403, "rateLimitExceeded"), True),
+        (http_error(403, "userRateLimitExceeded"), True),
+        (http_error(403, "insufficientPermissions"), False),
+        (http_error(503), False),
+        (BatchError("Invalid batch response"), False),
+        (ValueError(), False),
+    ],
+)
+def test_is_throttled(error, throttled):
+    assert is_throttled(error) is throttled
+
+
+@pytest.mark.parametrize(
+    "error,read,send",
+    [
+        (http_error(429), True, True),
+        (http_error(403, "rateLimitExceeded"), True, True),
+        (http_error(500), True, False),
+        (http_error(503), True, False),
+        (http_error(400), False, False),
+        (http_error(404), False, False),
+        (httpx.ConnectError("refused"), True, True),
+        (ConnectionRefusedError(), True, True),
+        (httpx.ReadTimeout("timed out"), True, False),
+        (TimeoutError(), True, False),
+        (BatchError("Invalid batch response"), False, False),
+        (ValueError(), False, False),
+    ],
+)
+def test_is_retryable(error, read, send):
+    assert is_retryable(error, idempotent=True) is read
+    assert is_retryable(error, idempotent=False) is send
+
+
+def test_batch_error_does_not_indicate_degradation():
+    assert not indicates_degradation(BatchError("Invalid batch response"))
+    assert indicates_degradation(http_error(502))
+    assert not indicates_degradation(http_error(404))
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_delay_is_jittered_within_the_window():
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+    for attempt in range(6):
+        delay = policy.delay(attempt, http_error(503))
+        assert 0 <= delay <= min(4.0, 2**attempt)
+
+
+def test_delay_honours_retry_after():
+    policy = RetryPolicy(base_delay=0.01, max_delay=0.1)
+    assert policy.delay(0, http_error(429, **{"retry-after": "5"})) == 5.0
+
+
+def test_delay_for_batch_error_ignores_missing_response():
+    policy = RetryPolicy(base_delay=0.01, max_delay=0.1)
+    assert policy.delay(0, BatchError("Invalid batch response")) <= 0.01
+
+
+def test_call_with_retry_retries_then_succeeds(monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    errors = [http_error(503), http_error(429)]
+
+    def call():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    breaker = CircuitBreaker("user@example.com", failure_threshold=5)
+    assert call_with_retry(call, breaker, policy=RetryPolicy(max_attempts=3)) == "ok"
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_send_is_not_retried_after_server_error(monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise http_error(500)
+
+    breaker = CircuitBreaker("user@example.com")
+    with pytest.raises(HttpError):
+        call_with_retry(send, breaker, idempotent=False)
+    assert len(calls) == 1
+
+
+def test_circuit_opens_and_admits_one_trial(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("user@example.com", failure_threshold=2, reset_timeout=30)
+
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now[0] = 31.0
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_frees_the_half_open_circuit(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("user@example.com", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    now[0] = 31.0
+
+    started = asyncio.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.Event().wait()
+
+    trial = asyncio.create_task(call_with_retry_async(hang, breaker))
+    await started.wait()
+    assert breaker.state == "half_open"
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    async def ok():
+        return "ok"
+
+    assert await call_with_retry_async(ok, breaker) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_interrupted_trial_frees_the_half_open_circuit(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("user@example.com", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    now[0] = 31.0
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        call_with_retry(interrupted, breaker)
+    breaker.before_call()
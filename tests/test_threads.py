@@ -0,0 +1,94 @@
+"""Tests for reading message parts and saving them to the download directory."""
+
+import pytest
+
+from src.threads import ThreadCache, read_part, resolve_download_path
+
+MESSAGE = {
+    "id": "m1",
+    "payload": {
+        "mimeType": "multipart/mixed",
+        "parts": [
+            {
+                "partId": "0",
+                "mimeType": "text/plain",
+                "body": {"size": 5, "data": "aGVsbG8"},
+            },
+            {
+                "partId": "1",
+                "mimeType": "application/pdf",
+                "filename": "report.pdf",
+                "body": {"size": 4, "attachmentId": "a1"},
+            },
+        ],
+    },
+}
+
+
+async def call(method: str, *args):
+    if method == "get_message":
+        return MESSAGE
+    if method == "get_attachment":
+        return b"%PDF"
+    raise AssertionError(f"unexpected call {method}")
+
+
+@pytest.fixture
+def cache():
+    return ThreadCache("user@example.com")
+
+
+@pytest.mark.parametrize(
+    "save_path",
+    ["/etc/passwd", "~/.bashrc", "../escape.pdf", "a/../../escape.pdf", "", "."],
+)
+def test_paths_outside_the_download_directory_are_rejected(tmp_path, save_path):
+    with pytest.raises(ValueError):
+        resolve_download_path(tmp_path / "downloads", save_path)
+
+
+def test_symlinks_out_of_the_download_directory_are_rejected(tmp_path):
+    downloads = tmp_path / "downloads"
+    downloads.mkdir()
+    (downloads / "link").symlink_to(tmp_path)
+    with pytest.raises(ValueError):
+        resolve_download_path(downloads, "link/escape.pdf")
+
+
+def test_nested_paths_stay_inside(tmp_path):
+    downloads = tmp_path / "downloads"
+    path = resolve_download_path(downloads, "reports/q1.pdf")
+    assert path == downloads.resolve() / "reports" / "q1.pdf"
+
+
+@pytest.mark.asyncio
+async def test_attachment_is_saved_under_the_download_directory(tmp_path, cache):
+    downloads = tmp_path / "downloads"
+    result = await read_part(
+        call, cache, "m1", "1", save_path="reports/q1.pdf", download_dir=downloads
+    )
+    saved = downloads / "reports" / "q1.pdf"
+    assert result["saved_to"] == str(saved.resolve())
+    assert saved.read_bytes() == b"%PDF"
+
+    with pytest.raises(ValueError, match="already exists"):
+        await read_part(
+            call, cache, "m1", "1", save_path="reports/q1.pdf", download_dir=downloads
+        )
+
+
+@pytest.mark.asyncio
+async def test_escaping_save_path_writes_nothing(tmp_path, cache):
+    downloads = tmp_path / "downloads"
+    with pytest.raises(ValueError):
+        await read_part(
+            call, cache, "m1", "1", save_path="../evil", download_dir=downloads
+        )
+    assert not (tmp_path / "evil").exists()
+
+
+@pytest.mark.asyncio
+async def test_text_part_is_returned_a_page_at_a_time(cache):
+    result = await read_part(call, cache, "m1", "0", max_chars=3)
+    assert result["text"] == "hel"
+    assert result["next_offset"] == 3
@@ -0,0 +1,164 @@
+"""Tests for the file and SQLite token stores and migration between them."""
+
+import os
+import stat
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+from src.auth_manager import AuthManager
+from src.token_store import (
+    FileTokenStore,
+    SqliteTokenStore,
+    migrate_tokens,
+    open_token_store,
+)
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def store(request, tmp_path):
+    """An empty store of each backend."""
+    store = open_token_store(request.param, tmp_path)
+    yield store
+    store.close()
+
+
+def test_put_get_and_delete(store):
+    assert store.get("a@example.com") is None
+    assert store.version("a@example.com") is None
+
+    version = store.put("a@example.com", b"secret")
+    assert store.version("a@example.com") == version
+    assert store.get("a@example.com") == (version, b"secret")
+
+    assert store.delete("a@example.com")
+    assert not store.delete("a@example.com")
+    assert store.get("a@example.com") is None
+
+
+def test_every_write_changes_the_version(store):
+    first = store.put("a@example.com", b"one")
+    second = store.put("a@example.com", b"two")
+    assert first != second
+    assert store.get("a@example.com") == (second, b"two")
+
+
+def test_list_users_pages_in_sorted_order(store):
+    users = [f"user{n:02d}@example.com" for n in range(25)]
+    for email in reversed(users):
+        store.put(email, email.encode())
+
+    pages, after = [], None
+    while page := store.list_users(limit=10, after=after):
+        pages.append(page)
+        after = page[-1]
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sum(pages, []) == users
+    assert store.list_users() == users
+
+
+def test_file_store_rejects_names_outside_its_directory(tmp_path):
+    store = FileTokenStore(tmp_path / "tokens")
+    for email in ("../current_user", ".key", "a/b@example.com", ""):
+        with pytest.raises(ValueError):
+            store.version(email)
+
+
+def test_file_store_ignores_temporary_files(tmp_path):
+    store = FileTokenStore(tmp_path / "tokens")
+    store.put("a@example.com", b"secret")
+    (tmp_path / "tokens" / ".b@example.com.json.tmp").write_bytes(b"partial")
+    assert store.list_users() == ["a@example.com"]
+
+
+def test_sqlite_versions_are_not_reused_after_delete(tmp_path):
+    store = SqliteTokenStore(tmp_path / "tokens.db")
+    try:
+        first = store.put("a@example.com", b"one")
+        store.put("b@example.com", b"two")
+        store.delete("a@example.com")
+        assert store.put("a@example.com", b"three") > first
+    finally:
+        store.close()
+
+
+def test_sqlite_database_is_owner_only(tmp_path):
+    store = SqliteTokenStore(tmp_path / "tokens.db")
+    umask = os.umask(0o022)
+    try:
+        store.put("a@example.com", b"secret")
+        for name in ("tokens.db", "tokens.db-wal", "tokens.db-shm"):
+            mode = stat.S_IMODE(os.stat(tmp_path / name).st_mode)
+            assert mode == 0o600, name
+    finally:
+        os.umask(umask)
+        store.close()
+
+
+def test_sqlite_tightens_sidecar_files_left_readable(tmp_path):
+    path = tmp_path / "tokens.db"
+    first = SqliteTokenStore(path)
+    first.put("a@example.com", b"secret")
+    os.chmod(f"{path}-wal", 0o644)
+
+    # A second connection keeps the WAL open and fixes its mode
+    second = SqliteTokenStore(path)
+    try:
+        assert second.get("a@example.com")[1] == b"secret"
+        assert stat.S_IMODE(os.stat(f"{path}-wal").st_mode) == 0o600
+    finally:
+        second.close()
+        first.close()
+
+
+@pytest.mark.parametrize(
+    "source_kind,target_kind", [("file", "sqlite"), ("sqlite", "file")]
+)
+def test_migrate_tokens_copies_every_record(
+    tmp_path, monkeypatch, source_kind, target_kind
+):
+    # Several pages, so paging through the source is exercised
+    monkeypatch.setattr("src.token_store.MIGRATION_PAGE_SIZE", 3)
+    source = open_token_store(source_kind, tmp_path)
+    target = open_token_store(target_kind, tmp_path)
+    try:
+        records = {f"user{n}@example.com": os.urandom(16) for n in range(8)}
+        for email, data in records.items():
+            source.put(email, data)
+        target.put("user0@example.com", b"stale")
+
+        assert migrate_tokens(source, target) == len(records)
+
+        assert target.list_users() == sorted(records)
+        for email, data in records.items():
+            assert target.get(email)[1] == data
+            # The source is left unchanged
+            assert source.get(email)[1] == data
+    finally:
+        source.close()
+        target.close()
+
+
+def test_auth_manager_reads_migrated_credentials(tmp_path):
+    file_store = FileTokenStore(tmp_path / "tokens")
+    manager = AuthManager(tmp_path, token_store=file_store)
+    manager._store_credentials(
+        "a@example.com",
+        Credentials(
+            token="token",
+            refresh_token="refresh",
+            token_uri="https://oauth2.googleapis.com/token",
+            client_id="client",
+            client_secret="secret",
+        ),
+    )
+
+    sqlite_store = SqliteTokenStore(tmp_path / "tokens.db")
+    try:
+        migrate_tokens(file_store, sqlite_store)
+        migrated = AuthManager(tmp_path, token_store=sqlite_store)
+        assert migrated.list_users() == ["a@example.com"]
+        assert migrated._load_credentials("a@example.com").token == "token"
+    finally:
+        sqlite_store.close()